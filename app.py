@@ -1,17 +1,28 @@
 import re
 import sqlite3
-from flask import Flask, render_template, request, redirect, url_for, flash, Response, jsonify, session
+from flask import Flask, render_template, request, redirect, url_for, flash, Response, jsonify, session, send_file, stream_with_context
 from num2words import num2words
 from datetime import datetime, timedelta, timezone
 import requests
-from bs4 import BeautifulSoup
 import csv
 import io
 from whitenoise import WhiteNoise
+from demand_store import DemandManifest, DemandMergeError, DemandWriter, iter_csv_chunks, iter_zip_chunks, merge_demand_files, read_demand_labourers
+from public_data import CompressedSidecars, JobcardStore, LocationCatalog, PublicSnapshots, SchemeIndex, snapshot_kind
+from snapshots import SnapshotError
+from parsers import iter_schemes, iter_text_chunks, iter_work_codes, parse_bills, parse_job_card_html, parse_nrega_data, split_bills
+from metrics import MetricsRegistry
+from jobs import JobError, JobQueue
+from pdf_export import hindi_pdf_available, iter_pdf_chunks, render_demands_pdf, render_invoices_pdf
 import os
 import json
 import shutil
 import math
+import itertools
+import threading
+import time
+import zipfile
+from collections import OrderedDict
 
 app = Flask(__name__)
 app.secret_key = 'your_super_secret_key'
@@ -20,151 +31,387 @@ IST = timezone(timedelta(hours=5, minutes=30))
 # 'static' folder ko serve karne ke liye app ko WhiteNoise se wrap karein
 app.wsgi_app = WhiteNoise(app.wsgi_app, root="static/", prefix="/static/")
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 USER_DATA_DIR = os.path.join('static', 'user_data')
 DEMAND_SAVE_DIR = os.path.join(USER_DATA_DIR, 'Demand Form')
 
 if not os.path.exists(DEMAND_SAVE_DIR):
     os.makedirs(DEMAND_SAVE_DIR)
 
+# --- METRICS ---
+# Har gunicorn worker apne counters cache/metrics/<pid>.json me likhta hai, /metrics sabko jodta hai.
+# METRICS_TOKEN set ho to /metrics?token=... (ya Bearer header) chahiye.
+metrics = MetricsRegistry(os.environ.get('METRICS_DIR') or os.path.join(BASE_DIR, 'cache', 'metrics'))
+metrics.init_app(app, token=os.environ.get('METRICS_TOKEN'))
+
+# --- VENDOR DATABASE ---
+# Absolute path, taaki gunicorn kisi bhi working dir se chale same DB mile
+DB_PATH = os.path.join(BASE_DIR, 'vendors.db')
+DB_BUSY_TIMEOUT = 10  # seconds to wait on a locked DB before giving up
+
+# Same SQL strings reused everywhere so sqlite3's per-connection statement cache hits
+VENDOR_BY_NAME_SQL = 'SELECT * FROM vendors WHERE name = ?'
+VENDOR_BY_ID_SQL = 'SELECT * FROM vendors WHERE id = ?'
+VENDOR_COLUMNS = ('name', 'gstin', 'address', 'bank_name', 'account_no', 'branch', 'ifsc', 'mobile', 'payid')
+# name_key = normalize_vendor_name(name), vendor_form_values() ise aakhri value ke roop me deta hai
+VENDOR_INSERT_SQL = f"INSERT INTO vendors ({', '.join(VENDOR_COLUMNS)}, name_key) VALUES ({', '.join('?' * (len(VENDOR_COLUMNS) + 1))})"
+VENDOR_UPDATE_SQL = f"UPDATE vendors SET {', '.join(c + ' = ?' for c in VENDOR_COLUMNS)}, name_key = ? WHERE id = ?"
+VENDOR_DELETE_SQL = 'DELETE FROM vendors WHERE id = ?'
+VENDOR_BY_GSTIN_SQL = 'SELECT * FROM vendors WHERE gstin = ? ORDER BY id LIMIT 1'
+VENDOR_BY_NAME_KEY_SQL = 'SELECT * FROM vendors WHERE name_key = ? ORDER BY id LIMIT 1'
+VENDOR_QUERY_BATCH = 500  # SQLite ke bound-parameter limit se neeche
+VENDOR_GENERATION_SQL = "SELECT value FROM app_meta WHERE key = 'vendor_generation'"
+VENDOR_GENERATION_BUMP_SQL = "UPDATE app_meta SET value = value + 1 WHERE key = 'vendor_generation'"
+
+_db_local = threading.local()
+
+def _open_db():
+    conn = sqlite3.connect(DB_PATH, timeout=DB_BUSY_TIMEOUT, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA synchronous = NORMAL')  # WAL ke saath safe hai
+    return conn
+
+def get_db_connection():
+    """
+    Returns this worker thread's vendor DB connection, opened once and reused.
+    The pid check makes sure a forked worker never shares its parent's handle.
+    """
+    conn = getattr(_db_local, 'conn', None)
+    if conn is None or _db_local.pid != os.getpid():
+        conn = _open_db()
+        _db_local.conn = conn
+        _db_local.pid = os.getpid()
+    return conn
+
+# Saved demands ka index (demand_files table), /downloads isi se padhta hai
+demand_manifest = DemandManifest(get_db_connection, DEMAND_SAVE_DIR, os.path.join(BASE_DIR, 'static'))
+# Demand CSVs temp file + link se likhe jaate hain (adhoori file kabhi nahi dikhti)
+demand_writer = DemandWriter(DEMAND_SAVE_DIR)
+
+# Lambe uploads/exports ke background jobs (jobs table isi DB me, results cache/jobs me)
+JOB_WORKERS = 2
+job_queue = JobQueue(get_db_connection, os.path.join(BASE_DIR, 'cache', 'jobs'), max_workers=JOB_WORKERS)
+
 # This function is still needed for vendor management.
 def init_db():
     """Initializes the database and creates the vendors table if it doesn't exist."""
-    conn = sqlite3.connect('vendors.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS vendors (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            gstin TEXT,
-            address TEXT,
-            bank_name TEXT,
-            account_no TEXT,
-            branch TEXT,
-            ifsc TEXT,
-            mobile TEXT,
-            payid TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    conn = get_db_connection()
+    # Har worker import par chalata hai; sab kuch pehle se bana ho to koi write lock nahi lena
+    journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+    has_tables = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('vendors', 'app_meta', 'demand_files', 'demand_cards', 'jobs')").fetchone()[0] == 5
+    if journal_mode.lower() != 'wal':
+        conn.execute('PRAGMA journal_mode = WAL')
+    if not has_tables:
+        with conn:
+            # UNIQUE on name gives the index that VENDOR_BY_NAME_SQL uses
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS vendors (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL UNIQUE,
+                    gstin TEXT,
+                    address TEXT,
+                    bank_name TEXT,
+                    account_no TEXT,
+                    branch TEXT,
+                    ifsc TEXT,
+                    mobile TEXT,
+                    payid TEXT,
+                    name_key TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_vendors_gstin ON vendors (gstin)')
+            # Cross-worker counter: har vendor write isko badhata hai, baaki workers apna cache phenk dete hain
+            conn.execute('CREATE TABLE IF NOT EXISTS app_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            conn.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('vendor_generation', 0)")
+        demand_manifest.init_schema(conn)
+    # Tables pehle se hon tab bhi: purani jobs table me owner_start, vendors me name_key jodna hai
+    job_queue.init_schema(conn)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_vendors_name_key'").fetchone() is None:
+        add_vendor_name_key(conn)
+
+def add_vendor_name_key(conn):
+    """Indexes vendors.name_key, first adding and filling the column on a DB created before it existed."""
+    # IMMEDIATE: saare workers ek saath import karte hain, migration ek hi baar chale
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if 'name_key' not in {row[1] for row in conn.execute('PRAGMA table_info(vendors)')}:
+            conn.execute('ALTER TABLE vendors ADD COLUMN name_key TEXT')
+            conn.executemany('UPDATE vendors SET name_key = ? WHERE id = ?',
+                             [(normalize_vendor_name(row['name']), row['id']) for row in conn.execute('SELECT id, name FROM vendors')])
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_vendors_name_key ON vendors (name_key)')
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+def normalize_vendor_name(name):
+    return ' '.join((name or '').split()).casefold()
 
 init_db()
 
-def get_db_connection():
-    conn = sqlite3.connect('vendors.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+def get_vendor_by_name(conn, name):
+    """Exact-name vendor lookup (index-backed), shared by invoice and vendor routes."""
+    return conn.execute(VENDOR_BY_NAME_SQL, (name,)).fetchone()
 
-def parse_nrega_data(text):
-    data = {'material_items': []}
-    patterns = {
-        'district': r"District:([\w\s]+)",
-        'work_description': r"Work\s*:\s*(.+?)\s*Work Code",
-        'work_code': r"Work Code\s*:\s*([\w/\-]+)",
-        'bill_no': r"Bill No\.\s*:\s*(\d+)",
-        'bill_date': r"Bill Date\s*:\s*(\d{2}/\d{2}/\d{4})",
-        'vendor_raw': r"Vendor name(.+?)\(TinNo-([\w]+)\)"
-    }
-    for key, pattern in patterns.items():
-        match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
-        if match:
-            if key == 'vendor_raw':
-                data['vendor_name'] = match.group(1).strip()
-                data['gstin'] = match.group(2).strip()
-            else:
-                data[key] = match.group(1).strip()
+def get_vendor_by_id(conn, vendor_id):
+    return conn.execute(VENDOR_BY_ID_SQL, (vendor_id,)).fetchone()
 
-    material_section_match = re.search(r"Material\s+Unit Price.+?\n(.+?)(?=Taxes|Total\s+\(In Rupees\))", text, re.DOTALL | re.IGNORECASE)
-    if material_section_match:
-        raw_item_text = material_section_match.group(1).strip()
-        item_lines = raw_item_text.strip().split('\n')
-        
-        for line in item_lines:
-            line = re.sub(r'\s+', ' ', line).strip() # Normalize spaces
-            if not line: continue
-
-            numbers = re.findall(r'[\d\.]+', line)
-            if len(numbers) >= 3:
-                try:
-                    amount = float(numbers[-1])
-                    quantity = float(numbers[-2])
-                    unit_price = float(numbers[-3])
-                    
-                    # To extract the description, we remove the numbers and trailing whitespace
-                    desc_part = line.rsplit(numbers[-3], 1)[0].strip()
-                    
-                    if desc_part: # Ensure we have a description
-                        data['material_items'].append({
-                            'material': desc_part,
-                            'unit_price': unit_price,
-                            'quantity': quantity,
-                            'amount': amount
-                        })
-                except (ValueError, IndexError):
-                    print(f"Skipping unparsable line chunk: {line}")
-                    continue
-    
-    data['cgst'] = 0.0
-    data['sgst'] = 0.0
-    cgst_match = re.search(r"Centre GST.*[ \t]([\d\.]+)", text, re.IGNORECASE)
-    if cgst_match:
-        data['cgst'] = float(cgst_match.group(1))
-
-    sgst_match = re.search(r"State GST.*[ \t]([\d\.]+)", text, re.IGNORECASE)
-    if sgst_match:
-        data['sgst'] = float(sgst_match.group(1))
-        
-    total_cash_match = re.search(r"Total Cash payment\s+\(In Rupees\)\s*([\d\.]+)", text, re.IGNORECASE)
-    if total_cash_match:
-        data['total_cash_payment'] = float(total_cash_match.group(1))
+def vendor_form_values():
+    values = tuple(request.form[c] for c in VENDOR_COLUMNS)
+    return values + (normalize_vendor_name(values[0]),)
+
+class VendorCache:
+    """
+    In-process LRU of resolved vendor rows, keyed by the name or GSTIN looked up.
+    Writes in this worker clear it directly; writes in other workers are noticed
+    through PRAGMA data_version and the vendor_generation counter in app_meta.
+    """
 
-    return data
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generation = None
+
+    def _sync(self, conn):
+        # data_version sirf doosre connections ke commit par badalta hai, isliye ye check sasta hai
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if getattr(_db_local, 'data_version', None) == data_version and self._generation is not None:
+            return
+        _db_local.data_version = data_version
+        generation = conn.execute(VENDOR_GENERATION_SQL).fetchone()[0]
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+
+    def _get(self, key):
+        with self._lock:
+            vendor = self._entries.get(key)
+            if vendor is not None:
+                self._entries.move_to_end(key)
+            return vendor
+
+    def _put(self, key, vendor):
+        with self._lock:
+            self._entries[key] = vendor
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def resolve(self, conn, name, gstin=''):
+        """
+        Finds a vendor by name (exact, then ignoring case/extra spaces via the
+        name_key index), falling back to GSTIN only when no name matches.
+        """
+        self._sync(conn)
+        name_key = normalize_vendor_name(name)
+        gstin_key = (gstin or '').strip().upper()
+        if name_key:
+            vendor = self._get(('name', name))
+            if vendor is not None:
+                return vendor
+            row = get_vendor_by_name(conn, name) or conn.execute(VENDOR_BY_NAME_KEY_SQL, (name_key,)).fetchone()
+            if row is not None:
+                vendor = dict(row)
+                self._put(('name', name), vendor)
+                return vendor
+        if not gstin_key:
+            return None
+        vendor = self._get(('gstin', gstin_key))
+        if vendor is None:
+            row = conn.execute(VENDOR_BY_GSTIN_SQL, (gstin_key,)).fetchone()
+            if row is None:
+                return None
+            vendor = dict(row)
+            self._put(('gstin', gstin_key), vendor)
+        return vendor
+
+    @staticmethod
+    def _fetch(conn, column, values):
+        """{value: [vendor dicts, by id]} for the given name_key / gstin values, through the column's index."""
+        values = sorted(values)
+        found = {}
+        for start in range(0, len(values), VENDOR_QUERY_BATCH):
+            batch = values[start:start + VENDOR_QUERY_BATCH]
+            for row in conn.execute(f"SELECT * FROM vendors WHERE {column} IN ({', '.join('?' * len(batch))}) ORDER BY id", batch):
+                found.setdefault(row[column], []).append(dict(row))
+        return found
+
+    def resolve_many(self, conn, pairs):
+        """
+        Batch version of resolve() for [(name, gstin), ...] with the same order
+        of preference; cache misses take one indexed IN query per key type.
+        """
+        self._sync(conn)
+        results = [None] * len(pairs)
+        name_misses = {}
+        for i, (name, _) in enumerate(pairs):
+            if normalize_vendor_name(name):
+                results[i] = self._get(('name', name))
+                if results[i] is None:
+                    name_misses.setdefault(name, []).append(i)
+        by_key = self._fetch(conn, 'name_key', {normalize_vendor_name(name) for name in name_misses})
+        for name, indexes in name_misses.items():
+            candidates = by_key.get(normalize_vendor_name(name))
+            if candidates:
+                # Exact naam wala pehle, jaise resolve() me VENDOR_BY_NAME_SQL
+                vendor = next((v for v in candidates if v['name'] == name), candidates[0])
+                self._put(('name', name), vendor)
+                for i in indexes:
+                    results[i] = vendor
+
+        gstin_misses = {}
+        for i, (_, gstin) in enumerate(pairs):
+            gstin_key = (gstin or '').strip().upper()
+            if results[i] is None and gstin_key:
+                results[i] = self._get(('gstin', gstin_key))
+                if results[i] is None:
+                    gstin_misses.setdefault(gstin_key, []).append(i)
+        by_gstin = self._fetch(conn, 'gstin', gstin_misses)
+        for gstin_key, indexes in gstin_misses.items():
+            if by_gstin.get(gstin_key):
+                self._put(('gstin', gstin_key), by_gstin[gstin_key][0])
+                for i in indexes:
+                    results[i] = by_gstin[gstin_key][0]
+        return results
+
+    def invalidate(self, conn):
+        """Call inside the write transaction: bumps the shared generation and clears this worker's copy."""
+        conn.execute(VENDOR_GENERATION_BUMP_SQL)
+        with self._lock:
+            self._entries.clear()
+            self._generation = None
+
+vendor_cache = VendorCache()
 
 @app.route('/')
 def home():
     """Renders a simple home/dashboard page."""
     return render_template('home.html')
 
+def invoice_manual_data():
+    return {'delivery_note': request.form.get('delivery_note', ''),'terms_of_payment': request.form.get('terms_of_payment', ''),
+        'panchayat': request.form.get('panchayat', ''),'block': request.form.get('block', ''),'district': request.form.get('district', '')}
+
+def finalize_invoice_data(parsed_data, manual_data, signatures):
+    """Applies manual overrides and fills subtotal, rounding and amount in words."""
+    for key, value in manual_data.items():
+        if value: parsed_data[key] = value
+
+    subtotal = sum(item['amount'] for item in parsed_data['material_items'])
+    grand_total = parsed_data.get('total_cash_payment', subtotal + parsed_data.get('cgst', 0.0) + parsed_data.get('sgst', 0.0))
+    final_total_rounded = round(grand_total)
+    round_off = final_total_rounded - grand_total
+    
+    parsed_data['subtotal'] = subtotal
+    parsed_data['final_total'] = final_total_rounded
+    parsed_data['round_off'] = round_off
+    parsed_data['amount_in_words'] = f"Indian Rupees {num2words(final_total_rounded, lang='en_IN').title()} Only."
+    parsed_data['signatures'] = signatures
+    return parsed_data
+
 # Original index route renamed to generate_invoice, if you want to keep it as an option
 @app.route('/generate-invoice', methods=['GET', 'POST'])
 def generate_invoice():
     if request.method == 'POST':
         pasted_data = request.form.get('pasted_data')
         signatures = request.form.getlist('signatures')
-        manual_data = {'delivery_note': request.form.get('delivery_note', ''),'terms_of_payment': request.form.get('terms_of_payment', ''),
-            'panchayat': request.form.get('panchayat', ''),'block': request.form.get('block', ''),'district': request.form.get('district', '')}
-        parsed_data = parse_nrega_data(pasted_data)
+        manual_data = invoice_manual_data()
+        with metrics.timer('parse_nrega_data'):
+            parsed_data = parse_nrega_data(pasted_data)
         if not parsed_data.get('bill_no') or not parsed_data.get('vendor_name'):
             flash("Could not parse critical details. Please check the pasted text.", 'error'); return redirect(url_for('generate_invoice'))
-        for key, value in manual_data.items():
-            if value: parsed_data[key] = value
         vendor_name = parsed_data.get('vendor_name', '')
-        conn = get_db_connection()
-        vendor_details = conn.execute('SELECT * FROM vendors WHERE name = ?', (vendor_name,)).fetchone()
+        vendor_details = vendor_cache.resolve(get_db_connection(), vendor_name, parsed_data.get('gstin', ''))
         if not vendor_details:
             flash(f"Vendor '{vendor_name}' not found! Please add their details.", 'warning')
-            conn.close()
             return redirect(url_for('manage_vendors', name=vendor_name, gstin=parsed_data.get('gstin', '')))
-        vendor_details = dict(vendor_details)
-        conn.close()
 
-        subtotal = sum(item['amount'] for item in parsed_data['material_items'])
-        grand_total = parsed_data.get('total_cash_payment', subtotal + parsed_data.get('cgst', 0.0) + parsed_data.get('sgst', 0.0))
-        final_total_rounded = round(grand_total)
-        round_off = final_total_rounded - grand_total
-        
-        parsed_data['subtotal'] = subtotal
-        parsed_data['final_total'] = final_total_rounded
-        parsed_data['round_off'] = round_off
-        parsed_data['amount_in_words'] = f"Indian Rupees {num2words(final_total_rounded, lang='en_IN').title()} Only."
-        parsed_data['signatures'] = signatures
-        
-        return render_template('preview.html', data=parsed_data, vendor=vendor_details)
+        finalize_invoice_data(parsed_data, manual_data, signatures)
+        return render_template('preview.html', invoices=[(parsed_data, vendor_details)])
 
     prefill_data = {'delivery_note': request.args.get('delivery_note', ''),'terms_of_payment': request.args.get('terms_of_payment', ''),
         'panchayat': request.args.get('panchayat', ''),'block': request.args.get('block', ''),'district': request.args.get('district', ''),
         'signatures': request.args.getlist('signatures')}
-    return render_template('index.html', prefill_data=prefill_data)
+    return render_template('index.html', prefill_data=prefill_data, invoice_batch_limit=INVOICE_BATCH_LIMIT,
+                           batch_pdf=hindi_pdf_available())
+
+def read_batch_bill_texts():
+    """Bill texts from the batch form: pasted dump and/or a zip of .txt files."""
+    texts = []
+    pasted = request.form.get('pasted_data', '')
+    if pasted.strip():
+        texts.extend(split_bills(pasted))
+    bills_zip = request.files.get('bills_zip')
+    if bills_zip and bills_zip.filename:
+        with zipfile.ZipFile(bills_zip.stream) as archive:
+            for info in sorted(archive.infolist(), key=lambda i: i.filename):
+                if info.is_dir() or not info.filename.lower().endswith('.txt'):
+                    continue
+                texts.extend(split_bills(archive.read(info).decode('utf-8', errors='replace')))
+    return texts
+
+INVOICE_BATCH_LIMIT = 500
+
+def bill_label(number, bill, text=''):
+    """'Bill 3 (No. 123)' for the skipped-bills page; falls back to the bill's first line."""
+    if bill.get('bill_no'):
+        return f"Bill {number} (No. {bill['bill_no']})"
+    first_line = next((line.strip() for line in text.splitlines() if line.strip()), '')
+    return f"Bill {number} ({first_line[:60]})" if first_line else f"Bill {number}"
+
+@app.route('/generate-invoice/batch', methods=['POST'])
+def generate_invoice_batch():
+    """Many bills in, one multi-page PDF out (a printable HTML page when PDFs can't print Hindi)."""
+    try:
+        texts = read_batch_bill_texts()
+    except zipfile.BadZipFile:
+        flash("Uploaded file is not a valid zip.", 'error'); return redirect(url_for('generate_invoice'))
+    if not texts:
+        flash("Paste bills or upload a zip of bill text files.", 'error'); return redirect(url_for('generate_invoice'))
+
+    signatures = request.form.getlist('signatures')
+    manual_data = invoice_manual_data()
+    # Poora PDF memory me banta hai (fpdf2), isliye ek PDF me bills ki limit
+    over_limit = texts[INVOICE_BATCH_LIMIT:]
+    texts = texts[:INVOICE_BATCH_LIMIT]
+    with metrics.timer('parse_bills'):
+        bills = [bill.to_dict() for bill in parse_bills(texts)]
+
+    # (number, bill, reason) — PDF ke pehle page par dikhte hain, taaki chhoote bills chupke se gayab na hon
+    skipped, parsed = [], []
+    for number, (text, bill) in enumerate(zip(texts, bills), start=1):
+        if bill.get('bill_no') and bill.get('vendor_name'):
+            parsed.append((number, bill))
+        else:
+            skipped.append((number, bill_label(number, bill, text), 'Bill number or vendor name not found in the text'))
+    vendors = vendor_cache.resolve_many(get_db_connection(), [(b['vendor_name'], b.get('gstin', '')) for _, b in parsed])
+    invoices, missing_vendors = [], []
+    for (number, bill), vendor in zip(parsed, vendors):
+        if vendor is None:
+            missing_vendors.append(bill['vendor_name'])
+            skipped.append((number, bill_label(number, bill), f"Vendor not saved: {bill['vendor_name']}"))
+            continue
+        invoices.append((finalize_invoice_data(bill, manual_data, signatures), vendor))
+    skipped.extend((number, bill_label(number, {}, text), f'Over the {INVOICE_BATCH_LIMIT}-bill limit of one PDF')
+                   for number, text in enumerate(over_limit, start=INVOICE_BATCH_LIMIT + 1))
+    skipped = [(label, reason) for _, label, reason in sorted(skipped)]
+
+    if not invoices:
+        if missing_vendors:
+            flash(f"Vendors not found: {', '.join(sorted(set(missing_vendors)))}. Please add their details.", 'warning')
+        else:
+            flash("Could not parse critical details in any bill. Please check the pasted text.", 'error')
+        return redirect(url_for('generate_invoice'))
+
+    if not hindi_pdf_available():
+        return render_template('preview.html', invoices=invoices, skipped=skipped)
+    pdf_bytes = render_invoices_pdf(invoices, skipped)
+    filename = f"Invoices_{datetime.now(IST).strftime('%Y%m%d_%H%M%S')}.pdf"
+    headers = {"Content-Disposition": f"attachment;filename={filename}", "Content-Length": str(len(pdf_bytes)),
+               "X-Invoices-Rendered": str(len(invoices)), "X-Bills-Skipped": str(len(skipped))}
+    return Response(iter_pdf_chunks(pdf_bytes), mimetype='application/pdf', headers=headers)
 
 @app.route('/muster_roll', methods=['GET', 'POST'])
 def generate_muster_roll():
@@ -181,41 +428,111 @@ def generate_muster_roll():
             'print_date': datetime.now().strftime('%d/%m/%Y')
         }
         
-        return render_template('muster_roll_preview.html', data=mr_data)
+        return render_template('muster_roll_preview.html', rolls=[mr_data])
 
     return render_template('muster_roll_form.html')
 
+def mr_numbers(first, count):
+    """MR numbers counting up from `first`: 'MR/0098' -> MR/0098, MR/0099, MR/0100 (zero padding kept)."""
+    match = re.search(r'(\d+)$', first)
+    if not match:
+        return [f'{first}-{i}' if first else str(i) for i in range(1, count + 1)]
+    prefix, digits = first[:match.start()], match.group(1)
+    return [f'{prefix}{int(digits) + i:0{len(digits)}d}' for i in range(count)]
+
+# Batch Muster Roll: ek din (ya range) ke saved demands se har (date, panchayat, work code) ka ek MR
+@app.route('/muster_roll/batch', methods=['POST'])
+def generate_muster_roll_batch():
+    if not session.get('admin_logged_in'):
+        flash("Access Restricted: Please login to use saved demands.", "warning")
+        return redirect(url_for('admin_login'))
+
+    form = request.form
+    try:
+        rows = select_demand_rows(form)[4]
+    except ValueError:
+        flash("Date YYYY-MM-DD format me dein.", "error")
+        return redirect(url_for('generate_muster_roll'))
+    if not rows:
+        flash("Is date / panchayat ke liye koi saved demand nahi mili.", "warning")
+        return redirect(url_for('generate_muster_roll'))
+
+    # Ek hi pass: har demand file ek baar padhi, har panchayat ka scheme/location lookup ek baar
+    groups = OrderedDict()  # (date, panchayat, work code) -> {card: labourer}
+    scheme_names, skipped = {}, []
+    demand_root = os.path.abspath(DEMAND_SAVE_DIR)
+    for row in rows[:DEMAND_PRINT_LIMIT]:
+        full_path = os.path.abspath(os.path.join(app.root_path, 'static', row['path']))
+        if not full_path.startswith(demand_root + os.sep):
+            skipped.append(row['path'])
+            continue
+        try:
+            work_code, labourers = read_demand_labourers(full_path)
+        except (OSError, ValueError, csv.Error):
+            skipped.append(row['path'])
+            continue
+        if not work_code or not labourers:
+            skipped.append(row['path'])
+            continue
+        if row['panchayat'] not in scheme_names:
+            scheme_names[row['panchayat']] = scheme_index.codes_for(row['panchayat'])
+        group = groups.setdefault((row['date'], row['panchayat'], work_code), {})
+        # Ek kaam ki kai demand files me wahi labourer ho to MR me ek hi baar
+        for labourer in labourers:
+            group.setdefault(labourer['card'], labourer)
+    skipped.extend(row['path'] for row in rows[DEMAND_PRINT_LIMIT:])
+    if not groups:
+        flash("Saved demand files padhi nahi ja sakin.", "error")
+        return redirect(url_for('generate_muster_roll'))
+
+    locations = location_catalog.panchayats()
+    print_date = datetime.now().strftime('%d/%m/%Y')
+    common = {name: form.get(name, '').strip() for name in ('state', 'financial_year', 'agency', 'mate_name', 'end_date')}
+    rolls = []
+    for mr_no, ((day, panchayat, work_code), labourers) in zip(mr_numbers(form.get('mr_no', '').strip(), len(groups)),
+                                                              groups.items()):
+        district, block = locations.get(panchayat.lower(), ('', ''))
+        rolls.append(dict(common,
+            mr_no=mr_no, district=district, block=block, panchayat=panchayat,
+            work_name=scheme_names[panchayat].get(work_code) or 'Scheme Name Not Found (File missing in Public Data)',
+            work_code=work_code, tech_sanction_no='', tech_sanction_date='', fin_sanction_no='', fin_sanction_date='',
+            start_date=form.get('start_date', '').strip() or datetime.strptime(day, '%Y-%m-%d').strftime('%d/%m/%Y'),
+            print_date=print_date,
+            labourers=list(labourers.values())))
+    return render_template('muster_roll_preview.html', rolls=rolls, skipped=skipped)
+
 @app.route('/vendors', methods=['GET', 'POST'])
 def manage_vendors():
     conn = get_db_connection()
     if request.method == 'POST':
+        if get_vendor_by_name(conn, request.form['name']):
+            flash(f'Vendor "{request.form["name"]}" already exists.', 'error')
+            return redirect(url_for('manage_vendors'))
         try:
-            conn.execute('INSERT INTO vendors (name, gstin, address, bank_name, account_no, branch, ifsc, mobile, payid) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
-                         (request.form['name'], request.form['gstin'], request.form['address'], request.form['bank_name'], request.form['account_no'], 
-                          request.form['branch'], request.form['ifsc'], request.form['mobile'], request.form['payid']))
-            conn.commit()
+            with conn:
+                conn.execute(VENDOR_INSERT_SQL, vendor_form_values())
+                vendor_cache.invalidate(conn)
             flash('Vendor added successfully!', 'success')
         except sqlite3.IntegrityError: flash(f'Vendor "{request.form["name"]}" already exists.', 'error')
-        conn.close()
         return redirect(url_for('manage_vendors'))
     vendors = conn.execute('SELECT * FROM vendors ORDER BY name').fetchall()
-    conn.close()
     return render_template('vendors.html', vendors=vendors, prefill_name=request.args.get('name', ''), prefill_gstin=request.args.get('gstin', ''))
 
 @app.route('/edit_vendor/<int:vendor_id>', methods=['GET', 'POST'])
 def edit_vendor(vendor_id):
     conn = get_db_connection()
     if request.method == 'POST':
-        conn.execute('UPDATE vendors SET name = ?, gstin = ?, address = ?, bank_name = ?, account_no = ?, branch = ?, ifsc = ?, mobile = ?, payid = ? WHERE id = ?',
-                     (request.form['name'], request.form['gstin'], request.form['address'], request.form['bank_name'], request.form['account_no'],
-                      request.form['branch'], request.form['ifsc'], request.form['mobile'], request.form['payid'], vendor_id))
-        conn.commit()
-        conn.close()
+        existing = get_vendor_by_name(conn, request.form['name'])
+        if existing and existing['id'] != vendor_id:
+            flash(f'Vendor "{request.form["name"]}" already exists.', 'error')
+            return redirect(url_for('edit_vendor', vendor_id=vendor_id))
+        with conn:
+            conn.execute(VENDOR_UPDATE_SQL, vendor_form_values() + (vendor_id,))
+            vendor_cache.invalidate(conn)
         flash('Vendor updated successfully!', 'success')
         return redirect(url_for('manage_vendors'))
     
-    vendor = conn.execute('SELECT * FROM vendors WHERE id = ?', (vendor_id,)).fetchone()
-    conn.close()
+    vendor = get_vendor_by_id(conn, vendor_id)
     if vendor is None:
         flash('Vendor not found.', 'error')
         return redirect(url_for('manage_vendors'))
@@ -224,9 +541,13 @@ def edit_vendor(vendor_id):
 @app.route('/delete_vendor/<int:vendor_id>', methods=['POST'])
 def delete_vendor(vendor_id):
     conn = get_db_connection()
-    conn.execute('DELETE FROM vendors WHERE id = ?', (vendor_id,))
-    conn.commit()
-    conn.close()
+    vendor = get_vendor_by_id(conn, vendor_id)
+    if vendor is None:
+        flash('Vendor not found.', 'error')
+        return redirect(url_for('manage_vendors'))
+    with conn:
+        conn.execute(VENDOR_DELETE_SQL, (vendor_id,))
+        vendor_cache.invalidate(conn)
     flash('Vendor deleted successfully.', 'success')
     return redirect(url_for('manage_vendors'))
 
@@ -234,145 +555,178 @@ def delete_vendor(vendor_id):
 def scheme_list():
     return render_template('scheme_list.html')
 
-def parse_job_card_html(html_content):
+# --- BACKGROUND JOBS ---
+# Heavy routes `async=1` (form/query) ya `Prefer: respond-async` header par job id dete hain,
+# browser /api/jobs/<id> poll karke result download karta hai (30 s worker timeout se bachne ke liye)
+def wants_job():
+    return request.values.get('async') == '1' or 'respond-async' in request.headers.get('Prefer', '')
+
+def submit_job(kind, params, inputs=()):
+    """Queues a job (or joins an identical one) and answers 202 with its status URL."""
+    job_id, created = job_queue.submit(kind, params, inputs)
+    status_url = url_for('job_status', job_id=job_id)
+    response = jsonify({'status': 'success', 'job_id': job_id, 'status_url': status_url, 'coalesced': not created})
+    response.headers['Location'] = status_url
+    return response, 202
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    # 'status' baaki APIs ki tarah success/error; job ki haalat 'state' me (queued/running/done/failed)
+    job['state'] = job.pop('status')
+    job['fraction'] = round(job['done'] / job['total'], 4) if job['total'] else None
+    if job['state'] == 'done':
+        job['download_url'] = url_for('job_download', job_id=job_id)
+    return jsonify(dict(job, status='success'))
+
+@app.route('/api/jobs/<job_id>/download')
+def job_download(job_id):
+    result = job_queue.result(job_id)
+    if result is None:
+        return jsonify({'status': 'error', 'message': 'Result not ready'}), 404
+    path, filename, mimetype = result
+    return send_file(path, mimetype=mimetype, as_attachment=True, download_name=filename)
+
+def parse_job_card_files(contents, progress=None):
+    """
+    parse_job_card_html over many uploaded pages, one after another in this
+    thread. Parser ab sasta hai; har request par naya fork kiya hua process
+    pool (job threads ke beech) mehenga aur risky tha.
+    """
+    results = []
+    for content in contents:
+        with metrics.timer('parse_job_card_html'):
+            results.append(parse_job_card_html(content))
+        if progress:
+            progress(len(results), len(contents))
+    return results
+
+def applicant_list_output(filenames, results, user_panchayat_name):
     """
-    Helper function to parse HTML, extract job card data, and the Panchayat name.
-    Returns a tuple: (data, panchayat_name, error_message)
+    (download name, mimetype, chunks, errors) for parsed register pages: one
+    CSV, or a ZIP of per-panchayat CSVs. ValueError if no page parsed.
     """
-    soup = BeautifulSoup(html_content, 'html.parser')
-    panchayat_name = "default_panchayat"  # Default name if not found
+    # Panchayat wise group (same panchayat ki kai files ek hi CSV me)
+    groups = OrderedDict()
+    errors = []
+    for filename, (data, detected_panchayat_name, error_message) in zip(filenames, results):
+        if error_message:
+            errors.append((filename, error_message))
+            continue
+        groups.setdefault(detected_panchayat_name, []).extend(data)
 
-    # Final, more robust method to find the Panchayat name
-    try:
-        # Find the <b> tag that specifically contains the word "Panchayat"
-        panchayat_b_tag = soup.find('b', string='Panchayat')
-        if panchayat_b_tag:
-            # The full text, including the name, is in the parent <td> tag
-            full_text = panchayat_b_tag.parent.get_text(strip=True)
-            # The text can look like: "Panchayat(note...): Burkundi"
-            # We split by the colon and take the last part, which is the actual name
-            if ':' in full_text:
-                panchayat_name = full_text.split(':')[-1].strip()
-    except Exception:
-        # If any error occurs, we'll gracefully fall back to the default name
-        pass
-
-    # Find the main data table
-    data_table = soup.find('table', {
-        'border': '1',
-        'width': '100%',
-        'bgcolor': 'Floralwhite',
-        'style': 'border-collapse:collapse',
-        'bordercolor': '#111111'
-    })
-    
-    if not data_table:
-        return None, None, "Could not find the data table on the page. The page structure might have changed."
+    if not groups:
+        raise ValueError(errors[0][1] if len(errors) == 1 else " | ".join(f"{name}: {msg}" for name, msg in errors))
 
-    data_to_csv = []
-    rows = data_table.find_all('tr')
-    
-    for row in rows:
-        cells = row.find_all('td')
-        if len(cells) >= 9 and "Villages" not in row.get_text():
-            try:
-                applicant_name = cells[3].get_text(strip=True)
-                job_card_no = cells[8].get_text(strip=True)
-                
-                if applicant_name and job_card_no and applicant_name not in ["Name of Applicant", "4"]:
-                    data_to_csv.append([applicant_name, job_card_no])
-            except IndexError:
-                continue
-    
-    if not data_to_csv:
-        return None, None, "No data could be extracted. Please ensure the file contains data in the expected format."
-        
-    return data_to_csv, panchayat_name, None
+    if len(groups) == 1:
+        detected_panchayat_name, data = next(iter(groups.items()))
+        # Use user-provided name if available, otherwise use detected name
+        panchayat_name = user_panchayat_name or detected_panchayat_name
+
+        # Create dynamic filename as requested
+        filename = f"{panchayat_name}_jobcard.csv"
+        return filename, "text/csv", iter_csv_chunks(['Name of Applicant', 'Job Card Number'], data), errors
+
+    # Alag-alag panchayats: har ek ki CSV ek ZIP me
+    members = [(f"{name}_jobcard.csv", iter_csv_chunks(['Name of Applicant', 'Job Card Number'], data))
+               for name, data in groups.items()]
+    if errors:
+        members.append(("errors.txt", iter(["".join(f"{name}: {msg}\n" for name, msg in errors)])))
+    filename = f"jobcards_{datetime.now(IST).strftime('%Y%m%d_%H%M%S')}.zip"
+    return filename, "application/zip", iter_zip_chunks(members), errors
+
+@job_queue.handler('applicant_list')
+def applicant_list_job(job):
+    contents = []
+    for _, path in job.inputs:
+        with open(path, 'rb') as f:
+            contents.append(f.read())
+    job.progress(0, len(contents), 'Parsing register pages', force=True)
+    results = parse_job_card_files(contents, progress=job.progress)
+    try:
+        filename, mimetype, chunks, errors = applicant_list_output([name for name, _ in job.inputs], results,
+                                                                   job.params.get('panchayat', ''))
+    except ValueError as e:
+        raise JobError(str(e))
+    job.write_result(chunks)
+    job.progress(len(contents), len(contents), f'{len(errors)} file(s) skipped' if errors else None, force=True)
+    return filename, mimetype
 
 
 @app.route('/applicant-list', methods=['GET', 'POST'])
 def applicant_list():
     if request.method == 'POST':
-        uploaded_file = request.files.get('html_file')
+        uploaded_files = [f for f in request.files.getlist('html_file') if f and f.filename]
         user_panchayat_name = request.form.get('panchayat', '').strip()
 
-        if not uploaded_file or uploaded_file.filename == '':
+        if not uploaded_files:
             flash('Please upload an HTML file.', 'error')
             return redirect(url_for('applicant_list'))
 
-        html_content = uploaded_file.read()
-        data, detected_panchayat_name, error_message = parse_job_card_html(html_content)
-        
-        if error_message:
-            flash(error_message, 'error')
-            return redirect(url_for('applicant_list'))
-
-        # Use user-provided name if available, otherwise use detected name
-        if user_panchayat_name:
-            panchayat_name = user_panchayat_name
-        else:
-            panchayat_name = detected_panchayat_name
+        if wants_job():
+            return submit_job('applicant_list', {'panchayat': user_panchayat_name},
+                              [(f.filename, f.stream) for f in uploaded_files])
 
-        # Generate CSV in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['Name of Applicant', 'Job Card Number'])
-        writer.writerows(data)
-        output.seek(0)
+        results = parse_job_card_files([f.read() for f in uploaded_files])
+        try:
+            filename, mimetype, chunks, errors = applicant_list_output(
+                [f.filename for f in uploaded_files], results, user_panchayat_name)
+        except ValueError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('applicant_list'))
 
-        # Create dynamic filename as requested
-        filename = f"{panchayat_name}_jobcard.csv"
-        
-        return Response(
-            output,
-            mimetype="text/csv",
-            headers={"Content-Disposition": f"attachment;filename={filename}"}
-        )
+        headers = {"Content-Disposition": f"attachment;filename={filename}"}
+        if errors:
+            headers['X-Files-Skipped'] = str(len(errors))
+        return Response(chunks, mimetype=mimetype, headers=headers)
 
     return render_template('applicant_list.html')
 
-def parse_work_codes(text):
-    """
-    Helper function to parse text and extract NREGA work codes.
-    Uses the pattern from the desktop app.
-    """
-    # Regex to find codes like 3422003014/RC/7080901347787
-    pattern = re.compile(r'\b(34\d{8}(?:/\w+)+/\d+)\b')
-    work_codes = pattern.findall(text)
-    return list(dict.fromkeys(work_codes)) # Return unique codes
-
 @app.route('/allocation-list', methods=['GET', 'POST'])
 def allocation_list():
     if request.method == 'POST':
-        text_data = request.form.get('text_data')
         panchayat_name = request.form.get('panchayat', 'extracted').strip()
+        with_scheme = request.form.get('with_scheme') in ('1', 'on', 'true')
 
-        if not text_data:
-            flash('Please paste some text to extract codes.', 'error')
-            return redirect(url_for('allocation_list'))
+        # Paste ya file (text / HTML / CSV dump); file chunk-by-chunk scan hoti hai
+        upload = request.files.get('text_file')
+        if upload and upload.filename:
+            text_data = iter_text_chunks(upload.stream, close=True)
+            upload.stream = io.BytesIO()  # asli handle generator band karega (response stream hote waqt)
+        else:
+            text_data = request.form.get('text_data')
+            if not text_data:
+                flash('Please paste some text or upload a file to extract codes.', 'error')
+                return redirect(url_for('allocation_list'))
 
-        work_codes = parse_work_codes(text_data)
+        work_codes = iter_work_codes(text_data)
+        first_code = next(work_codes, None)
         
-        if not work_codes:
+        if first_code is None:
             flash('No work codes found in the provided text.', 'warning')
             return redirect(url_for('allocation_list'))
+        work_codes = itertools.chain([first_code], work_codes)
 
         if not panchayat_name:
             panchayat_name = "extracted"
 
-        # Generate CSV in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['Work Code'])
-        # Write each code as a new row
-        writer.writerows([[code] for code in work_codes])
-        output.seek(0)
+        if with_scheme:
+            # Panchayat ki scheme files ka code -> naam ek baar, phir har code par sirf dict lookup
+            scheme_names = scheme_index.codes_for(panchayat_name) or scheme_index.codes_for('')
+            header = ['Work Code', 'Scheme Name']
+            rows = ([code, scheme_names.get(code, '')] for code in work_codes)
+        else:
+            header = ['Work Code']
+            # Write each code as a new row
+            rows = ([code] for code in work_codes)
 
         # Create dynamic filename
         filename = f"{panchayat_name}_workcodes.csv"
         
         return Response(
-            output,
+            stream_with_context(iter_csv_chunks(header, rows)),
             mimetype="text/csv",
             headers={"Content-Disposition": f"attachment;filename={filename}"}
         )
@@ -384,82 +738,52 @@ def contractor_list():
     """Renders the new tool page for filtering applicant lists."""
     return render_template('contractor_list.html')
 
+@job_queue.handler('scheme_extractor')
+def scheme_extractor_job(job):
+    _, path = job.inputs[0]
+    total = os.path.getsize(path)
+    count = 0
+    with open(path, 'rb') as f:
+        def rows():
+            nonlocal count
+            for row in iter_schemes(iter_text_chunks(f)):
+                count += 1
+                if count % 1000 == 0:
+                    job.progress(f.tell(), total, f'{count} schemes')
+                yield row
+        job.write_result(iter_csv_chunks(['Work Name', 'Work Code'], rows()))
+    job.progress(total, total, f'{count} schemes', force=True)
+    return f"{job.params['panchayat']}_schemes.csv", "text/csv"
+
 @app.route('/scheme-extractor', methods=['GET', 'POST'])
 def scheme_extractor():
     if request.method == 'POST':
-        raw_text = request.form.get('raw_text', '')
-        panchayat_name = request.form.get('panchayat', 'Scheme_List')
-        
-        data = []
-        
-        # 1. Updated Code Pattern (Handles 'IAY' and standard codes)
-        # यह पैटर्न (.../IF/IAY/...) और (.../IF/...) दोनों को पकड़ लेगा
-        code_pattern = r'\((?P<code>\d+/[A-Z]+/(?:[A-Z]+/)?\w+)\)'
-        
-        segments = re.split(code_pattern, raw_text)
-        
-        # 2. Comprehensive Garbage Markers (Categories + Headers + Status)
-        # ये वो शब्द हैं जो Name में नहीं आने चाहिए
-        categories = [
-            r'Works on Individuals Land(?:\s*\(Category [IVX]+\))?',
-            r'Anganwadi/Other Rural Infrastructure',
-            r'Coastal Areas',
-            r'Drought Proofing',
-            r'Rural Drinking Water',
-            r'Food Grain',
-            r'Flood Control and Protection',
-            r'Fisheries',
-            r'Micro Irrigation Works',
-            r'Provision of Irrigation facility[^0-9]+', # Long category name handle
-            r'Land Development',
-            r'Other Works',
-            r'Play Ground',
-            r'Rural Connectivity',
-            r'Rural Sanitation',
-            r'Bharat Nirman Sewa Kendra',
-            r'Water Conservation and Water Harvesting',
-            r'Renovation of traditional water bodies'
-        ]
-        
-        # Add Header columns and Status keywords
-        garbage_markers = categories + [
-            r'On Going', r'Completed', r'Approved', r'Suspended', r'New',
-            r'\d{4}-\d{4}', # Financial Year (e.g. 2024-2025)
-            r'Asset Id', r'Priority', r'Work Category', r'S No\.', # Header columns
-            r'Financial Year', r'Work Status'
-        ]
-        
-        garbage_pattern = '|'.join(garbage_markers)
-        
-        # Loop through segments (Code is always at odd index: 1, 3, 5...)
-        for i in range(1, len(segments), 2):
-            code = segments[i]
-            raw_chunk = segments[i-1] # Code से पहले का टेक्स्ट
-            
-            # 3. Cleaning Logic
-            # Garbage markers से split करें और सबसे आखिरी हिस्सा (Last Part) उठाएं, 
-            # क्योंकि Work Name हमेशा इन सबके बाद होता है।
-            parts = re.split(garbage_pattern, raw_chunk, flags=re.IGNORECASE)
-            
-            if parts:
-                potential_name = parts[-1]
-                
-                # Starting में अगर कोई नंबर या सिंबल है तो उसे हटाएं
-                # यह Priority और Serial No (जैसे 2092) को हटा देगा जो नाम के साथ चिपके होते हैं
-                clean_name = re.sub(r'^[\s\d\.\-\)]+', '', potential_name).strip()
-                
-                # अगर नाम बहुत छोटा नहीं है, तो लिस्ट में जोड़ें
-                if clean_name and len(clean_name) > 2:
-                    data.append([clean_name, code])
-        
-        # Create CSV Output
-        si = io.StringIO()
-        cw = csv.writer(si)
-        cw.writerow(['Work Name', 'Work Code'])
-        cw.writerows(data)
-        
+        panchayat_name = request.form.get('panchayat', '') or request.args.get('panchayat', 'Scheme_List')
+
+        upload = request.files.get('raw_file')
+        if wants_job():
+            if upload and upload.filename:
+                source = upload.stream
+            elif request.mimetype == 'text/plain':
+                source = request.stream
+            else:
+                source = request.form.get('raw_text', '')
+            return submit_job('scheme_extractor', {'panchayat': panchayat_name}, [('raw_text', source)])
+
+        # Text 3 tarah se aa sakta hai: uploaded file, raw text/plain body, ya textarea
+        if upload and upload.filename:
+            # Request khatam hote hi Flask uploaded files band kar deta hai; response abhi stream ho raha hoga,
+            # isliye temp file ka handle generator ko de dete hain (wahi band karega)
+            text = iter_text_chunks(upload.stream, close=True)
+            upload.stream = io.BytesIO()
+        elif request.mimetype == 'text/plain':
+            text = iter_text_chunks(request.stream)
+        else:
+            text = request.form.get('raw_text', '')
+
+        # (Work Name, Work Code) rows ek hi scan me nikal kar seedha CSV stream
         return Response(
-            si.getvalue(),
+            stream_with_context(iter_csv_chunks(['Work Name', 'Work Code'], iter_schemes(text))),
             mimetype="text/csv",
             headers={"Content-disposition": f"attachment; filename={panchayat_name}_schemes.csv"}
         )
@@ -514,30 +838,39 @@ def save_demand_api():
         # FIX: Using IST for Date and Time
         now_ist = datetime.now(IST)
         today_date = now_ist.strftime('%Y-%m-%d')
-        
+
         # FIX: Ensure Panchayat name is safe and not empty
         safe_panchayat = "".join(c for c in panchayat if c.isalnum() or c in (' ', '_')).strip()
         if not safe_panchayat: 
             safe_panchayat = "Unknown"
         
-        target_dir = os.path.join(DEMAND_SAVE_DIR, today_date, safe_panchayat)
-        if not os.path.exists(target_dir):
-            os.makedirs(target_dir)
-
-        # Filename with IST timestamp
+        # Filename with IST timestamp; usi second me doosra save _2, _3... ban jata hai
         safe_code = "".join(c for c in work_code if c.isalnum() or c in (' ', '_')).strip()[-6:]
         timestamp = now_ist.strftime('%H%M%S')
-        filename = f"Demand_{safe_code}_{timestamp}.csv"
-        file_path = os.path.join(target_dir, filename)
-        
-        # Write CSV
-        with open(file_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['Name of Applicant', 'Job card number', 'Allocation Work Code'])
-            for lab in labourers:
-                writer.writerow([lab['name'], lab['card'], work_code])
-                
-        return jsonify({'status': 'success', 'message': f'Saved to {today_date}/{safe_panchayat}/{filename}'})
+
+        # Check aur save ek hi DB write lock me: do workers same job cards alag work codes par ek saath save na kar payein
+        with demand_manifest.save_lock():
+            # Pre-save duplicate check: wahi job card aaj kisi dusre work code par already demand hua ho.
+            # 'force' (auto-save on print) save kar deta hai, conflicts sirf response me report hote hain.
+            conflicts = demand_manifest.conflicts([lab.get('card') for lab in labourers], today_date, today_date, work_code)
+            if conflicts and not req_data.get('force'):
+                cards = sorted({c['card'] for c in conflicts})
+                return jsonify({'status': 'conflict',
+                                'message': f"{len(cards)} job card(s) already demanded today on another work code: {', '.join(cards[:10])}",
+                                'conflicts': conflicts}), 409
+
+            file_path = demand_writer.save(today_date, safe_panchayat, f"Demand_{safe_code}_{timestamp}",
+                                           ['Name of Applicant', 'Job card number', 'Allocation Work Code'],
+                                           ([lab['name'], lab['card'], work_code] for lab in labourers))
+            filename = os.path.basename(file_path)
+            try:
+                demand_manifest.record_save(file_path, work_code, [lab['card'] for lab in labourers])
+            except sqlite3.Error as e:
+                # File disk par aa chuki hai; 500 dene par retry _2 duplicate banata. Manifest baad me reconcile hoga.
+                app.logger.warning('Demand %s saved but not indexed (%s); manifest marked for reconcile', file_path, e)
+                demand_manifest.mark_stale()
+
+        return jsonify({'status': 'success', 'message': f'Saved to {today_date}/{safe_panchayat}/{filename}', 'conflicts': conflicts})
         
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -566,6 +899,7 @@ def toggle_status():
             
         new_full_path = os.path.join(directory, new_filename)
         os.rename(full_path, new_full_path)
+        demand_manifest.record_rename(full_path, new_full_path)
         
         return jsonify({'status': 'success', 'is_done': is_done, 'new_filename': new_filename})
     except Exception as e:
@@ -585,6 +919,7 @@ def delete_file():
 
         if os.path.exists(full_path):
             os.remove(full_path)
+            demand_manifest.record_delete([full_path])
             return jsonify({'status': 'success', 'message': 'Deleted'})
         else:
             return jsonify({'status': 'error', 'message': 'File not found'}), 404
@@ -599,57 +934,159 @@ def downloads():
         flash("Access Restricted: Please login to view saved files.", "warning")
         return redirect(url_for('admin_login'))
 
-    files_list = []
-    
-    # Files collect karna (Purana logic same hai)
-    for root, dirs, files in os.walk(DEMAND_SAVE_DIR):
-        for file in files:
-            if file.endswith('.csv'):
-                full_path = os.path.join(root, file)
-                rel_path = os.path.relpath(full_path, DEMAND_SAVE_DIR)
-                path_parts = rel_path.replace('\\', '/').split('/')
-                
-                date_folder = path_parts[0] if len(path_parts) > 0 else "Unknown"
-                panchayat_folder = path_parts[1] if len(path_parts) > 1 else "Unknown"
-                
-                is_done = file.startswith('DONE_')
-                display_name = file.replace('DONE_', '', 1) if is_done else file
-                
-                timestamp = os.path.getmtime(full_path)
-                file_dt_utc = datetime.fromtimestamp(timestamp, timezone.utc)
-                file_dt_ist = file_dt_utc.astimezone(IST)
-                
-                files_list.append({
-                    'filename': display_name,
-                    'real_filename': file,
-                    'date': date_folder,
-                    'panchayat': panchayat_folder,
-                    'time': file_dt_ist.strftime('%I:%M %p'),
-                    'path': os.path.relpath(full_path, 'static').replace('\\', '/'),
-                    'timestamp': timestamp,
-                    'is_done': is_done
-                })
+    # Filters + pagination seedha demand_files index se (har page view par os.walk nahi)
+    filters = {
+        'date': request.args.get('date', '').strip(),
+        'panchayat': request.args.get('panchayat', '').strip(),
+        'status': request.args.get('status', '').strip(),
+    }
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = 20  # Ek page par kitni files dikhengi
 
-    # Sorting (Newest First)
-    files_list.sort(key=lambda x: x['timestamp'], reverse=True)
+    # 'after' = pichle page ki last file ka "mtime|path" (keyset cursor); na ho to page number se offset
+    after = None
+    cursor = request.args.get('after', '')
+    if '|' in cursor:
+        mtime, _, last_path = cursor.partition('|')
+        try:
+            after = (float(mtime), last_path)
+        except ValueError:
+            after = None
 
-    # 2. Pagination Logic
-    page = request.args.get('page', 1, type=int)
-    per_page = 20  # Ek page par kitni files dikhengi
-    total_files = len(files_list)
-    total_pages = math.ceil(total_files / per_page)
-    
-    # Slice list for current page
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated_files = files_list[start:end]
+    # Pehle yahan os.walk ka timer hota; ab manifest query hi downloads ka hot path hai
+    with metrics.timer('downloads_manifest_query'):
+        total_files = demand_manifest.count(filters)
+        total_pages = math.ceil(total_files / per_page)
+        rows = demand_manifest.page(filters, per_page=per_page, after=after, offset=(page - 1) * per_page)
+
+    files_list = []
+    for row in rows:
+        file_dt_ist = datetime.fromtimestamp(row['mtime'], timezone.utc).astimezone(IST)
+        files_list.append({
+            'filename': row['filename'],
+            'real_filename': row['real_filename'],
+            'date': row['date'],
+            'panchayat': row['panchayat'],
+            'time': file_dt_ist.strftime('%I:%M %p'),
+            'path': row['path'],
+            'timestamp': row['mtime'],
+            'is_done': bool(row['is_done'])
+        })
+    next_cursor = f"{rows[-1]['mtime']!r}|{rows[-1]['path']}" if len(rows) == per_page else None
 
     return render_template('downloads.html', 
-                           files=paginated_files, 
+                           files=files_list, 
                            page=page, 
                            total_pages=total_pages,
-                           total_files=total_files)
+                           total_files=total_files,
+                           filters={k: v for k, v in filters.items() if v},
+                           next_cursor=next_cursor,
+                           dates=demand_manifest.distinct('date'),
+                           panchayats=demand_manifest.distinct('panchayat'),
+                           locations=location_catalog.structure())
+
+
+# --- Daily consolidated export: har (date, panchayat) ki ek merged CSV, ek streamed ZIP me ---
+def select_demand_rows(args):
+    """
+    Manifest rows picked by the /downloads export form (from/to dates,
+    district, block, panchayat, skip_done). Returns (date_from, date_to,
+    district, block, rows); ValueError on a bad date.
+    """
+    today = datetime.now(IST).strftime('%Y-%m-%d')
+    date_from = args.get('from', '').strip() or today
+    date_to = args.get('to', '').strip() or date_from
+    datetime.strptime(date_from, '%Y-%m-%d')
+    datetime.strptime(date_to, '%Y-%m-%d')
+    district = args.get('district', '').strip()
+    block = args.get('block', '').strip()
+    panchayat = args.get('panchayat', '').strip()
+    skip_done = args.get('skip_done') in ('1', 'on', 'true')
+
+    # District/Block filter: panchayat ka location public_data ki file names se aata hai
+    locations = location_catalog.panchayats() if (district or block) else {}
+    rows = []
+    for row in demand_manifest.select(date_from, date_to, pending_only=skip_done):
+        if panchayat and row['panchayat'] != panchayat:
+            continue
+        if district or block:
+            location = locations.get(row['panchayat'].lower())
+            if location is None or (district and location[0] != district) or (block and location[1] != block):
+                continue
+        rows.append(row)
+    return date_from, date_to, district, block, rows
 
+@app.route('/downloads/export')
+def export_demands():
+    if not session.get('admin_logged_in'):
+        flash("Access Restricted: Please login to view saved files.", "warning")
+        return redirect(url_for('admin_login'))
+
+    try:
+        date_from, date_to, district, block, rows = select_demand_rows(request.args)
+    except ValueError:
+        flash("Date YYYY-MM-DD format me dein.", "error")
+        return redirect(url_for('downloads'))
+
+    groups = OrderedDict()
+    for row in rows:
+        groups.setdefault((row['date'], row['panchayat']), []).append(
+            os.path.join(app.root_path, 'static', row['path']))
+
+    if not groups:
+        flash("Is date range/filter me koi demand file nahi mili.", "warning")
+        return redirect(url_for('downloads'))
+
+    # Saare groups pehle scan (header check) ho jaate hain, taaki error ZIP shuru hone se pehle mile
+    members = []
+    try:
+        for (date, panchayat), paths in groups.items():
+            header, rows = merge_demand_files(paths, allow_empty=True)
+            if header:
+                members.append((f"{date}/{panchayat}.csv", iter_csv_chunks(header, rows)))
+    except DemandMergeError as e:
+        flash(f"{date} / {panchayat}: {e}", "error")
+        return redirect(url_for('downloads'))
+
+    name_parts = [date_from if date_from == date_to else f"{date_from}_to_{date_to}", district, block]
+    final_filename = "Demands_" + "_".join("".join(c for c in part if c.isalnum() or c in ('-', '_')) for part in name_parts if part) + ".zip"
+    return Response(
+        iter_zip_chunks(members),
+        mimetype='application/zip',
+        headers={"Content-Disposition": f"attachment;filename={final_filename}"}
+    )
+
+# Date window me ek hi din do work codes par demand hue job cards
+@app.route('/api/demand-overlaps')
+def demand_overlaps():
+    if not session.get('admin_logged_in'):
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    date_from = request.args.get('from', '').strip() or datetime.now(IST).strftime('%Y-%m-%d')
+    date_to = request.args.get('to', '').strip() or date_from
+    overlaps = demand_manifest.overlaps(date_from, date_to)
+    return jsonify({'status': 'success', 'from': date_from, 'to': date_to, 'count': len(overlaps), 'overlaps': overlaps})
+
+@app.cli.command('reconcile-demands')
+def reconcile_demands_command():
+    """Rebuilds the saved-demand manifest from the files on disk."""
+    updated, removed, total = demand_manifest.reconcile()
+    demand_writer.cleanup()
+    print(f"Demand manifest: {updated} added/updated, {removed} removed, {total} files on disk.")
+
+@app.cli.command('build-snapshots')
+def build_snapshots_command():
+    """Builds the snapshots of all public jobcard / scheme CSVs (gunicorn.conf.py runs this at startup)."""
+    built, files = public_snapshots.warm(PUBLIC_DATA_DIR)
+    print(f"Public data snapshots: {built} built, {files} jobcard/scheme files.")
+
+@app.route('/admin/reconcile-demands', methods=['POST'])
+def reconcile_demands():
+    if not session.get('admin_logged_in'):
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    with metrics.timer('demand_manifest_reconcile'):  # Demand Form ka os.walk
+        updated, removed, total = demand_manifest.reconcile()
+    demand_writer.cleanup()
+    return jsonify({'status': 'success', 'updated': updated, 'removed': removed, 'total': total})
 
 @app.route('/api/delete-multiple-files', methods=['POST'])
 def delete_multiple_files():
@@ -661,7 +1098,7 @@ def delete_multiple_files():
         if not paths: 
             return jsonify({'status': 'error', 'message': 'No files selected'}), 400
         
-        deleted_count = 0
+        deleted = []
         
         for rel_path in paths:
             # Security: Ensure path is valid
@@ -673,9 +1110,10 @@ def delete_multiple_files():
 
             if os.path.exists(full_path):
                 os.remove(full_path)
-                deleted_count += 1
+                deleted.append(full_path)
+        demand_manifest.record_delete(deleted)
         
-        return jsonify({'status': 'success', 'message': f'Deleted {deleted_count} files.'})
+        return jsonify({'status': 'success', 'message': f'Deleted {len(deleted)} files.'})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -689,14 +1127,15 @@ def merge_downloads():
         flash("Merge karne ke liye kam se kam 2 files select karein.", "warning")
         return redirect(url_for('downloads'))
 
-    merged_data = []
-    header = []
+    full_paths = []
     first_panchayat = None
     
     try:
-        for index, rel_path in enumerate(selected_files):
+        for rel_path in selected_files:
             # 1. Path Security & Construction
             full_path = os.path.join(app.root_path, 'static', rel_path)
+            if not os.path.abspath(full_path).startswith(os.path.abspath(DEMAND_SAVE_DIR)):
+                continue
             if not os.path.exists(full_path):
                 continue
 
@@ -711,91 +1150,71 @@ def merge_downloads():
                 # Agar Panchayat match nahi hui to error dekar rok do
                 flash(f"Error: Alag-alag Panchayats ('{first_panchayat}' aur '{current_panchayat}') merge nahi ho sakti.", "error")
                 return redirect(url_for('downloads'))
-            
-            # 3. Read File
-            with open(full_path, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                rows = list(reader)
-                
-                if not rows: continue
-                
-                # Header Handling: Sirf pehli file ka header lo
-                if index == 0:
-                    header = rows[0]
-                
-                # Data add karo (Header skip karke)
-                merged_data.extend(rows[1:])
-    
-        if not merged_data:
-            flash("Files khali hain ya data read nahi ho paaya.", "error")
-            return redirect(url_for('downloads'))
-
-        # 4. Sorting Logic (Allocation Work Code ke hisaab se)
-        try:
-            work_code_index = -1
-            for i, h in enumerate(header):
-                if "code" in h.lower() and "work" in h.lower():
-                    work_code_index = i
-                    break
-            
-            if work_code_index != -1:
-                merged_data.sort(key=lambda x: x[work_code_index])
-        except Exception:
-            pass
+            full_paths.append(full_path)
 
-        # 5. Filename Generation
         # Agar user ne naam diya hai to wo use karein, nahi to Panchayat ka naam default lein
         prefix = custom_prefix if custom_prefix else (first_panchayat or "Merged")
-        # Invalid characters hata kar filename safe banayein
-        safe_prefix = "".join(c for c in prefix if c.isalnum() or c in (' ', '_', '-')).strip()
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        final_filename = f"{safe_prefix}_{timestamp}.csv"
 
-        # 6. CSV Output
-        si = io.StringIO()
-        cw = csv.writer(si)
-        cw.writerow(header)
-        cw.writerows(merged_data)
-        
+        if wants_job():
+            # mtime/size bhi params me, taaki file badalne par purana merged result reuse na ho
+            stamps = [[os.path.getmtime(p), os.path.getsize(p)] for p in full_paths]
+            rel_paths = [os.path.relpath(p, os.path.join(app.root_path, 'static')) for p in full_paths]
+            return submit_job('merge_demands', {'files': rel_paths, 'stamps': stamps, 'prefix': prefix})
+
+        # 3. Header check + streaming k-way merge (Allocation Work Code ke hisaab se sorted)
+        header, rows = merge_demand_files(full_paths)
+
+        # 4. Filename Generation
+        final_filename = merged_filename(prefix)
+
+        # 5. CSV Output, rows seedha stream hoti hain (poora merge memory me nahi banta)
         return Response(
-            si.getvalue(),
+            iter_csv_chunks(header, rows),
             mimetype="text/csv",
             headers={"Content-Disposition": f"attachment;filename={final_filename}"}
         )
 
+    except DemandMergeError as e:
+        flash(str(e), "error")
+        return redirect(url_for('downloads'))
     except Exception as e:
         flash(f"Error merging files: {e}", "error")
         return redirect(url_for('downloads'))
 
+def merged_filename(prefix):
+    # Invalid characters hata kar filename safe banayein
+    safe_prefix = "".join(c for c in prefix if c.isalnum() or c in (' ', '_', '-')).strip()
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return f"{safe_prefix}_{timestamp}.csv"
+
+@job_queue.handler('merge_demands')
+def merge_demands_job(job):
+    full_paths = [os.path.join(app.root_path, 'static', rel_path) for rel_path in job.params['files']]
+    try:
+        header, rows = merge_demand_files(full_paths)
+    except (DemandMergeError, OSError) as e:
+        raise JobError(str(e))
+
+    count = 0
+    def counted():
+        nonlocal count
+        for row in rows:
+            count += 1
+            if count % 1000 == 0:
+                job.progress(count, message=f'{count} rows merged')
+            yield row
+    job.write_result(iter_csv_chunks(header, counted()))
+    job.progress(count, count, f'{count} rows merged', force=True)
+    return merged_filename(job.params['prefix']), "text/csv"
+
 # --- ADMIN & PRINT FEATURES ---
 
 # Helper function to find Scheme Name from Public Data using Work Code
+# Lookups go through the per-process scheme_index instead of walking public_data every time
+@metrics.timed('find_scheme_name_by_work_code')
 def find_scheme_name_by_work_code(panchayat, target_work_code):
     if not target_work_code: return None
-    
-    # Ensure PUBLIC_DATA_DIR is available
-    if not os.path.exists(PUBLIC_DATA_DIR): return None
-
-    # Search recursively in public_data directory
-    for root, dirs, files in os.walk(PUBLIC_DATA_DIR):
-        for file in files:
-            # Check if file looks like a scheme file for this panchayat
-            # e.g., "Palojori_schemes.csv" matches panchayat "Palojori"
-            if file.lower().endswith('.csv') and "schemes" in file.lower():
-                if panchayat.lower() in file.lower():
-                    try:
-                        with open(os.path.join(root, file), 'r', encoding='utf-8', errors='ignore') as f:
-                            reader = csv.reader(f)
-                            for row in reader:
-                                if len(row) >= 2:
-                                    # CSV Format: Scheme Name, Work Code
-                                    # Check if target code matches (trim spaces)
-                                    if target_work_code.strip() == row[1].strip(): 
-                                        return row[0].strip()
-                    except Exception:
-                        continue
-    return None
+    return scheme_index.lookup(panchayat, target_work_code)
 
 # 1. View/Print Saved Demand (Updated)
 # app.py (Partial Update for view_demand route)
@@ -820,18 +1239,8 @@ def view_demand():
         panchayat = path_parts[-2]
 
     # CSV Parsing Logic (Same as before)
-    labourers = []
-    work_code = ""
     try:
-        with open(full_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                name = row.get('Name of Applicant') or row.get('Name')
-                card = row.get('Job card number') or row.get('Job Card')
-                w_code = row.get('Allocation Work Code') or row.get('Work Code')
-                if w_code: work_code = w_code
-                if name and card:
-                    labourers.append({'sr': len(labourers) + 1, 'name': name, 'card': card})
+        work_code, labourers = read_demand_labourers(full_path)
     except Exception as e:
         return f"Error reading file: {e}"
 
@@ -851,6 +1260,66 @@ def view_demand():
     
     return render_template('demand_print.html', data=data)
 
+# 1b. Batch Print: /downloads ka selection (ya export form ke filters) ek hi document me
+DEMAND_PRINT_LIMIT = 500
+
+@app.route('/view-demand/batch', methods=['GET', 'POST'])
+def view_demand_batch():
+    if not session.get('admin_logged_in'):
+        flash("Access Restricted: Please login to view saved files.", "warning")
+        return redirect(url_for('admin_login'))
+
+    rel_paths = request.values.getlist('selected_files')
+    if not rel_paths:
+        try:
+            rel_paths = [row['path'] for row in select_demand_rows(request.values)[4]]
+        except ValueError:
+            flash("Date YYYY-MM-DD format me dein.", "error")
+            return redirect(url_for('downloads'))
+    if not rel_paths:
+        flash("Print ke liye koi demand file nahi mili.", "warning")
+        return redirect(url_for('downloads'))
+
+    demands, skipped = [], []
+    scheme_names = {}  # panchayat -> {work code: scheme name}, har panchayat ka ek hi lookup
+    printed_at = datetime.now().strftime('%d/%m/%Y %I:%M %p')
+    demand_root = os.path.abspath(DEMAND_SAVE_DIR)
+    for rel_path in rel_paths[:DEMAND_PRINT_LIMIT]:
+        full_path = os.path.abspath(os.path.join(app.root_path, 'static', rel_path))
+        if not full_path.startswith(demand_root + os.sep):
+            skipped.append(rel_path)
+            continue
+        try:
+            work_code, labourers = read_demand_labourers(full_path)
+        except (OSError, ValueError, csv.Error):
+            skipped.append(rel_path)
+            continue
+        panchayat = os.path.basename(os.path.dirname(full_path))
+        if panchayat not in scheme_names:
+            scheme_names[panchayat] = scheme_index.codes_for(panchayat)
+        demands.append({
+            'panchayat': panchayat,
+            'scheme_full_name': (scheme_names[panchayat].get(work_code) if work_code else None)
+                                or 'Scheme Name Not Found (File missing in Public Data)',
+            'work_code': work_code,
+            'date': printed_at,
+            'labourers': labourers,
+        })
+    skipped.extend(rel_paths[DEMAND_PRINT_LIMIT:])
+
+    if not demands:
+        flash("Selected demand files padhi nahi ja sakin.", "error")
+        return redirect(url_for('downloads'))
+
+    # Devanagari font / uharfbuzz na ho to PDF me Hindi toot jaata; tab bhi HTML print page
+    if request.values.get('format') == 'pdf' and hindi_pdf_available():
+        pdf_bytes = render_demands_pdf(demands)
+        filename = f"Demands_{datetime.now(IST).strftime('%Y%m%d_%H%M%S')}.pdf"
+        headers = {"Content-Disposition": f"attachment;filename={filename}", "Content-Length": str(len(pdf_bytes)),
+                   "X-Demands-Rendered": str(len(demands)), "X-Demands-Skipped": str(len(skipped))}
+        return Response(iter_pdf_chunks(pdf_bytes), mimetype='application/pdf', headers=headers)
+    return render_template('demand_print_batch.html', demands=demands, skipped=skipped)
+
 # 2. Admin Login
 @app.route('/admin/login', methods=['GET', 'POST'])
 def admin_login():
@@ -916,6 +1385,35 @@ def public_manager():
 
     return render_template('public_manager.html', items=items, current_path=current_rel_path, breadcrumbs=breadcrumbs)
 
+def save_public_upload(file, target_dir):
+    """
+    Saves one admin upload into public_data. Jobcard / scheme CSVs are parsed
+    first (header check, job card normalization) from a temp copy and only
+    replace the live file if they are valid; their snapshot is written right
+    away so no reader has to parse the CSV. Raises SnapshotError for a
+    rejected file.
+    """
+    filename = os.path.basename(file.filename)
+    final_path = os.path.join(target_dir, filename)
+    kind = snapshot_kind(filename)
+    if kind is None:
+        file.save(final_path)
+        return final_path
+
+    tmp_path = os.path.join(target_dir, f".{filename}.{os.getpid()}.upload")
+    file.save(tmp_path)
+    try:
+        parsed = public_snapshots.ingest(tmp_path, kind, strict=True)
+    except SnapshotError as e:
+        os.remove(tmp_path)
+        raise SnapshotError(f"{filename}: {e}")
+    os.replace(tmp_path, final_path)
+    try:
+        public_snapshots.build(final_path, kind, parsed)
+    except OSError:
+        pass  # cache likh na paaye to pehle read par ban jayega
+    return final_path
+
 # 4. Admin Actions (Upload, Create Folder, Delete)
 @app.route('/admin/action', methods=['POST'])
 def admin_action():
@@ -931,14 +1429,26 @@ def admin_action():
             folder_name = request.form.get('folder_name')
             if folder_name:
                 os.makedirs(os.path.join(target_dir, folder_name), exist_ok=True)
+                location_catalog.refresh(target_dir)
                 flash('Folder created!', 'success')
                 
         elif action == 'upload_file':
             files = request.files.getlist('files')
+            saved, rejected = 0, []
             for file in files:
                 if file and file.filename:
-                    file.save(os.path.join(target_dir, file.filename))
-            flash(f'{len(files)} files uploaded!', 'success')
+                    try:
+                        save_public_upload(file, target_dir)
+                        saved += 1
+                    except SnapshotError as e:
+                        rejected.append(str(e))
+            location_catalog.refresh(target_dir)
+            scheme_index.invalidate()
+            jobcard_store.invalidate(target_dir)
+            if saved:
+                flash(f'{saved} files uploaded!', 'success')
+            for message in rejected:
+                flash(f'Not uploaded: {message}', 'error')
             
         elif action == 'delete':
             item_path = request.form.get('item_path')
@@ -948,6 +1458,10 @@ def admin_action():
                 shutil.rmtree(full_item_path)
             else:
                 os.remove(full_item_path)
+            location_catalog.refresh(os.path.dirname(full_item_path))
+            scheme_index.invalidate(full_item_path)
+            jobcard_store.invalidate(full_item_path)
+            public_snapshots.invalidate(full_item_path)
             flash('Item deleted.', 'success')
             
     except Exception as e:
@@ -955,48 +1469,65 @@ def admin_action():
         
     return redirect(url_for('public_manager', path=current_path))
 
+@app.route('/admin/scheme-index-stats')
+def scheme_index_stats():
+    """Hit/miss counters of this worker's scheme index."""
+    if not session.get('admin_logged_in'):
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    return jsonify(scheme_index.stats())
+
 # --- PUBLIC FILE MANAGER LOGIC ---
 # Use absolute path to ensure it works correctly in all environments
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PUBLIC_DATA_DIR = os.path.join(BASE_DIR, 'static', 'public_data')
 
+# District -> Block -> files catalog, ek baar walk hota hai phir admin_action / folder mtime se patch
+location_catalog = LocationCatalog(PUBLIC_DATA_DIR)
+
+# get-file ke liye gzip/brotli copies (public_data ke bahar, taaki listing me na dikhein)
+compressed_sidecars = CompressedSidecars(os.path.join(BASE_DIR, 'cache', 'compressed'))
+
+# Jobcard / scheme CSVs ke columnar snapshots, upload par bante hain (mmap se padhe jaate hain)
+public_snapshots = PublicSnapshots(os.path.join(BASE_DIR, 'cache', 'snapshots'))
+
+# Parsed jobcard CSVs (columnar), contractor list ke paginated API ke liye
+jobcard_store = JobcardStore(snapshots=public_snapshots)
+
+# Work Code -> Scheme Name index (har worker ka apna, files ke mtime/size se refresh hota hai)
+scheme_index = SchemeIndex(PUBLIC_DATA_DIR, catalog=location_catalog, snapshots=public_snapshots)
+
 @app.route('/api/public/locations', methods=['GET'])
 def get_public_locations():
     """Returns directory structure for Dropdowns (District -> Block -> Panchayat)"""
-    structure = {}
-    
     # Ensure directory exists
     if not os.path.exists(PUBLIC_DATA_DIR):
         try:
             os.makedirs(PUBLIC_DATA_DIR)
         except OSError:
             return jsonify({}) # Return empty if permission denied
-        
-    for root, dirs, files in os.walk(PUBLIC_DATA_DIR):
-        for file in files:
-            if file.endswith('.csv'):
-                try:
-                    # Get relative path from PUBLIC_DATA_DIR
-                    rel_path = os.path.relpath(os.path.join(root, file), PUBLIC_DATA_DIR)
-                    parts = rel_path.split(os.sep)
-                    
-                    # Expecting: District/Block/Filename.csv (Length >= 3)
-                    if len(parts) >= 3:
-                        district = parts[0]
-                        block = parts[1]
-                        filename = parts[-1]
-                        
-                        if district not in structure: structure[district] = {}
-                        if block not in structure[district]: structure[district][block] = []
-                        structure[district][block].append(filename)
-                except ValueError:
-                    continue
-                    
-    return Response(json.dumps(structure), mimetype='application/json')
 
-@app.route('/api/public/get-file', methods=['POST'])
+    # Body aur ETag pehle se bane hote hain; browser ke paas same copy ho to 304
+    with metrics.timer('public_locations_snapshot'):
+        body, etag = location_catalog.snapshot()
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def resolve_public_file(district, block, filename):
+    """Builds the absolute path of a public file; None if it escapes PUBLIC_DATA_DIR."""
+    if not district or not block or not filename:
+        return None
+    file_path = os.path.abspath(os.path.join(PUBLIC_DATA_DIR, district, block, filename))
+    if not file_path.startswith(os.path.abspath(PUBLIC_DATA_DIR) + os.sep):
+        return None
+    return file_path
+
+@app.route('/api/public/get-file', methods=['GET', 'POST'])
 def get_public_file():
     """Fetches content of a selected public file"""
+    if request.method == 'GET':
+        return stream_public_file()
+
     data = request.json
     district = data.get('district')
     block = data.get('block')
@@ -1013,6 +1544,117 @@ def get_public_file():
             content = f.read()
         return Response(json.dumps({'content': content}), mimetype='application/json')
     return Response("File not found", status=404)
+
+def stream_public_file():
+    """
+    GET mode of get-file: raw text/csv streamed from disk (or from a gzip/brotli
+    sidecar), with ETag/If-None-Match and Range handled by send_file.
+    """
+    file_path = resolve_public_file(request.args.get('district'), request.args.get('block'), request.args.get('filename'))
+    if file_path is None:
+        return Response("Access Denied", status=403)
+    if not os.path.isfile(file_path):
+        return Response("File not found", status=404)
+
+    st = os.stat(file_path)
+    base_etag = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+    for encoding in CompressedSidecars.encodings():
+        if request.accept_encodings[encoding] <= 0:
+            continue
+        sidecar = compressed_sidecars.get(file_path, encoding)
+        if sidecar:
+            response = send_file(sidecar, mimetype='text/csv', conditional=True, download_name=os.path.basename(file_path),
+                                 etag=f"{base_etag}-{encoding}", last_modified=st.st_mtime)
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+            return response
+
+    response = send_file(file_path, mimetype='text/csv', conditional=True,
+                         etag=base_etag, last_modified=st.st_mtime)
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.route('/api/public/jobcards', methods=['GET', 'POST'])
+def query_public_jobcards():
+    """
+    Paginated, filtered view of a public jobcard file for the contractor list.
+    Selected row ids come from the client (JSON body on POST) so the counters
+    match what the user has ticked.
+    """
+    params = request.json if request.method == 'POST' else request.args
+    params = params or {}
+    file_path = resolve_public_file(params.get('district'), params.get('block'), params.get('filename'))
+    if file_path is None:
+        return jsonify({'status': 'error', 'message': 'Access Denied'}), 403
+    table = jobcard_store.get(file_path)
+    if table is None:
+        return jsonify({'status': 'error', 'message': 'File not found'}), 404
+
+    try:
+        page = max(int(params.get('page', 1)), 1)
+        per_page = min(max(int(params.get('per_page', 50)), 1), 500)
+        if request.method == 'POST':
+            selected_ids = [int(i) for i in params.get('selected', [])]
+        else:
+            selected_ids = [int(i) for i in request.args.getlist('selected')]
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'Invalid page or selection'}), 400
+
+    result = table.query(village=params.get('village', 'all'), search=params.get('q', ''),
+                         page=page, per_page=per_page, selected_ids=selected_ids)
+    result['status'] = 'success'
+    return jsonify(result)
+
+@app.route('/api/public/jobcards/bulk-match', methods=['POST'])
+def bulk_match_public_jobcards():
+    """Server side of the contractor list's Bulk Select: resolves a pasted batch in one pass."""
+    params = request.json or {}
+    file_path = resolve_public_file(params.get('district'), params.get('block'), params.get('filename'))
+    if file_path is None:
+        return jsonify({'status': 'error', 'message': 'Access Denied'}), 403
+    table = jobcard_store.get(file_path)
+    if table is None:
+        return jsonify({'status': 'error', 'message': 'File not found'}), 404
+
+    # Same tokenizing as the textarea: spaces, commas, new lines
+    inputs = [s.strip() for s in re.split(r'[\s,]+', params.get('text', '')) if s.strip()]
+    if not inputs:
+        return jsonify({'status': 'error', 'message': 'Paste some job card numbers first.'}), 400
+
+    result = table.match(inputs, village=params.get('village', 'all'))
+    result['status'] = 'success'
+    return jsonify(result)
+
+@app.route('/api/public/labour-search', methods=['GET'])
+def search_public_labours():
+    """Ranked labour search for the demand form (same tiers as its in-browser search)."""
+    file_path = resolve_public_file(request.args.get('district'), request.args.get('block'), request.args.get('filename'))
+    if file_path is None:
+        return jsonify({'status': 'error', 'message': 'Access Denied'}), 403
+    table = jobcard_store.get(file_path)
+    if table is None:
+        return jsonify({'status': 'error', 'message': 'File not found'}), 404
+
+    limit = min(max(request.args.get('limit', 15, type=int), 1), 100)
+    index = table.search_index()
+    results = index.search(request.args.get('q', ''), limit=limit)
+    return jsonify({'status': 'success', 'total': len(index), 'results': results})
+
+@app.route('/api/public/labours', methods=['GET'])
+def list_public_labours():
+    """Demand form entries in file order from `start` (batch add, neighbour suggestions)."""
+    file_path = resolve_public_file(request.args.get('district'), request.args.get('block'), request.args.get('filename'))
+    if file_path is None:
+        return jsonify({'status': 'error', 'message': 'Access Denied'}), 403
+    table = jobcard_store.get(file_path)
+    if table is None:
+        return jsonify({'status': 'error', 'message': 'File not found'}), 404
+
+    start = max(request.args.get('start', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 20, type=int), 0), 500)
+    index = table.search_index()
+    return jsonify({'status': 'success', 'total': len(index), 'results': index.entries(start, limit)})
 # ---------------------------------
 
 if __name__ == '__main__':
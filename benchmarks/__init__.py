@@ -0,0 +1,7 @@
+"""
+Benchmarks for the parsers, public_data indexes and Demand Form paths, run on
+seeded synthetic NREGA fixtures. From the repo root:
+
+    python -m benchmarks --size small --output results.json
+    python -m benchmarks --baseline results.json        # flags regressions, exit code 1
+"""
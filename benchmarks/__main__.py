@@ -0,0 +1,52 @@
+import argparse
+import json
+import os
+import sys
+
+from benchmarks.runner import DEFAULT_THRESHOLD, compare, format_comparison, load_results, run_benchmarks, save_results
+from benchmarks.workloads import SIZES, WORKLOADS
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Nregabot-tools benchmarks')
+    parser.add_argument('--size', choices=list(SIZES), default='small')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per workload (median is compared)')
+    parser.add_argument('--only', action='append', metavar='GLOB', help='run only matching workloads, e.g. "demands.*"')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', help='results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='allowed slowdown / memory growth (0.25 = 25%%)')
+    parser.add_argument('--fixtures', default=os.path.join(BASE_DIR, 'cache', 'bench-fixtures'),
+                        help='where generated file trees are kept between runs')
+    parser.add_argument('--list', action='store_true', help='list workloads and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print('\n'.join(WORKLOADS))
+        return 0
+
+    results = run_benchmarks(args.size, args.seed, max(args.repeat, 1), args.only, args.fixtures,
+                             log=lambda line: print(line, file=sys.stderr))
+    if args.output:
+        save_results(results, args.output)
+
+    if args.baseline:
+        baseline = load_results(args.baseline)
+        if (baseline['meta'].get('size'), baseline['meta'].get('seed')) != (args.size, args.seed):
+            print(f"Baseline was run with size={baseline['meta'].get('size')} seed={baseline['meta'].get('seed')}; "
+                  f'numbers are not comparable.', file=sys.stderr)
+            return 2
+        rows, regressions = compare(results, baseline, args.threshold)
+        print(format_comparison(rows, regressions))
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) over {args.threshold:.0%}.')
+            return 1
+    elif not args.output:
+        print(json.dumps(results, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import csv
+import os
+import random
+from datetime import date, timedelta
+
+# Seeded fixtures jo asli NREGA dumps jaise dikhte hain. Same seed + size = same bytes,
+# taaki do runs (aur baseline) ek hi input par compare hon.
+
+FIRST_NAMES = ['RAJENDER', 'MIDO', 'SITA', 'RAM', 'SHYAM', 'SUNITA', 'BIRSA', 'SUKHDEV', 'USHA', 'GITA',
+               'राम', 'सीता', 'सुखदेव', 'उषा', 'गीता', 'बिरसा']
+LAST_NAMES = ['MANDAL', 'DEVI', 'KUMAR', 'MARANDI', 'RAI', 'HEMBROM', 'SOREN', 'YADAV',
+              'मंडल', 'देवी', 'मरांडी', 'राय', 'सोरेन']
+VILLAGES = ['Bhurkundi', 'Chalbali', 'Torojoria', 'Kasraydih', 'Palojori', 'Sarath', 'Karon', 'Madhupur']
+MATERIALS = ['Cement PPC 50kg', 'Sand (Cft)', 'Stone chips 20mm', 'Bricks', 'TMT Bar 8mm', 'Hume pipe 300mm',
+             'Mango sapling', 'Fencing pole', 'Barbed wire', 'Morrum (Cft)']
+WORKS = ['डोभा निर्माण', 'कूप निर्माण', 'आम बागवानी', 'Construction of Dobha', 'Pond digging at tola',
+         'PCC road from main road to school', 'Land levelling', 'Plantation on road side']
+SCHEME_CATEGORIES = ['Works on Individuals Land (Category IV)', 'Rural Connectivity', 'Land Development',
+                     'Water Conservation and Water Harvesting', 'Provision of Irrigation facility to Land owned by SC/ST ',
+                     'Rural Sanitation', 'Other Works']
+SCHEME_STATUSES = ['On Going', 'Completed', 'Approved', 'Suspended', 'New']
+WORK_TYPES = ['IF', 'WC', 'LD', 'RC', 'IF/IAY']
+DEMAND_HEADER = ['Name of Applicant', 'Job card number', 'Allocation Work Code']
+
+
+def _name(rng):
+    return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+
+def _job_card(rng, village=None):
+    village = rng.randint(1, 40) if village is None else village
+    return f'JH-22-003-{village:03d}-{rng.randint(1, 999):03d}/{rng.randint(1, 9)}'
+
+
+def work_code(rng, panchayat_code=3422003007):
+    return f'{panchayat_code}/{rng.choice(WORK_TYPES)}/{rng.randint(7080901000000, 7080909999999)}'
+
+
+def _work_name(rng):
+    return f'{rng.choice(VILLAGES)} ग्राम में {_name(rng)} के जमीन पर {rng.choice(WORKS)} {rng.randint(1, 99)}/{rng.randint(18, 25)}-{rng.randint(19, 26)}'
+
+
+# --- Bills ---
+
+def bill_text(rng, items=None):
+    """One pasted NREGA bill in the layout parse_bill expects."""
+    items = items if items is not None else rng.randint(2, 12)
+    lines = [
+        f'District:Deoghar Block:{rng.choice(VILLAGES)}',
+        f'Work : {_work_name(rng)} Work Code : {work_code(rng)}',
+        f'Bill No. : {rng.randint(1, 99999)} Bill Date : {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2019, 2025)}',
+        f'Vendor name{rng.choice(["MAA TARA TRADERS", "JAY AMBE ENTERPRISES", "SHREE GANESH SUPPLIERS"])}(TinNo-20ABCDE{rng.randint(1000, 9999)}F1Z5)',
+        'Material\tUnit Price\tQuantity\tAmount',
+    ]
+    subtotal = 0.0
+    for _ in range(items):
+        price, qty = round(rng.uniform(5, 900), 2), rng.randint(1, 400)
+        subtotal += price * qty
+        lines.append(f'{rng.choice(MATERIALS)}\t{price:.2f}\t{qty}\t{price * qty:.2f}')
+    gst = round(subtotal * 0.09, 2)
+    lines += ['Taxes', f'Centre GST 9%\t{gst:.2f}', f'State GST 9%\t{gst:.2f}',
+              f'Total Cash payment (In Rupees) {subtotal + 2 * gst:.2f}']
+    return '\n'.join(lines) + '\n'
+
+
+def bills(count, seed=0):
+    rng = random.Random(seed)
+    return [bill_text(rng) for _ in range(count)]
+
+
+def bill_dump(count, seed=0):
+    """Several bills pasted together with ---- separators (batch mode input)."""
+    return '\n-----\n'.join(bills(count, seed))
+
+
+# --- Jobcard register HTML ---
+
+def jobcard_html(rows, seed=0, panchayat='Burkundi'):
+    """Saved jobcard register page: header table with Panchayat + Floralwhite data table."""
+    rng = random.Random(seed)
+    out = ['<html><head><meta charset="utf-8"><title>Job Card Register</title>',
+           '<script>var cells = "<td>";</script></head><body>',
+           f'<table><tr><td><b>State</b>: JHARKHAND</td><td><b>District</b>: DEOGHAR</td>'
+           f'<td><b>Panchayat</b>(as per registration): {panchayat}</td></tr></table>',
+           '<table border="1" width="100%" bgcolor="Floralwhite" style="border-collapse:collapse" bordercolor="#111111">',
+           '<tr>' + ''.join(f'<td><b>{h}</b></td>' for h in ('S No', 'Village', 'Head of Household', 'Name of Applicant',
+                                                              'Gender', 'Age', 'Caste', 'Registration Date', 'Job card No.')) + '</tr>',
+           '<tr>' + ''.join(f'<td>{i}</td>' for i in range(1, 10)) + '</tr>\n']
+    village = 0
+    for i in range(rows):
+        if i % 200 == 0:
+            village += 1
+            out.append(f'<tr><td colspan="9"><b>Villages : {rng.choice(VILLAGES)}</b></td></tr>\n')
+        card = _job_card(rng, village)
+        cells = [str(i + 1), rng.choice(VILLAGES), _name(rng), _name(rng), rng.choice('MF'), str(rng.randint(18, 80)),
+                 rng.choice(['SC', 'ST', 'OBC', 'Others']), f'{rng.randint(1, 28):02d}/03/2010',
+                 f'<a href="jobcard.aspx?id={i}&amp;fin=2024">{card}</a>']
+        out.append('<tr>' + ''.join(f'<td><font size="2">{c}</font></td>' for c in cells) + '</tr>\n')
+    out.append('</table></body></html>')
+    return ''.join(out)
+
+
+# --- Scheme dumps / allocation text ---
+
+def scheme_dump(entries, seed=0):
+    """Copy-paste of the scheme list page: serial, category, status, year, name, (work code)."""
+    rng = random.Random(seed)
+    parts = ['S No. Priority Work Category Financial Year Work Status Asset Id\n']
+    for i in range(entries):
+        year = rng.randint(2018, 2025)
+        parts.append(f'{i + 1} {rng.randint(1, 300)} {rng.choice(SCHEME_CATEGORIES)} {year}-{year + 1} '
+                     f'{rng.choice(SCHEME_STATUSES)} {_work_name(rng)} ({work_code(rng)})\n')
+    return ''.join(parts)
+
+
+def allocation_text(codes, seed=0, repeat=0.2):
+    """Allocation list dump with `codes` work codes, some repeated, mixed with table noise."""
+    rng = random.Random(seed)
+    seen = []
+    parts = []
+    for i in range(codes):
+        if seen and rng.random() < repeat:
+            code = rng.choice(seen)
+        else:
+            code = work_code(rng)
+            seen.append(code)
+        parts.append(f'{i + 1}\t{_work_name(rng)}\t{code}\t{rng.randint(1, 50)} days\t{_name(rng)}\n')
+    return ''.join(parts)
+
+
+# --- public_data tree ---
+
+def public_data_tree(root, files, rows_per_file=200, seed=0):
+    """
+    District/Block/<Panchayat>_jobcard.csv + <Panchayat>_schemes.csv, `files` CSVs in
+    all. Returns the panchayat names written.
+    """
+    rng = random.Random(seed)
+    panchayats = []
+    per_block = 20
+    for n in range(max(files // 2, 1)):
+        district = f'District{n // (per_block * 10):03d}'
+        block = f'Block{n // per_block:04d}'
+        panchayat = f'Panchayat{n:05d}'
+        folder = os.path.join(root, district, block)
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f'{panchayat}_jobcard.csv'), 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Name of Applicant', 'Job Card Number'])
+            for _ in range(rows_per_file):
+                name = _name(rng) + ('*' if rng.random() < 0.05 else '')
+                writer.writerow([name, _job_card(rng)])
+        with open(os.path.join(folder, f'{panchayat}_schemes.csv'), 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Scheme Name', 'Work Code'])
+            for _ in range(max(rows_per_file // 4, 1)):
+                writer.writerow([_work_name(rng), work_code(rng, 3422003000 + n % 1000)])
+        panchayats.append(panchayat)
+    return panchayats
+
+
+def jobcard_csv(path, rows, seed=0):
+    """One big <Panchayat>_jobcard.csv for the JobcardTable / labour search workloads."""
+    rng = random.Random(seed)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Name of Applicant', 'Job Card Number'])
+        for _ in range(rows):
+            writer.writerow([_name(rng) + ('*' if rng.random() < 0.05 else ''), _job_card(rng)])
+
+
+# --- Demand Form tree ---
+
+def demand_tree(root, files, rows_per_file=10, days=30, panchayats=20, seed=0):
+    """
+    Demand Form/<date>/<panchayat>/Demand_<code>_<n>.csv with the header and
+    columns save_demand_api writes. Returns the list of paths.
+    """
+    rng = random.Random(seed)
+    start = date(2024, 4, 1)
+    paths = []
+    for i in range(files):
+        day = (start + timedelta(days=i % days)).isoformat()
+        panchayat = f'Panchayat{rng.randrange(panchayats):03d}'
+        folder = os.path.join(root, day, panchayat)
+        os.makedirs(folder, exist_ok=True)
+        code = work_code(rng)
+        path = os.path.join(folder, f"Demand_{code.replace('/', '_')}_{i:06d}.csv")
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(DEMAND_HEADER)
+            for _ in range(rng.randint(max(rows_per_file // 2, 1), rows_per_file * 3 // 2)):
+                writer.writerow([_name(rng), _job_card(rng), code])
+        paths.append(path)
+    return paths
@@ -0,0 +1,114 @@
+import fnmatch
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks.workloads import WORKLOADS, Context
+
+DEFAULT_THRESHOLD = 0.25    # 25% se zyada dheema / bhaari = regression
+MIN_TIME_DELTA = 0.005      # itne se chhote farak timer noise hain, flag nahi karte
+
+
+def _measure(run, repeat):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    # Peak memory alag run me, tracemalloc timing ko kaafi dheema kar deta hai
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def run_benchmarks(size='small', seed=0, repeat=3, only=None, fixtures_dir='cache/bench-fixtures', log=print):
+    """Runs every workload (or those matching the `only` glob patterns) and returns the results dict."""
+    ctx = Context(size, seed, fixtures_dir)
+    results = {}
+    try:
+        for name, factory in WORKLOADS.items():
+            if only and not any(fnmatch.fnmatch(name, pattern) for pattern in only):
+                continue
+            log(f'{name}: setup...')
+            run, items = factory(ctx)
+            times, peak = _measure(run, repeat)
+            median = statistics.median(times)
+            results[name] = {
+                'items': items,
+                'runs': [round(t, 6) for t in times],
+                'median_s': round(median, 6),
+                'min_s': round(min(times), 6),
+                'items_per_s': round(items / median, 1) if median else None,
+                'peak_bytes': peak,
+            }
+            log(f'{name}: {median * 1000:.1f} ms median, {peak / 1048576:.1f} MB peak, {items} items')
+    finally:
+        ctx.cleanup()
+    return {
+        'meta': {
+            'size': size,
+            'seed': seed,
+            'repeat': repeat,
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        },
+        'workloads': results,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares two results dicts workload by workload. Returns (rows, regressions);
+    each row is (name, metric, baseline, current, ratio).
+    """
+    rows, regressions = [], []
+    base = baseline.get('workloads', {})
+    for name, result in current.get('workloads', {}).items():
+        if name not in base:
+            continue
+        for metric, floor in (('median_s', MIN_TIME_DELTA), ('peak_bytes', 64 * 1024)):
+            old, new = base[name].get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            ratio = new / old
+            row = (name, metric, old, new, ratio)
+            rows.append(row)
+            if ratio > 1 + threshold and new - old > floor:
+                regressions.append(row)
+    return rows, regressions
+
+
+def format_comparison(rows, regressions):
+    flagged = set((name, metric) for name, metric, *_ in regressions)
+    lines = [f"{'workload':<34} {'metric':<11} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for name, metric, old, new, ratio in rows:
+        if metric == 'median_s':
+            old_text, new_text = f'{old * 1000:.1f} ms', f'{new * 1000:.1f} ms'
+        else:
+            old_text, new_text = f'{old / 1048576:.1f} MB', f'{new / 1048576:.1f} MB'
+        mark = '  REGRESSION' if (name, metric) in flagged else ''
+        lines.append(f'{name:<34} {metric:<11} {old_text:>12} {new_text:>12} {(ratio - 1) * 100:>+7.1f}%{mark}')
+    return '\n'.join(lines)
+
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_results(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
@@ -0,0 +1,241 @@
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+from collections import OrderedDict
+
+from demand_store import DemandManifest, DemandWriter, iter_csv_chunks, iter_zip_chunks, merge_demand_files
+from parsers import iter_schemes, iter_text_chunks, iter_work_codes, parse_bills, parse_job_card_html, parse_nrega_data
+from public_data import JOBCARD_KIND, JobcardTable, LocationCatalog, PublicSnapshots, SchemeIndex
+
+from benchmarks import generators
+
+# rows = text/CSV rows, files = files in a generated tree. "10k-1M" wala range medium..large me hai.
+SIZES = {
+    'small': {'rows': 10_000, 'files': 1_000},
+    'medium': {'rows': 100_000, 'files': 10_000},
+    'large': {'rows': 1_000_000, 'files': 100_000},
+}
+
+WORKLOADS = OrderedDict()
+
+
+def workload(name):
+    """Registers fn(ctx) -> (run, items). run() is the timed part, everything before it is setup."""
+    def decorator(fn):
+        WORKLOADS[name] = fn
+        return fn
+    return decorator
+
+
+class Context:
+    """Size/seed of a run plus the on-disk fixtures (generated once per size and seed, then reused)."""
+
+    def __init__(self, size, seed, fixtures_dir):
+        self.size = size
+        self.seed = seed
+        self.rows = SIZES[size]['rows']
+        self.files = SIZES[size]['files']
+        self.root = os.path.join(fixtures_dir, f'{size}-{seed}')
+        self.tmp = tempfile.mkdtemp(prefix='nregabot-bench-')
+
+    def tree(self, name, build):
+        """Path of fixture `name`; build(path) runs only if it isn't complete on disk yet."""
+        path = os.path.join(self.root, name)
+        marker = path + '.complete'
+        if not os.path.exists(marker):
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path)
+            build(path)
+            with open(marker, 'w') as f:
+                f.write('ok\n')
+        return path
+
+    def demand_tree(self):
+        return self.tree('Demand Form', lambda path: generators.demand_tree(path, self.files, seed=self.seed))
+
+    def public_tree(self):
+        return self.tree('public_data', lambda path: generators.public_data_tree(path, self.files, seed=self.seed))
+
+    def jobcard_csv(self):
+        folder = self.tree('jobcard_csv', lambda path: generators.jobcard_csv(
+            os.path.join(path, 'Panchayat_jobcard.csv'), self.rows, self.seed))
+        return os.path.join(folder, 'Panchayat_jobcard.csv')
+
+    def manifest(self, demand_dir):
+        """Fresh DemandManifest on its own DB (same tables init_db creates)."""
+        db_path = tempfile.mktemp(suffix='.db', dir=self.tmp)
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute('CREATE TABLE IF NOT EXISTS app_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        return DemandManifest(lambda: conn, demand_dir, os.path.dirname(demand_dir))
+
+    def cleanup(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def _upload(text):
+    """Same path as an uploaded file: bytes stream decoded in TEXT_CHUNK_SIZE pieces."""
+    return iter_text_chunks(io.BytesIO(text.encode('utf-8')))
+
+
+def _drain(chunks):
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+    return size
+
+
+# --- Parsers ---
+
+@workload('bill.parse_nrega_data')
+def bench_parse_nrega_data(ctx):
+    texts = generators.bills(ctx.rows // 10, ctx.seed)
+
+    def run():
+        for text in texts:
+            parse_nrega_data(text)
+    return run, len(texts)
+
+
+@workload('bill.parse_bills_dump')
+def bench_parse_bills_dump(ctx):
+    dump = generators.bill_dump(ctx.rows // 10, ctx.seed)
+    return lambda: parse_bills(dump), ctx.rows // 10
+
+
+@workload('jobcard.parse_html')
+def bench_parse_job_card_html(ctx):
+    # ~250 bytes per row; rows/10 keeps the large page around 25 MB like the biggest real registers
+    rows = ctx.rows // 10
+    html = generators.jobcard_html(rows, ctx.seed).encode('utf-8')
+    return lambda: parse_job_card_html(html), rows
+
+
+@workload('allocation.iter_work_codes')
+def bench_iter_work_codes(ctx):
+    text = generators.allocation_text(ctx.rows, ctx.seed)
+    return lambda: sum(1 for _ in iter_work_codes(_upload(text))), ctx.rows
+
+
+@workload('schemes.iter_schemes')
+def bench_iter_schemes(ctx):
+    text = generators.scheme_dump(ctx.rows, ctx.seed)
+    return lambda: sum(1 for _ in iter_schemes(_upload(text))), ctx.rows
+
+
+# --- public_data ---
+
+@workload('public_data.locations_snapshot')
+def bench_locations_snapshot(ctx):
+    root = ctx.public_tree()
+    return lambda: LocationCatalog(root).snapshot(), ctx.files
+
+
+@workload('public_data.scheme_codes')
+def bench_scheme_codes(ctx):
+    root = ctx.public_tree()
+    catalog = LocationCatalog(root)
+    panchayats = list(catalog.panchayats())
+
+    def run():
+        index = SchemeIndex(root, catalog=catalog)
+        for panchayat in panchayats:
+            index.codes_for(panchayat)
+    return run, len(panchayats)
+
+
+@workload('public_data.jobcard_search')
+def bench_jobcard_search(ctx):
+    path = ctx.jobcard_csv()
+    terms = ['ram', 'devi', 'सीता', 'sukh', 'mandal', '003-012', 'xyz']
+
+    def run():
+        table = JobcardTable.from_csv(path)
+        index = table.search_index()
+        for term in terms:
+            index.search(term)
+    return run, ctx.rows
+
+
+@workload('public_data.jobcard_snapshot_load')
+def bench_jobcard_snapshot_load(ctx):
+    path = ctx.jobcard_csv()
+    snapshots = PublicSnapshots(os.path.join(ctx.tmp, 'snapshots'))
+    snapshots.build(path, JOBCARD_KIND)
+
+    def run():
+        table = JobcardTable(snapshots.open(path, JOBCARD_KIND))
+        table.query(page=2)
+    return run, ctx.rows
+
+
+# --- Demand Form ---
+
+@workload('demands.reconcile')
+def bench_reconcile(ctx):
+    demand_dir = ctx.demand_tree()
+    return lambda: ctx.manifest(demand_dir).ensure_ready(), ctx.files
+
+
+@workload('demands.save')
+def bench_save(ctx):
+    # Subah ka rush: ek hi second me kai saves, har ek ~20 labourers
+    rows = [[f'Labour {i}', f'JH-22-003-007-001/{i}', '3422003/IF/123456'] for i in range(20)]
+    saves = ctx.files // 10
+
+    def run():
+        writer = DemandWriter(tempfile.mkdtemp(dir=ctx.tmp))
+        for i in range(saves):
+            writer.save('2026-01-01', f'Panchayat {i % 20}', 'Demand_123456_101010',
+                        ['Name of Applicant', 'Job card number', 'Allocation Work Code'], rows)
+    return run, saves
+
+
+@workload('demands.page_all')
+def bench_page_all(ctx):
+    manifest = ctx.manifest(ctx.demand_tree())
+    manifest.ensure_ready()
+
+    def run():
+        after, pages = None, 0
+        manifest.count({})
+        while True:
+            rows = manifest.page({}, per_page=20, after=after)
+            if not rows:
+                return pages
+            after = (rows[-1]['mtime'], rows[-1]['path'])
+            pages += 1
+    return run, ctx.files
+
+
+@workload('demands.merge')
+def bench_merge(ctx):
+    demand_dir = ctx.demand_tree()
+    paths = sorted(os.path.join(root, name) for root, _, names in os.walk(demand_dir) for name in names)
+
+    def run():
+        header, rows = merge_demand_files(paths)
+        return _drain(iter_csv_chunks(header, rows))
+    return run, len(paths)
+
+
+@workload('demands.export_zip')
+def bench_export_zip(ctx):
+    demand_dir = ctx.demand_tree()
+    manifest = ctx.manifest(demand_dir)
+    manifest.ensure_ready()
+    static_dir = os.path.dirname(demand_dir)
+
+    def run():
+        groups = OrderedDict()
+        for row in manifest.select('0000-00-00', '9999-99-99'):
+            groups.setdefault((row['date'], row['panchayat']), []).append(os.path.join(static_dir, row['path']))
+        members = []
+        for (day, panchayat), paths in groups.items():
+            header, rows = merge_demand_files(paths, allow_empty=True)
+            if header:
+                members.append((f'{day}/{panchayat}.csv', iter_csv_chunks(header, rows)))
+        return _drain(iter_zip_chunks(members))
+    return run, ctx.files
@@ -0,0 +1,655 @@
+import csv
+import errno
+import heapq
+import io
+import os
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+
+
+MANIFEST_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS demand_files (
+        path TEXT PRIMARY KEY,
+        date TEXT NOT NULL,
+        panchayat TEXT NOT NULL,
+        filename TEXT NOT NULL,
+        real_filename TEXT NOT NULL,
+        is_done INTEGER NOT NULL DEFAULT 0,
+        mtime REAL NOT NULL,
+        work_code TEXT,
+        labourers INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_demand_files_mtime ON demand_files (mtime DESC, path DESC);
+    CREATE INDEX IF NOT EXISTS idx_demand_files_date ON demand_files (date, mtime DESC);
+    CREATE INDEX IF NOT EXISTS idx_demand_files_panchayat ON demand_files (panchayat, mtime DESC);
+    -- Inverted index: job card -> har file jisme wo demand hua
+    CREATE TABLE IF NOT EXISTS demand_cards (
+        card TEXT NOT NULL,
+        date TEXT NOT NULL,
+        panchayat TEXT NOT NULL,
+        work_code TEXT NOT NULL,
+        path TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_demand_cards_card ON demand_cards (card, date);
+    CREATE INDEX IF NOT EXISTS idx_demand_cards_date ON demand_cards (date, card, work_code);
+    CREATE INDEX IF NOT EXISTS idx_demand_cards_path ON demand_cards (path);
+'''
+# Merge ke waqt ek saath itni hi files khuli rahengi; baaki overlap wali files memory me buffer hoti hain
+MERGE_MAX_OPEN_FILES = 64
+CSV_CHUNK_SIZE = 64 * 1024
+
+# Schema/contents change hone par badhayein; purane DB par manifest disk se dobara banta hai
+MANIFEST_VERSION = 2
+
+MANIFEST_UPSERT_SQL = '''
+    INSERT OR REPLACE INTO demand_files (path, date, panchayat, filename, real_filename, is_done, mtime, work_code, labourers)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+CARD_INSERT_SQL = 'INSERT INTO demand_cards (card, date, panchayat, work_code, path) VALUES (?, ?, ?, ?, ?)'
+CARD_QUERY_BATCH = 500  # SQLite ke bound-parameter limit se neeche
+
+TEMP_FILE_MAX_AGE = 3600    # crash ke baad reh gayi temp files itni purani hone par hatti hain
+STALE_MARKER = '.manifest-stale'   # Demand Form me; hone par agla manifest read pehle reconcile karta hai
+
+
+def normalize_card(card):
+    return (card or '').strip().upper()
+
+
+def read_demand_summary(full_path):
+    """(work_code, labourer_count, [(card, work_code), ...]) from a saved demand CSV."""
+    work_code, count, cards = None, 0, []
+    try:
+        with open(full_path, 'r', encoding='utf-8', errors='ignore', newline='') as f:
+            for row in csv.DictReader(f):
+                w_code = row.get('Allocation Work Code') or row.get('Work Code')
+                if w_code: work_code = w_code
+                card = normalize_card(row.get('Job card number'))
+                if card:
+                    cards.append((card, w_code or ''))
+                count += 1
+    except OSError:
+        pass
+    return work_code, count, cards
+
+
+def read_demand_labourers(full_path):
+    """(work_code, [{'sr', 'name', 'card'}, ...]) of a saved demand CSV, as the print view shows it."""
+    labourers, work_code = [], ""
+    with open(full_path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            name = row.get('Name of Applicant') or row.get('Name')
+            card = row.get('Job card number') or row.get('Job Card')
+            w_code = row.get('Allocation Work Code') or row.get('Work Code')
+            if w_code: work_code = w_code
+            if name and card:
+                labourers.append({'sr': len(labourers) + 1, 'name': name, 'card': card})
+    return work_code, labourers
+
+
+class DemandManifest:
+    """
+    Index of saved demand CSVs (one row per file) kept in the app's SQLite DB,
+    plus a job card -> files inverted index for duplicate checks.
+    save/toggle/delete routes write to it, /downloads reads paginated views from it
+    instead of walking Demand Form on every page view. reconcile() rebuilds it
+    from disk.
+    """
+
+    def __init__(self, connect, demand_dir, static_dir):
+        self.connect = connect
+        self.demand_dir = os.path.abspath(demand_dir)
+        self.static_dir = os.path.abspath(static_dir)
+        self.stale_marker = os.path.join(self.demand_dir, STALE_MARKER)
+        self._ready = False
+
+    def init_schema(self, conn):
+        with conn:
+            conn.executescript(MANIFEST_SCHEMA)
+
+    def ensure_ready(self):
+        """
+        Builds the manifest from disk the first time it is used on a DB (or
+        after a version bump), and reconciles it after mark_stale().
+        """
+        if self._ready:
+            self._reconcile_if_stale()
+            return
+        conn = self.connect()
+        built = conn.execute("SELECT value FROM app_meta WHERE key = 'demand_manifest_version'").fetchone()
+        if not built or built[0] < MANIFEST_VERSION:
+            self.init_schema(conn)
+            with conn:
+                conn.execute('DELETE FROM demand_files')
+                conn.execute('DELETE FROM demand_cards')
+            self.reconcile()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO app_meta (key, value) VALUES ('demand_manifest_version', ?)", (MANIFEST_VERSION,))
+        self._ready = True
+        self._reconcile_if_stale()
+
+    def mark_stale(self):
+        """
+        For a file that reached disk but not the manifest (e.g. the DB was busy):
+        any worker's next manifest read reconciles with disk first.
+        """
+        try:
+            os.makedirs(self.demand_dir, exist_ok=True)
+            open(self.stale_marker, 'a').close()
+        except OSError:
+            pass
+
+    def _reconcile_if_stale(self):
+        if not os.path.exists(self.stale_marker):
+            return
+        try:
+            os.remove(self.stale_marker)
+        except FileNotFoundError:
+            return  # doosre worker ne utha liya
+        try:
+            self.reconcile()
+        except BaseException:
+            self.mark_stale()
+            raise
+
+    def rel_path(self, full_path):
+        return os.path.relpath(os.path.abspath(full_path), self.static_dir).replace('\\', '/')
+
+    def _entry(self, full_path, work_code=None, labourers=None, mtime=None):
+        full_path = os.path.abspath(full_path)
+        rel_parts = os.path.relpath(full_path, self.demand_dir).replace('\\', '/').split('/')
+        date_folder = rel_parts[0] if len(rel_parts) > 1 else "Unknown"
+        panchayat_folder = rel_parts[1] if len(rel_parts) > 2 else "Unknown"
+        real_filename = os.path.basename(full_path)
+        is_done = real_filename.startswith('DONE_')
+        display_name = real_filename.replace('DONE_', '', 1) if is_done else real_filename
+        if mtime is None:
+            mtime = os.path.getmtime(full_path)
+        return (self.rel_path(full_path), date_folder, panchayat_folder, display_name, real_filename,
+                int(is_done), mtime, work_code, labourers)
+
+    @staticmethod
+    def _card_rows(entry, cards):
+        path, date, panchayat = entry[0], entry[1], entry[2]
+        return [(card, date, panchayat, w_code, path) for card, w_code in cards]
+
+    def _write(self, conn, entry, cards):
+        conn.execute('DELETE FROM demand_cards WHERE path = ?', (entry[0],))
+        conn.execute(MANIFEST_UPSERT_SQL, entry)
+        conn.executemany(CARD_INSERT_SQL, self._card_rows(entry, cards))
+
+    @contextmanager
+    def save_lock(self):
+        """
+        Holds SQLite's write lock (BEGIN IMMEDIATE on the manifest connection)
+        for conflict check -> publish -> record_save, so two workers saving the
+        same job cards on different work codes can't both pass the check.
+        """
+        self.ensure_ready()
+        conn = self.connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def record_save(self, full_path, work_code=None, cards=()):
+        entry = self._entry(full_path, work_code, len(cards))
+        cards = [(normalize_card(card), work_code or '') for card in cards if normalize_card(card)]
+        conn = self.connect()
+        with conn:
+            self._write(conn, entry, cards)
+
+    def record_rename(self, old_full_path, new_full_path):
+        conn = self.connect()
+        old_path = self.rel_path(old_full_path)
+        old = conn.execute('SELECT work_code, labourers FROM demand_files WHERE path = ?', (old_path,)).fetchone()
+        entry = self._entry(new_full_path, old['work_code'] if old else None, old['labourers'] if old else None)
+        with conn:
+            if old:
+                conn.execute('DELETE FROM demand_files WHERE path = ?', (old_path,))
+                conn.execute(MANIFEST_UPSERT_SQL, entry)
+                conn.execute('UPDATE demand_cards SET path = ? WHERE path = ?', (entry[0], old_path))
+            else:
+                work_code, labourers, cards = read_demand_summary(new_full_path)
+                self._write(conn, self._entry(new_full_path, work_code, labourers), cards)
+
+    def record_delete(self, full_paths):
+        paths = [(self.rel_path(p),) for p in full_paths]
+        conn = self.connect()
+        with conn:
+            conn.executemany('DELETE FROM demand_files WHERE path = ?', paths)
+            conn.executemany('DELETE FROM demand_cards WHERE path = ?', paths)
+
+    def reconcile(self):
+        """Rebuilds the manifest from the files on disk. Returns (updated, removed, total)."""
+        on_disk = {}
+        for root, dirs, files in os.walk(self.demand_dir):
+            for file in files:
+                if file.endswith('.csv'):
+                    full_path = os.path.join(root, file)
+                    on_disk[self.rel_path(full_path)] = full_path
+
+        conn = self.connect()
+        known = {row['path']: row['mtime'] for row in conn.execute('SELECT path, mtime FROM demand_files')}
+        removed = [(path,) for path in known if path not in on_disk]
+        changed = []
+        for rel, full_path in on_disk.items():
+            try:
+                mtime = os.path.getmtime(full_path)
+            except OSError:
+                continue
+            if known.get(rel) != mtime:
+                work_code, labourers, cards = read_demand_summary(full_path)
+                changed.append((self._entry(full_path, work_code, labourers, mtime), cards))
+        with conn:
+            conn.executemany('DELETE FROM demand_files WHERE path = ?', removed)
+            conn.executemany('DELETE FROM demand_cards WHERE path = ?', removed)
+            for entry, cards in changed:
+                self._write(conn, entry, cards)
+        return len(changed), len(removed), len(on_disk)
+
+    def conflicts(self, cards, date_from, date_to, work_code=None):
+        """
+        Pre-save check: rows of the card index for these job cards within the
+        date window on a *different* work code than `work_code`.
+        """
+        conn = self.connect()
+        # save_lock() ke andar nahi: reconcile apna commit karke write lock chhod deta
+        if not conn.in_transaction:
+            self.ensure_ready()
+        cards = sorted({normalize_card(card) for card in cards} - {''})
+        found = []
+        for start in range(0, len(cards), CARD_QUERY_BATCH):
+            batch = cards[start:start + CARD_QUERY_BATCH]
+            sql = (f"SELECT DISTINCT card, date, panchayat, work_code, path FROM demand_cards "
+                   f"WHERE card IN ({', '.join('?' * len(batch))}) AND date BETWEEN ? AND ?")
+            params = batch + [date_from, date_to]
+            if work_code:
+                sql += ' AND work_code != ?'
+                params.append(work_code)
+            found.extend(dict(row) for row in conn.execute(sql, params))
+        found.sort(key=lambda row: (row['card'], row['date'], row['work_code'], row['path']))
+        return found
+
+    def overlaps(self, date_from, date_to):
+        """Job cards demanded on more than one work code on the same date, grouped per (card, date)."""
+        self.ensure_ready()
+        rows = self.connect().execute('''
+            SELECT c.card, c.date, c.panchayat, c.work_code, c.path FROM demand_cards c
+            JOIN (SELECT card, date FROM demand_cards WHERE date BETWEEN ? AND ?
+                  GROUP BY date, card HAVING COUNT(DISTINCT work_code) > 1) d
+              ON c.card = d.card AND c.date = d.date
+            ORDER BY c.date, c.card, c.work_code, c.path
+        ''', (date_from, date_to))
+        grouped = []
+        for row in rows:
+            if not grouped or (grouped[-1]['card'], grouped[-1]['date']) != (row['card'], row['date']):
+                grouped.append({'card': row['card'], 'date': row['date'], 'entries': []})
+            grouped[-1]['entries'].append({'panchayat': row['panchayat'], 'work_code': row['work_code'], 'path': row['path']})
+        return grouped
+
+    @staticmethod
+    def _where(filters):
+        clauses, params = [], []
+        if filters.get('date'):
+            clauses.append('date = ?'); params.append(filters['date'])
+        if filters.get('panchayat'):
+            clauses.append('panchayat = ?'); params.append(filters['panchayat'])
+        if filters.get('status') in ('done', 'pending'):
+            clauses.append('is_done = ?'); params.append(1 if filters['status'] == 'done' else 0)
+        return clauses, params
+
+    def count(self, filters):
+        self.ensure_ready()
+        clauses, params = self._where(filters)
+        sql = 'SELECT COUNT(*) FROM demand_files' + (' WHERE ' + ' AND '.join(clauses) if clauses else '')
+        return self.connect().execute(sql, params).fetchone()[0]
+
+    def page(self, filters, per_page=20, after=None, offset=0):
+        """
+        Newest-first rows. With `after` (the (mtime, path) of the previous page's
+        last row) it is a keyset query; otherwise OFFSET over the same index.
+        """
+        self.ensure_ready()
+        clauses, params = self._where(filters)
+        if after is not None:
+            clauses.append('(mtime < ? OR (mtime = ? AND path < ?))')
+            params.extend([after[0], after[0], after[1]])
+        sql = 'SELECT * FROM demand_files' + (' WHERE ' + ' AND '.join(clauses) if clauses else '')
+        sql += ' ORDER BY mtime DESC, path DESC LIMIT ?'
+        params.append(per_page)
+        if after is None and offset:
+            sql += ' OFFSET ?'
+            params.append(offset)
+        return [dict(row) for row in self.connect().execute(sql, params)]
+
+    def select(self, date_from, date_to, pending_only=False):
+        """Rows with date_from <= date <= date_to, grouped by date and panchayat, oldest file first."""
+        self.ensure_ready()
+        sql = 'SELECT * FROM demand_files WHERE date BETWEEN ? AND ?'
+        if pending_only:
+            sql += ' AND is_done = 0'
+        sql += ' ORDER BY date, panchayat, mtime, path'
+        return [dict(row) for row in self.connect().execute(sql, (date_from, date_to))]
+
+    def distinct(self, column):
+        self.ensure_ready()
+        if column not in ('date', 'panchayat'):
+            raise ValueError(column)
+        return [row[0] for row in self.connect().execute(f'SELECT DISTINCT {column} FROM demand_files ORDER BY {column} DESC')]
+
+
+def _fsync_dir(path):
+    # Rename/link ko durable banane ke liye directory bhi fsync; Windows par ye possible nahi
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class DemandWriter:
+    """
+    Writes demand CSVs so readers only ever see complete files: rows go to a
+    hidden temp file in the target folder, which is then published under
+    `<stem>.csv`, or `<stem>_2.csv`, `<stem>_3.csv`... if that name is taken.
+    Publishing uses link(2), which never replaces an existing file, so saves
+    from different workers in the same second can't overwrite each other.
+    """
+
+    def __init__(self, demand_dir, fsync=True):
+        self.demand_dir = demand_dir
+        self.fsync = fsync
+        self._dirs = set()          # folders already created by this process
+
+    def _temp_file(self, target_dir, stem):
+        path = os.path.join(target_dir, f'.{stem}.{os.getpid()}.{threading.get_ident()}.tmp')
+        if target_dir not in self._dirs:
+            os.makedirs(target_dir, exist_ok=True)
+            self._dirs.add(target_dir)
+        try:
+            return path, open(path, 'w', newline='', encoding='utf-8')
+        except FileNotFoundError:
+            # Folder baad me delete ho gaya (cache purana), dobara banao
+            os.makedirs(target_dir, exist_ok=True)
+            return path, open(path, 'w', newline='', encoding='utf-8')
+
+    @staticmethod
+    def _publish(tmp_path, target_dir, stem):
+        """Gives the temp file the first free `<stem>[_n].csv` name; returns that path."""
+        n = 1
+        while True:
+            name = f'{stem}.csv' if n == 1 else f'{stem}_{n}.csv'
+            path = os.path.join(target_dir, name)
+            try:
+                os.link(tmp_path, path)
+            except FileExistsError:
+                n += 1
+                continue
+            except OSError as e:
+                if e.errno not in (errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EXDEV):
+                    raise
+                # Hard links nahi (kuch mounted volumes)
+                if DemandWriter._publish_by_rename(tmp_path, target_dir, name):
+                    return path
+                n += 1
+                continue
+            os.unlink(tmp_path)
+            return path
+
+    @staticmethod
+    def _publish_by_rename(tmp_path, target_dir, name):
+        """
+        Publishing without link(2): a hidden `.<name>.lock.tmp` (O_EXCL) reserves
+        the name while it is checked and renamed into, so `name` itself only ever
+        appears complete. Returns False if the name is taken.
+        """
+        marker = os.path.join(target_dir, f'.{name}.lock.tmp')
+        try:
+            os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        try:
+            path = os.path.join(target_dir, name)
+            if os.path.exists(path):
+                return False
+            os.replace(tmp_path, path)
+            return True
+        finally:
+            os.remove(marker)
+
+    def save(self, date, panchayat, stem, header, rows):
+        """Writes header + rows to Demand Form/<date>/<panchayat>/<stem>[_n].csv and returns its path."""
+        target_dir = os.path.join(self.demand_dir, date, panchayat)
+        tmp_path, f = self._temp_file(target_dir, stem)
+        try:
+            with f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(rows)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            path = self._publish(tmp_path, target_dir, stem)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if self.fsync:
+            _fsync_dir(target_dir)
+        return path
+
+    def cleanup(self, max_age=TEMP_FILE_MAX_AGE):
+        """Removes temp files (and name reservations) left behind by a crashed save. Returns how many."""
+        removed = 0
+        cutoff = time.time() - max_age
+        for root, dirs, files in os.walk(self.demand_dir):
+            for file in files:
+                if file.startswith('.') and file.endswith('.tmp'):
+                    path = os.path.join(root, file)
+                    try:
+                        if os.path.getmtime(path) < cutoff:
+                            os.remove(path)
+                            removed += 1
+                    except OSError:
+                        pass
+        return removed
+
+
+class DemandMergeError(ValueError):
+    """Selected demand files can't be merged (header mismatch, nothing to merge)."""
+
+
+def work_code_column(header):
+    """Index of the work-code column (same rule the old merge used), or -1."""
+    for i, h in enumerate(header):
+        if "code" in h.lower() and "work" in h.lower():
+            return i
+    return -1
+
+
+def _row_key(row, key_index):
+    if key_index < 0 or key_index >= len(row):
+        return ''
+    return row[key_index]
+
+
+class _MergeSource:
+    """One CSV in a k-way merge: the pre-pass stats plus (once active) its row iterator."""
+
+    def __init__(self, order, path):
+        self.order = order
+        self.path = path
+        self.header = None
+        self.rows = 0
+        self.min_key = None
+        self.is_sorted = True
+        self.handle = None
+        self.iterator = None
+
+    def scan(self):
+        # Pre-pass: header + row count + sortedness, bina rows memory me rakhe
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            self.header = next(reader, None)
+            if self.header is None:
+                return
+            key_index = work_code_column(self.header)
+            last = None
+            for row in reader:
+                key = _row_key(row, key_index)
+                if last is None or key < self.min_key:
+                    self.min_key = key
+                if last is not None and key < last:
+                    self.is_sorted = False
+                last = key
+                self.rows += 1
+
+    def open(self, key_index, buffer_rows):
+        f = open(self.path, 'r', encoding='utf-8', newline='')
+        reader = csv.reader(f)
+        next(reader, None)
+        if self.is_sorted and not buffer_rows:
+            self.handle = f
+            self.iterator = reader
+            return
+        # Unsorted file ya open-handle cap bhar gaya: is file ki rows memory me (stable sort)
+        try:
+            rows = list(reader)
+        finally:
+            f.close()
+        if not self.is_sorted:
+            rows.sort(key=lambda row: _row_key(row, key_index))
+        self.iterator = iter(rows)
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+
+def merge_demand_files(paths, max_open=MERGE_MAX_OPEN_FILES, allow_empty=False):
+    """
+    Streaming replacement for "concatenate everything, then sort by work code".
+    Returns (header, rows) where rows is a generator; output order is the same
+    as a stable sort of the concatenated files. Raises DemandMergeError before
+    anything is streamed if headers don't match or there is nothing to merge.
+    """
+    sources = []
+    header = None
+    for path in paths:
+        source = _MergeSource(len(sources), path)
+        source.scan()
+        if source.header is None:
+            continue  # khali file skip
+        if header is None:
+            header = source.header
+        elif [h.strip().lower() for h in source.header] != [h.strip().lower() for h in header]:
+            raise DemandMergeError(f"Header mismatch in {os.path.basename(path)}: {', '.join(source.header)}")
+        sources.append(source)
+
+    if not any(source.rows for source in sources):
+        if allow_empty:
+            return header, iter(())
+        raise DemandMergeError("Files khali hain ya data read nahi ho paaya.")
+    sources = [source for source in sources if source.rows]
+    return header, _merge_rows(sources, work_code_column(header), max_open)
+
+
+def _merge_rows(sources, key_index, max_open):
+    # Files tab kholte hain jab merge un tak pahunche (min_key order me), is tarah
+    # ek hi work code wali files (normal case) ek-ek karke padhi jaati hain.
+    pending = sorted(sources, key=lambda s: (s.min_key, s.order), reverse=True)
+    heap = []
+    open_count = 0
+
+    def activate(source):
+        nonlocal open_count
+        source.open(key_index, buffer_rows=open_count >= max_open)
+        if source.handle is not None:
+            open_count += 1
+        advance(source, 0)
+
+    def advance(source, seq):
+        nonlocal open_count
+        row = next(source.iterator, None)
+        if row is None:
+            if source.handle is not None:
+                source.close()
+                open_count -= 1
+            return
+        heapq.heappush(heap, (_row_key(row, key_index), source.order, seq, row, source))
+
+    try:
+        while heap or pending:
+            while pending and (not heap or (pending[-1].min_key, pending[-1].order, 0) < heap[0][:3]):
+                activate(pending.pop())
+            key, order, seq, row, source = heapq.heappop(heap)
+            yield row
+            advance(source, seq + 1)
+    finally:
+        for source in sources:
+            source.close()
+
+
+def iter_csv_chunks(header, rows, chunk_size=CSV_CHUNK_SIZE):
+    """csv.writer output of header + rows, yielded in ~chunk_size strings for a streamed Response."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _ZipSink:
+    """Write-only target for ZipFile; no tell()/seek(), so zipfile writes data descriptors."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def iter_zip_chunks(members):
+    """
+    Streams a ZIP built from (arcname, str_chunks) pairs. Each member is deflated
+    as its chunks arrive, so neither a temp file nor the whole archive is held.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for arcname, chunks in members:
+            with zf.open(arcname, 'w') as member:
+                for chunk in chunks:
+                    member.write(chunk.encode('utf-8'))
+                    if len(sink.buffer) >= CSV_CHUNK_SIZE:
+                        yield sink.take()
+            if sink.buffer:
+                yield sink.take()
+    if sink.buffer:
+        yield sink.take()
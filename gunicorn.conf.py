@@ -0,0 +1,20 @@
+# gunicorn is file ko khud load karta hai (working directory se), Dockerfile ke CMD flags wahi rehte hain.
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def on_starting(server):
+    """
+    Builds the public data snapshots in the master before any worker forks.
+    Workers then only mmap them, and share one copy through the page cache.
+    """
+    from public_data import PublicSnapshots
+
+    snapshots = PublicSnapshots(os.path.join(BASE_DIR, 'cache', 'snapshots'))
+    try:
+        built, files = snapshots.warm(os.path.join(BASE_DIR, 'static', 'public_data'))
+    except OSError as e:
+        server.log.warning('Public data snapshots not built: %s', e)
+        return
+    server.log.info('Public data snapshots: %d built, %d jobcard/scheme files', built, files)
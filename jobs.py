@@ -0,0 +1,317 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+JOBS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        input_key TEXT NOT NULL,
+        params TEXT NOT NULL,
+        status TEXT NOT NULL,
+        done INTEGER NOT NULL DEFAULT 0,
+        total INTEGER,
+        message TEXT,
+        error TEXT,
+        result_name TEXT,
+        mimetype TEXT,
+        owner_pid INTEGER NOT NULL,
+        owner_start TEXT,
+        created REAL NOT NULL,
+        updated REAL NOT NULL
+    );
+    -- Same kind + same input = same job (coalescing)
+    CREATE INDEX IF NOT EXISTS idx_jobs_input ON jobs (kind, input_key, created DESC);
+    CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs (updated);
+'''
+ACTIVE_STATUSES = ('queued', 'running')
+JOB_TTL = 24 * 3600           # itne purane jobs (aur unke result files) hata diye jaate hain
+PRUNE_INTERVAL = 600
+PROGRESS_INTERVAL = 0.5       # progress DB me isse zyada baar nahi likhte
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+class JobError(Exception):
+    """Expected failure inside a job handler; the message is shown to the user as is."""
+
+
+def pid_alive(pid):
+    """False once no process has this pid (a pid we may not signal still counts as alive)."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _process_start(pid):
+    """
+    'boot id:start ticks' of a process from /proc, or None where there is no
+    /proc. Container restart ke baad wahi pid kisi aur process ko mil jaata
+    hai (vendors.db volume par bachi rehti hai); start time se pata chalta hai.
+    """
+    try:
+        with open('/proc/sys/kernel/random/boot_id') as f:
+            boot_id = f.read().strip()
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # comm (field 2) me space ho sakte hain; ')' ke baad field 3 se ginte hain, starttime field 22 hai
+    return f"{boot_id}:{stat.rsplit(b')', 1)[1].split()[19].decode()}"
+
+
+def _owner_alive(row):
+    """True while the process that queued this job is still the same process."""
+    # Purani rows (owner_start NULL) upgrade se pehle ke process ki hain, /proc wale system par wo dead hai
+    return pid_alive(row['owner_pid']) and _process_start(row['owner_pid']) == row['owner_start']
+
+
+class Job:
+    """What a handler gets: params, the staged input files and where to write the result."""
+
+    def __init__(self, queue, job_id, params, inputs, workdir):
+        self.queue = queue
+        self.id = job_id
+        self.params = params
+        self.inputs = inputs                  # [(original name, path on disk)]
+        self.result_path = os.path.join(workdir, 'result')
+        self._last_progress = 0.0
+
+    def write_result(self, chunks):
+        """Writes str / bytes chunks (a streamed CSV or ZIP) to result_path."""
+        with open(self.result_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+
+    def progress(self, done, total=None, message=None, force=False):
+        """Reports progress (done of total, total may be unknown); throttled to PROGRESS_INTERVAL."""
+        now = time.monotonic()
+        if not force and now - self._last_progress < PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        self.queue._update(self.id, done=done, total=total, message=message)
+
+
+class JobQueue:
+    """
+    Background jobs for uploads/exports too slow for a request. Jobs live in
+    the app's SQLite DB so any gunicorn worker can answer a status poll, and
+    run on a small thread pool in the worker that accepted them. Submitting
+    the same kind + params + input bytes again returns the existing job.
+    Results are files under root/<job id>/ until JOB_TTL.
+    """
+
+    def __init__(self, connect, root, max_workers=2):
+        self.connect = connect
+        self.root = os.path.abspath(root)
+        self.max_workers = max_workers
+        self.handlers = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self._last_prune = 0.0
+
+    def init_schema(self, conn):
+        """Creates the jobs table, or adds owner_start to one from an older version; a no-op when current."""
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+        if not columns:
+            with conn:
+                conn.executescript(JOBS_SCHEMA)
+        elif 'owner_start' not in columns:
+            # IMMEDIATE: saare workers ek saath import karte hain, ALTER ek hi baar chale
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if 'owner_start' not in {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}:
+                    conn.execute('ALTER TABLE jobs ADD COLUMN owner_start TEXT')
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def register(self, kind, handler):
+        """handler(job) writes job.result_path and returns (download name, mimetype)."""
+        self.handlers[kind] = handler
+
+    def handler(self, kind):
+        def decorator(func):
+            self.register(kind, func)
+            return func
+        return decorator
+
+    def _pool(self):
+        # Fork ke baad parent ka pool (aur uske threads) child me kaam nahi karte
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _stage(self, kind, params, inputs):
+        """Copies the inputs to a staging dir while hashing them. Returns (input_key, dir, [(name, path)])."""
+        digest = hashlib.sha1()
+        digest.update(kind.encode('utf-8') + b'\0')
+        digest.update(json.dumps(params, sort_keys=True).encode('utf-8') + b'\0')
+        staging = os.path.join(self.root, f'.staging-{uuid.uuid4().hex}')
+        os.makedirs(staging)
+        staged = []
+        try:
+            for i, (name, source) in enumerate(inputs):
+                path = os.path.join(staging, f'input-{i}')
+                digest.update(f'{len(staged)}:{name}\0'.encode('utf-8'))
+                with open(path, 'wb') as f:
+                    if isinstance(source, str):
+                        source = source.encode('utf-8')
+                    if isinstance(source, bytes):
+                        chunks = [source]
+                    else:
+                        chunks = iter(lambda: source.read(COPY_CHUNK_SIZE), b'')
+                    size = 0
+                    for chunk in chunks:
+                        digest.update(chunk)
+                        f.write(chunk)
+                        size += len(chunk)
+                digest.update(f'\0{size}\0'.encode('utf-8'))
+                staged.append((name, f'input-{i}'))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return digest.hexdigest(), staging, staged
+
+    def _reusable(self, row):
+        if row['status'] == 'done':
+            return os.path.exists(os.path.join(self.root, row['id'], 'result'))
+        return row['status'] in ACTIVE_STATUSES and _owner_alive(row)
+
+    def submit(self, kind, params=None, inputs=()):
+        """
+        Queues a job; `inputs` are (name, bytes / str / binary file) pairs.
+        Returns (job id, created); created is False when an identical job
+        was already queued, running or finished.
+        """
+        if kind not in self.handlers:
+            raise KeyError(kind)
+        params = params or {}
+        self.prune()
+        input_key, staging, staged = self._stage(kind, params, inputs)
+        conn = self.connect()
+        now = time.time()
+        workdir = None
+        try:
+            # IMMEDIATE: do workers ek saath same input dein to bhi ek hi job bane
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for row in conn.execute('SELECT * FROM jobs WHERE kind = ? AND input_key = ? ORDER BY created DESC',
+                                        (kind, input_key)):
+                    if self._reusable(row):
+                        conn.commit()
+                        return row['id'], False
+                job_id = uuid.uuid4().hex
+                workdir = os.path.join(self.root, job_id)
+                # Row pehle, phir rename, phir commit: koi bhi step fail ho to na row bachti hai na dir
+                conn.execute('INSERT INTO jobs (id, kind, input_key, params, status, owner_pid, owner_start, created, updated) '
+                             'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                             (job_id, kind, input_key, json.dumps({'params': params, 'inputs': staged}),
+                              'queued', os.getpid(), _process_start(os.getpid()), now, now))
+                os.replace(staging, workdir)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                if workdir is not None:
+                    shutil.rmtree(workdir, ignore_errors=True)
+                raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        self._pool().submit(self._run, job_id)
+        return job_id, True
+
+    def _update(self, job_id, **fields):
+        fields['updated'] = time.time()
+        conn = self.connect()
+        with conn:
+            conn.execute(f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                         list(fields.values()) + [job_id])
+
+    def _run(self, job_id):
+        row = self.connect().execute('SELECT kind, params FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return  # beech me prune ho gaya
+        workdir = os.path.join(self.root, job_id)
+        spec = json.loads(row['params'])
+        job = Job(self, job_id, spec['params'], [(name, os.path.join(workdir, path)) for name, path in spec['inputs']], workdir)
+        self._update(job_id, status='running')
+        try:
+            result_name, mimetype = self.handlers[row['kind']](job)
+        except JobError as e:
+            self._update(job_id, status='failed', error=str(e))
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, status='failed', error=f'{type(e).__name__}: {e}')
+        else:
+            # Aakhri progress throttle me chhoot gaya ho sakta hai; done = total
+            conn = self.connect()
+            with conn:
+                conn.execute('UPDATE jobs SET status = ?, result_name = ?, mimetype = ?, done = COALESCE(total, done), '
+                             'updated = ? WHERE id = ?', ('done', result_name, mimetype, time.time(), job_id))
+        finally:
+            for _, path in job.inputs:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def get(self, job_id):
+        """Job row as a dict (None if unknown). A job whose worker died is reported as failed."""
+        row = self.connect().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        del job['params'], job['input_key'], job['owner_pid'], job['owner_start']
+        if job['status'] in ACTIVE_STATUSES and not _owner_alive(row):
+            error = 'The worker running this job restarted; please submit it again.'
+            self._update(job_id, status='failed', error=error)
+            job.update(status='failed', error=error)
+        return job
+
+    def result(self, job_id):
+        """(path, download name, mimetype) of a finished job's result, or None."""
+        job = self.get(job_id)
+        if not job or job['status'] != 'done':
+            return None
+        path = os.path.join(self.root, job_id, 'result')
+        if not os.path.exists(path):
+            return None
+        return path, job['result_name'], job['mimetype']
+
+    def prune(self, force=False):
+        """Deletes jobs (and their files) not updated for JOB_TTL; runs at most every PRUNE_INTERVAL."""
+        now = time.time()
+        if not force and now - self._last_prune < PRUNE_INTERVAL:
+            return 0
+        self._last_prune = now
+        os.makedirs(self.root, exist_ok=True)
+        conn = self.connect()
+        expired = [row['id'] for row in conn.execute('SELECT id FROM jobs WHERE updated < ?', (now - JOB_TTL,))]
+        with conn:
+            conn.executemany('DELETE FROM jobs WHERE id = ?', [(job_id,) for job_id in expired])
+        for job_id in expired:
+            shutil.rmtree(os.path.join(self.root, job_id), ignore_errors=True)
+        # Crash ke baad reh gaye staging dirs
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith('.staging-'):
+                try:
+                    if os.path.getmtime(path) < now - JOB_TTL:
+                        shutil.rmtree(path, ignore_errors=True)
+                except OSError:
+                    pass
+        return len(expired)
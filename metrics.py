@@ -0,0 +1,239 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Response, g, request
+
+from jobs import pid_alive
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+PREFIX = 'nregabot'
+STALE_FILE_AGE = 24 * 3600  # band ho chuke workers ki files itne der baad hatate hain
+
+
+def _new_histogram(buckets):
+    # per-bucket counts (non-cumulative) + [sum, count]
+    return [0] * len(buckets) + [0.0, 0]
+
+
+def _observe(histogram, buckets, value):
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            histogram[i] += 1
+            break
+    histogram[-2] += value
+    histogram[-1] += 1
+
+
+def _merge_histogram(target, source):
+    for i, value in enumerate(source):
+        target[i] += value
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, key):
+    return ','.join(f'{name}="{_label_value(value)}"' for name, value in zip(names, key.split('|')))
+
+
+class MetricsRegistry:
+    """
+    Per-worker request/timer metrics. Every gunicorn worker keeps its own
+    counters and a background thread writes them as a JSON snapshot to
+    `directory` every `flush_interval` seconds (only if something changed);
+    /metrics merges all snapshots, so numbers cover every worker no matter
+    which one answers the scrape.
+    """
+
+    def __init__(self, directory, flush_interval=2.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.requests = {}      # "endpoint|method|status" -> count
+        self.latency = {}       # "endpoint" -> histogram
+        self.sizes = {}         # "endpoint" -> histogram
+        self.errors = {}        # "endpoint" -> count
+        self.timers = {}        # "name" -> histogram
+        self._dirty = False
+        self._flusher = None
+
+    def _touch(self):
+        # Fork ke baad (naya worker / child process) parent ke counters dobara na gine jaayen
+        # Called with the lock held, before every observation.
+        if os.getpid() != self.pid:
+            self._reset()
+        self._dirty = True
+        if self._flusher is None:
+            # Thread fork ke baad nahi bachte, isliye har process me pehli observation par
+            self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while pid == self.pid:
+            time.sleep(self.flush_interval)
+            if self._dirty:
+                self.flush()
+
+    def observe_request(self, endpoint, method, status, seconds, size=None):
+        with self._lock:
+            self._touch()
+            key = f'{endpoint}|{method}|{status}'
+            self.requests[key] = self.requests.get(key, 0) + 1
+            _observe(self.latency.setdefault(endpoint, _new_histogram(LATENCY_BUCKETS)), LATENCY_BUCKETS, seconds)
+            if size is not None:
+                _observe(self.sizes.setdefault(endpoint, _new_histogram(SIZE_BUCKETS)), SIZE_BUCKETS, size)
+            if status >= 500:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def observe_timer(self, name, seconds):
+        with self._lock:
+            self._touch()
+            _observe(self.timers.setdefault(name, _new_histogram(LATENCY_BUCKETS)), LATENCY_BUCKETS, seconds)
+
+    @contextmanager
+    def timer(self, name):
+        """with metrics.timer('name'): ... records the block's wall time."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_timer(name, time.perf_counter() - start)
+
+    def timed(self, name):
+        """Decorator version of timer()."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        with self._lock:
+            if os.getpid() != self.pid:
+                self._reset()
+            self._dirty = False
+            return {
+                'requests': dict(self.requests),
+                'latency': {k: list(v) for k, v in self.latency.items()},
+                'sizes': {k: list(v) for k, v in self.sizes.items()},
+                'errors': dict(self.errors),
+                'timers': {k: list(v) for k, v in self.timers.items()},
+            }
+
+    def flush(self):
+        data = self.snapshot()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f'{self.pid}.json')
+            tmp = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # metrics kabhi request fail na karein
+
+    def collect(self):
+        """Merged snapshot of every worker's file (this worker's counters are flushed first)."""
+        self.flush()
+        merged = {'requests': {}, 'latency': {}, 'sizes': {}, 'errors': {}, 'timers': {}}
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            names = []
+        now = time.time()
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                pid = int(name[:-5])
+                if pid != self.pid and now - os.path.getmtime(path) > STALE_FILE_AGE and not pid_alive(pid):
+                    os.remove(path)
+                    continue
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for section in ('requests', 'errors'):
+                for key, value in data.get(section, {}).items():
+                    merged[section][key] = merged[section].get(key, 0) + value
+            for section in ('latency', 'sizes', 'timers'):
+                for key, value in data.get(section, {}).items():
+                    if key in merged[section]:
+                        _merge_histogram(merged[section][key], value)
+                    else:
+                        merged[section][key] = list(value)
+        return merged
+
+    def render(self):
+        """Prometheus text exposition format."""
+        data = self.collect()
+        lines = []
+
+        def counter(name, help_text, label_names, values):
+            lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {PREFIX}_{name} counter')
+            for key in sorted(values):
+                lines.append(f'{PREFIX}_{name}{{{_labels(label_names, key)}}} {values[key]}')
+
+        def histogram(name, help_text, label_name, buckets, values):
+            lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {PREFIX}_{name} histogram')
+            for key in sorted(values):
+                hist = values[key]
+                label = f'{label_name}="{_label_value(key)}"'
+                cumulative = 0
+                for bound, count in zip(buckets, hist):
+                    cumulative += count
+                    lines.append(f'{PREFIX}_{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{PREFIX}_{name}_bucket{{{label},le="+Inf"}} {hist[-1]}')
+                lines.append(f'{PREFIX}_{name}_sum{{{label}}} {hist[-2]}')
+                lines.append(f'{PREFIX}_{name}_count{{{label}}} {hist[-1]}')
+
+        counter('http_requests_total', 'Requests handled, by endpoint, method and status.',
+                ('endpoint', 'method', 'status'), data['requests'])
+        counter('http_request_errors_total', 'Requests that ended with a 5xx status.', ('endpoint',), data['errors'])
+        histogram('http_request_duration_seconds', 'Time spent in the Flask view (streamed bodies excluded).',
+                  'endpoint', LATENCY_BUCKETS, data['latency'])
+        histogram('http_response_size_bytes', 'Response body size, when known up front.',
+                  'endpoint', SIZE_BUCKETS, data['sizes'])
+        histogram('timer_duration_seconds', 'Named timers around hot helpers.', 'name', LATENCY_BUCKETS, data['timers'])
+        return '\n'.join(lines) + '\n'
+
+    def init_app(self, app, token=None):
+        """Registers the before/after request hooks and the /metrics endpoint."""
+
+        @app.before_request
+        def _metrics_start():
+            g._metrics_start = time.perf_counter()
+
+        @app.after_request
+        def _metrics_record(response):
+            start = g.pop('_metrics_start', None)
+            if start is not None:
+                size = None if response.is_streamed else response.calculate_content_length()
+                self.observe_request(request.endpoint or 'unmatched', request.method, response.status_code,
+                                     time.perf_counter() - start, size)
+            return response
+
+        def metrics_endpoint():
+            if token:
+                supplied = request.args.get('token') or request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+                if supplied != token:
+                    return Response('Unauthorized\n', status=401, mimetype='text/plain')
+            return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+        app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
@@ -0,0 +1,564 @@
+import codecs
+import re
+from html.parser import HTMLParser
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+# --- NREGA BILL PARSER ---
+# Har header/tax pattern ek literal word se shuru hota hai. Text ko ek baar trigger words
+# ke liye scan karte hain aur sirf un positions par specific pattern anchor karke try karte hain,
+# to result wahi rehta hai jo har pattern ke alag re.search se aata.
+_HEADER_PATTERNS = {
+    'district': re.compile(r"District:([\w\s]+)", re.DOTALL | re.IGNORECASE),
+    'work_description': re.compile(r"Work\s*:\s*(.+?)\s*Work Code", re.DOTALL | re.IGNORECASE),
+    'work_code': re.compile(r"Work Code\s*:\s*([\w/\-]+)", re.DOTALL | re.IGNORECASE),
+    'bill_no': re.compile(r"Bill No\.\s*:\s*(\d+)", re.DOTALL | re.IGNORECASE),
+    'bill_date': re.compile(r"Bill Date\s*:\s*(\d{2}/\d{2}/\d{4})", re.DOTALL | re.IGNORECASE),
+    'vendor_raw': re.compile(r"Vendor name(.+?)\(TinNo-([\w]+)\)", re.DOTALL | re.IGNORECASE),
+    'material_section': re.compile(r"Material\s+Unit Price.+?\n(.+?)(?=Taxes|Total\s+\(In Rupees\))", re.DOTALL | re.IGNORECASE),
+    'cgst': re.compile(r"Centre GST.*[ \t]([\d\.]+)", re.IGNORECASE),
+    'sgst': re.compile(r"State GST.*[ \t]([\d\.]+)", re.IGNORECASE),
+    'total_cash_payment': re.compile(r"Total Cash payment\s+\(In Rupees\)\s*([\d\.]+)", re.IGNORECASE),
+}
+
+_TRIGGERS = {
+    'district': ('district',),
+    'work': ('work_description', 'work_code'),
+    'bill': ('bill_no', 'bill_date'),
+    'vendor': ('vendor_raw',),
+    'material': ('material_section',),
+    'centre': ('cgst',),
+    'state': ('sgst',),
+    'total': ('total_cash_payment',),
+}
+_TRIGGER_PATTERN = re.compile('|'.join(_TRIGGERS))
+
+_SPACES = re.compile(r'\s+')
+_NUMBER = re.compile(r'[\d\.]+')
+
+# Ek dump me kai bills: separator lines (---- / ==== / form feed) ya har naya "District:" header
+_BILL_SEPARATOR = re.compile(r'^\s*(?:-{3,}|={3,}|\f)\s*$', re.MULTILINE)
+_BILL_START = re.compile(r'(?=District:)', re.IGNORECASE)
+
+
+@dataclass
+class MaterialItem:
+    material: str
+    unit_price: float
+    quantity: float
+    amount: float
+
+    def to_dict(self):
+        return {'material': self.material, 'unit_price': self.unit_price, 'quantity': self.quantity, 'amount': self.amount}
+
+
+@dataclass
+class BillData:
+    district: Optional[str] = None
+    work_description: Optional[str] = None
+    work_code: Optional[str] = None
+    bill_no: Optional[str] = None
+    bill_date: Optional[str] = None
+    vendor_name: Optional[str] = None
+    gstin: Optional[str] = None
+    material_items: List[MaterialItem] = field(default_factory=list)
+    cgst: float = 0.0
+    sgst: float = 0.0
+    total_cash_payment: Optional[float] = None
+
+    @property
+    def subtotal(self):
+        return sum(item.amount for item in self.material_items)
+
+    def to_dict(self):
+        """Dict in the shape generate_invoice and the templates expect (missing headers left out)."""
+        data = {'material_items': [item.to_dict() for item in self.material_items]}
+        for key in ('district', 'work_description', 'work_code', 'bill_no', 'bill_date', 'vendor_name', 'gstin'):
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = value
+        data['cgst'] = self.cgst
+        data['sgst'] = self.sgst
+        if self.total_cash_payment is not None:
+            data['total_cash_payment'] = self.total_cash_payment
+        return data
+
+
+def _parse_item_lines(raw_item_text):
+    items = []
+    for line in raw_item_text.strip().split('\n'):
+        line = _SPACES.sub(' ', line).strip() # Normalize spaces
+        if not line: continue
+
+        numbers = _NUMBER.findall(line)
+        if len(numbers) >= 3:
+            try:
+                amount = float(numbers[-1])
+                quantity = float(numbers[-2])
+                unit_price = float(numbers[-3])
+
+                # To extract the description, we remove the numbers and trailing whitespace
+                desc_part = line.rsplit(numbers[-3], 1)[0].strip()
+
+                if desc_part: # Ensure we have a description
+                    items.append(MaterialItem(desc_part, unit_price, quantity, amount))
+            except (ValueError, IndexError):
+                print(f"Skipping unparsable line chunk: {line}")
+                continue
+    return items
+
+
+def parse_bill(text):
+    """Parses one pasted NREGA bill into a BillData in a single scan of the text."""
+    bill = BillData()
+    matches = {}
+    pending = set(_HEADER_PATTERNS)
+    # Lowercased copy sirf trigger dhoondhne ke liye; case-sensitive literal scan IGNORECASE se kaafi tez hai
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        lowered = ''.join(c if len(c.lower()) != 1 else c.lower() for c in text)
+    for trigger in _TRIGGER_PATTERN.finditer(lowered):
+        for key in _TRIGGERS[trigger.group(0)]:
+            if key in pending:
+                match = _HEADER_PATTERNS[key].match(text, trigger.start())
+                if match:
+                    matches[key] = match
+                    pending.discard(key)
+        if not pending:
+            break
+
+    for key in ('district', 'work_description', 'work_code', 'bill_no', 'bill_date'):
+        if key in matches:
+            setattr(bill, key, matches[key].group(1).strip())
+    if 'vendor_raw' in matches:
+        bill.vendor_name = matches['vendor_raw'].group(1).strip()
+        bill.gstin = matches['vendor_raw'].group(2).strip()
+    if 'material_section' in matches:
+        bill.material_items = _parse_item_lines(matches['material_section'].group(1))
+    if 'cgst' in matches:
+        bill.cgst = float(matches['cgst'].group(1))
+    if 'sgst' in matches:
+        bill.sgst = float(matches['sgst'].group(1))
+    if 'total_cash_payment' in matches:
+        bill.total_cash_payment = float(matches['total_cash_payment'].group(1))
+    return bill
+
+
+def parse_nrega_data(text):
+    """Dict version of parse_bill, kept for existing callers."""
+    return parse_bill(text).to_dict()
+
+
+def split_bills(text):
+    """Splits a dump of several pasted bills into one chunk per bill."""
+    if _BILL_SEPARATOR.search(text):
+        chunks = _BILL_SEPARATOR.split(text)
+    else:
+        chunks = _BILL_START.split(text)
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def parse_bills(texts):
+    """
+    Batch entry point: takes a dump string (split with split_bills) or a list of
+    bill texts and returns a BillData per bill, in order.
+    """
+    if isinstance(texts, str):
+        texts = split_bills(texts)
+    return [parse_bill(text) for text in texts]
+
+
+# --- SCHEME LIST EXTRACTOR ---
+# Work code jaise (3422003014/IF/IAY/123). Case-sensitive, jaisa pehle tha.
+_SCHEME_CODE = r'\((?P<code>\d+/[A-Z]+/(?:[A-Z]+/)?\w+)\)'
+
+# Ye wo shabd hain jo Name me nahi aane chahiye (categories + headers + status)
+_SCHEME_CATEGORIES = [
+    r'Works on Individuals Land(?:\s*\(Category [IVX]+\))?',
+    r'Anganwadi/Other Rural Infrastructure',
+    r'Coastal Areas',
+    r'Drought Proofing',
+    r'Rural Drinking Water',
+    r'Food Grain',
+    r'Flood Control and Protection',
+    r'Fisheries',
+    r'Micro Irrigation Works',
+    # Long category name; agle work code ke '(' tak nahi khaana (pehle chunk wahin khatam hota tha)
+    r'Provision of Irrigation facility(?:(?!(?-i:' + _SCHEME_CODE.replace('(?P<code>', '(?:') + r'))[^0-9])+',
+    r'Land Development',
+    r'Other Works',
+    r'Play Ground',
+    r'Rural Connectivity',
+    r'Rural Sanitation',
+    r'Bharat Nirman Sewa Kendra',
+    r'Water Conservation and Water Harvesting',
+    r'Renovation of traditional water bodies',
+]
+_SCHEME_GARBAGE = _SCHEME_CATEGORIES + [
+    r'On Going', r'Completed', r'Approved', r'Suspended', r'New',
+    r'\d{4}-\d{4}',  # Financial Year (e.g. 2024-2025)
+    r'Asset Id', r'Priority', r'Work Category', r'S No\.',  # Header columns
+    r'Financial Year', r'Work Status',
+]
+# Ek hi scan me code aur garbage dono: garbage case-insensitive, code case-sensitive.
+# Aage ka lookahead har position par poori alternation try karne se bachata hai.
+_SCHEME_FIRST = '(?=[(\\d]|(?i:[' + ''.join(sorted({g[0].lower() for g in _SCHEME_GARBAGE if g[0].isalpha()})) + ']))'
+_SCHEME_SCAN = re.compile(_SCHEME_FIRST + '(?:' + _SCHEME_CODE + '|(?i:' + '|'.join(_SCHEME_GARBAGE) + '))')
+_SCHEME_NAME_PREFIX = re.compile(r'^[\s\d\.\-\)]+')  # Priority / Serial No jo naam se chipke hote hain
+
+# Buffer ke end se itne chars pehle khatam hone wale matches hi final maane jaate hain
+_SCHEME_MARGIN = 1024
+TEXT_CHUNK_SIZE = 64 * 1024
+
+
+def _scheme_row(name_text, code):
+    clean_name = _SCHEME_NAME_PREFIX.sub('', name_text).strip()
+    if clean_name and len(clean_name) > 2:
+        return clean_name, code
+    return None
+
+
+def iter_schemes(chunks):
+    """
+    Yields (work_name, work_code) from a pasted NREGA scheme report, given as one
+    string or an iterable of text chunks. The name is whatever follows the last
+    category/status/header marker before each code, minus leading serial numbers.
+    """
+    if isinstance(chunks, str):
+        chunks = (chunks,)
+    buffer = ''
+    name_start = 0  # last garbage/code match ke baad ka position
+    scan_from = 0
+    chunks = iter(chunks)
+    done = False
+    while not done:
+        chunk = next(chunks, None)
+        if chunk is None:
+            done = True
+        else:
+            buffer += chunk
+        safe_end = len(buffer) if done else len(buffer) - _SCHEME_MARGIN
+        resume = None
+        for match in _SCHEME_SCAN.finditer(buffer, scan_from):
+            if match.end() > safe_end:
+                resume = match.start()  # ho sakta hai aage ka text match badal de
+                break
+            if match.group('code') is not None:
+                row = _scheme_row(buffer[name_start:match.start()], match.group('code'))
+                if row:
+                    yield row
+            name_start = match.end()
+        if done:
+            break
+        if resume is None:
+            resume = max(name_start, safe_end)
+        # Jo text ab kaam ka nahi wo phenk do
+        drop = min(name_start, resume)
+        buffer = buffer[drop:]
+        name_start -= drop
+        scan_from = resume - drop
+
+
+def extract_schemes(text):
+    """List version of iter_schemes."""
+    return list(iter_schemes(text))
+
+
+# --- WORK CODE SCANNER ---
+# Codes like 3422003014/RC/7080901347787 (pattern desktop app wala)
+WORK_CODE_PATTERN = re.compile(r'\b(34\d{8}(?:/\w+)+/\d+)\b')
+# Buffer ke end ke itne paas khatam hone wala match agle chunk tak rok kar rakhte hain
+_WORK_CODE_MARGIN = 256
+
+
+def iter_work_codes(chunks):
+    """
+    Yields unique work codes in first-seen order from a string or an iterable
+    of text chunks. A code cut by a chunk boundary is matched once the next
+    chunk arrives, same as findall on the joined text.
+    """
+    if isinstance(chunks, str):
+        chunks = (chunks,)
+    seen = set()
+    buffer = ''
+    scan_from = 0
+    chunks = iter(chunks)
+    done = False
+    while not done:
+        chunk = next(chunks, None)
+        if chunk is None:
+            done = True
+        else:
+            buffer += chunk
+        safe_end = len(buffer) if done else len(buffer) - _WORK_CODE_MARGIN
+        resume = None
+        for match in WORK_CODE_PATTERN.finditer(buffer, scan_from):
+            if match.end() > safe_end:
+                resume = match.start()
+                break
+            code = match.group(1)
+            if code not in seen:
+                seen.add(code)
+                yield code
+            scan_from = match.end()
+        if done:
+            break
+        if resume is None:
+            resume = max(scan_from, safe_end)
+        # Ek char pehle ka bhi rakhte hain taaki \b sahi dekhe
+        drop = max(resume - 1, 0)
+        buffer = buffer[drop:]
+        scan_from = resume - drop
+
+
+def iter_text_chunks(stream, chunk_size=TEXT_CHUNK_SIZE, encoding='utf-8', close=False):
+    """
+    Decodes a binary upload stream chunk by chunk (multi-byte chars split across
+    reads are fine). With close=True the stream is closed once exhausted.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    try:
+        while True:
+            data = stream.read(chunk_size)
+            if not data:
+                break
+            text = decoder.decode(data)
+            if text:
+                yield text
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+    finally:
+        if close:
+            stream.close()
+
+
+# --- NREGA JOBCARD REGISTER (HTML) ---
+# Data table ke exact attributes (pehle BeautifulSoup find() me yahi the)
+JOBCARD_TABLE_ATTRS = {
+    'border': '1',
+    'width': '100%',
+    'bgcolor': 'Floralwhite',
+    'style': 'border-collapse:collapse',
+    'bordercolor': '#111111',
+}
+_VOID_TAGS = frozenset(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+                        'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command',
+                        'frame', 'image', 'isindex', 'nextid', 'spacer', 'menuitem'])
+_SKIP_TEXT_TAGS = frozenset(['script', 'style', 'template'])
+# Upload ka charset: BOM, warna shuru ke itne bytes me <meta charset> / http-equiv content (BeautifulSoup ka UnicodeDammit bhi yahi dekhta tha)
+CHARSET_SNIFF_BYTES = 2048
+_META_CHARSET = re.compile(rb'<meta[^>]*?charset\s*=\s*["\']?\s*([A-Za-z0-9._:-]+)', re.IGNORECASE)
+_BOMS = ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+
+
+def decode_html(data):
+    """
+    Decodes an uploaded HTML page: BOM first, then a <meta> charset near the
+    top, then UTF-8, then windows-1252 (old IE "Save as" pages).
+    """
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            return data.decode(encoding, errors='replace')
+    match = _META_CHARSET.search(data[:CHARSET_SNIFF_BYTES])
+    if match:
+        try:
+            encoding = codecs.lookup(match.group(1).decode('ascii')).name
+        except LookupError:
+            encoding = None
+        # meta me utf-16 likha ho par bytes ASCII jaise hon (BOM nahi mila) to wo galat hai, HTML spec bhi utf-8 maanta hai
+        if encoding in ('iso8859-1', 'ascii'):
+            encoding = 'cp1252'   # browsers (aur UnicodeDammit) inhe windows-1252 padhte hain
+        if encoding and not encoding.startswith(('utf-16', 'utf-32')):
+            return data.decode(encoding, errors='replace')
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('windows-1252', errors='replace')
+
+
+class _Frame:
+    __slots__ = ('tag', 'children', 'string', 'text_start', 'pieces', 'cells', 'has_villages')
+
+    def __init__(self, tag):
+        self.tag = tag
+        self.children = 0
+        self.string = None      # BeautifulSoup ke .string jaisa: sirf ek child ho tab
+        self.text_start = None  # panchayat search ke liye, header_text me is tag ka start
+        self.pieces = None      # <td>: stripped text pieces
+        self.cells = None       # <tr>: har descendant <td> ka frame
+        self.has_villages = False
+
+
+class JobcardHTMLParser(HTMLParser):
+    """
+    Event-driven version of the old BeautifulSoup lookup: finds the
+    "Panchayat" header and the Floralwhite data table, and collects
+    [applicant name, job card no] for every qualifying <tr> as it closes,
+    without building a document tree. feed() it chunks and drain .rows.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self.panchayat = None
+        self.table_found = False
+        self._stack = []
+        self._text = []             # pending text node (consecutive data events)
+        self._header_text = []      # stripped text pieces, sirf jab tak panchayat na mile
+        self._table_depth = None    # stack depth of the data table while inside it
+        self._panchayat_parent = None
+        self._open_tds = []
+        self._open_trs = []
+        self._skip_text = 0
+
+    # BeautifulSoup ki tarah consecutive data ek hi text node hai
+    def _flush_text(self):
+        if not self._text:
+            return
+        text = ''.join(self._text)
+        self._text = []
+        if self._skip_text:
+            return
+        if self._stack:
+            parent = self._stack[-1]
+            parent.children += 1
+            parent.string = text
+        stripped = text.strip()
+        if self.panchayat is None and self._header_text is not None and stripped:
+            self._header_text.append(stripped)
+        if stripped:
+            for td in self._open_tds:
+                td.pieces.append(stripped)
+        if self._open_trs and 'Villages' in text:
+            for tr in self._open_trs:
+                tr.has_villages = True
+
+    def handle_data(self, data):
+        self._text.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text()
+        if self._stack:
+            self._stack[-1].children += 1
+            self._stack[-1].string = None
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if self._stack:
+            self._stack[-1].children += 1
+        if tag in _VOID_TAGS:
+            if self._stack:
+                self._stack[-1].string = None
+            return
+        frame = _Frame(tag)
+        if self._header_text is not None:
+            frame.text_start = len(self._header_text)
+        if tag in _SKIP_TEXT_TAGS:
+            self._skip_text += 1
+        if self._table_depth is not None:
+            if tag == 'tr':
+                frame.cells = []
+                self._open_trs.append(frame)
+            elif tag == 'td':
+                frame.pieces = []
+                self._open_tds.append(frame)
+                # find_all('td') jaisa document order: cell ki jagah start par hi
+                for tr in self._open_trs:
+                    tr.cells.append(frame)
+        elif tag == 'table' and not self.table_found:
+            values = dict(attrs)
+            if all(values.get(name) == value for name, value in JOBCARD_TABLE_ATTRS.items()):
+                self.table_found = True
+                self._table_depth = len(self._stack)
+        self._stack.append(frame)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        # Sabse nayi matching open tag tak pop (BeautifulSoup html.parser jaisa); na mile to ignore
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index].tag == tag:
+                break
+        else:
+            return
+        while len(self._stack) > index:
+            self._close(self._stack.pop())
+
+    def _close(self, frame):
+        parent = self._stack[-1] if self._stack else None
+        if frame.children != 1:
+            frame.string = None
+        if parent is not None:
+            parent.string = frame.string
+        if frame.tag in _SKIP_TEXT_TAGS:
+            self._skip_text -= 1
+
+        if frame.pieces is not None:
+            self._open_tds.remove(frame)
+        elif frame.cells is not None:
+            self._open_trs.remove(frame)
+            cells = frame.cells
+            if len(cells) >= 9 and not frame.has_villages:
+                applicant_name, job_card_no = ''.join(cells[3].pieces), ''.join(cells[8].pieces)
+                if applicant_name and job_card_no and applicant_name not in ["Name of Applicant", "4"]:
+                    self.rows.append([applicant_name, job_card_no])
+        elif self._table_depth is not None and len(self._stack) == self._table_depth:
+            self._table_depth = None
+            # Panchayat header hamesha table se pehle hota hai; iske baad text jama karna band
+            self._header_text = None
+
+        # Pehla <b>Panchayat</b>: poora text uske parent <td> me hai, parent band hone par naam nikalta hai
+        if frame.tag == 'b' and frame.string == 'Panchayat' and self._panchayat_parent is None and self.panchayat is None:
+            self._panchayat_parent = parent
+        elif frame is self._panchayat_parent:
+            full_text = ''
+            if self._header_text is not None and frame.text_start is not None:
+                full_text = ''.join(self._header_text[frame.text_start:])
+            # The text can look like: "Panchayat(note...): Burkundi"
+            self.panchayat = full_text.split(':')[-1].strip() if ':' in full_text else ''
+            self._panchayat_parent = None
+            self._header_text = None
+
+    def close(self):
+        super().close()
+        self._flush_text()
+        while self._stack:
+            self._close(self._stack.pop())
+
+
+def iter_job_card_rows(chunks, parser=None):
+    """Feeds HTML text chunks to a JobcardHTMLParser and yields rows as soon as their <tr> closes."""
+    parser = parser or JobcardHTMLParser()
+    if isinstance(chunks, str):
+        chunks = (chunks,)
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.rows:
+            yield from parser.rows
+            parser.rows = []
+    parser.close()
+    yield from parser.rows
+    parser.rows = []
+
+
+def parse_job_card_html(html_content):
+    """
+    Parses a saved jobcard register page (bytes, str or an iterable of str chunks).
+    Returns a tuple: (data, panchayat_name, error_message)
+    """
+    if isinstance(html_content, bytes):
+        html_content = decode_html(html_content)
+    parser = JobcardHTMLParser()
+    data_to_csv = list(iter_job_card_rows(html_content, parser))
+
+    if not parser.table_found:
+        return None, None, "Could not find the data table on the page. The page structure might have changed."
+    if not data_to_csv:
+        return None, None, "No data could be extracted. Please ensure the file contains data in the expected format."
+    return data_to_csv, parser.panchayat or "default_panchayat", None
@@ -0,0 +1,319 @@
+import functools
+import os
+
+from fontTools.ttLib import TTFont
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+try:
+    import uharfbuzz
+except ImportError:  # optional; iske bina fpdf2 Devanagari matras sahi jagah nahi lagata
+    uharfbuzz = None
+
+# Hindi (work names, demand labels) ke liye Devanagari font; Docker image fonts-noto-core wala deta hai.
+# Na ho to PDF option chhupa rehta hai aur routes HTML print page dete hain.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+UNICODE_FONT_PATH = os.environ.get('PDF_FONT_PATH') or os.path.join(BASE_DIR, 'static', 'fonts', 'NotoSansDevanagari-Regular.ttf')
+UNICODE_BOLD_FONT_PATH = os.environ.get('PDF_BOLD_FONT_PATH') or os.path.join(BASE_DIR, 'static', 'fonts', 'NotoSansDevanagari-Bold.ttf')
+DEVANAGARI_KA = 0x0915
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+@functools.lru_cache(maxsize=None)
+def hindi_pdf_available():
+    """
+    True when a PDF can print Hindi: UNICODE_FONT_PATH has Devanagari glyphs
+    (plain NotoSans-Regular doesn't) and uharfbuzz is there for shaping.
+    """
+    if uharfbuzz is None:
+        return False
+    try:
+        font = TTFont(UNICODE_FONT_PATH, lazy=True)
+        try:
+            return DEVANAGARI_KA in font.getBestCmap()
+        finally:
+            font.close()
+    except Exception:  # font missing ya padha nahi gaya
+        return False
+
+
+class BatchPDF(FPDF):
+    """
+    One FPDF document shared by every page of a batch, so fonts (and any image)
+    are embedded once no matter how many invoices/forms go into it. Only build
+    one when hindi_pdf_available().
+    """
+
+    def __init__(self):
+        super().__init__(orientation='P', unit='mm', format='A4')
+        self.set_auto_page_break(auto=True, margin=15)
+        self.set_margins(15, 15, 15)
+        self.add_font('Body', '', UNICODE_FONT_PATH)
+        self.add_font('Body', 'B', UNICODE_BOLD_FONT_PATH if os.path.exists(UNICODE_BOLD_FONT_PATH) else UNICODE_FONT_PATH)
+        self.set_text_shaping(True)
+
+    def txt(self, value):
+        return '' if value is None else str(value)
+
+    def font(self, size=10, bold=False):
+        self.set_font('Body', 'B' if bold else '', size)
+
+    def line_cell(self, w, h, text, border=0, align='L', bold=False, size=10, fill=False):
+        self.font(size, bold)
+        self.cell(w, h, self.txt(text), border=border, align=align, fill=fill, new_x=XPos.RIGHT, new_y=YPos.TOP)
+
+    def newline(self, h):
+        self.set_xy(self.l_margin, self.get_y() + h)
+
+
+def render_invoice(pdf, data, vendor):
+    """Draws one invoice (same layout as preview.html) on a new page."""
+    pdf.add_page()
+    width = pdf.epw
+
+    pdf.font(16, bold=True)
+    pdf.cell(width, 8, pdf.txt((vendor.get('name') or '').upper()), align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.font(10)
+    pdf.multi_cell(width, 5, pdf.txt(vendor.get('address')), align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.cell(width, 5, pdf.txt(f"MOB: {vendor.get('mobile') or ''}"), align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.ln(4)
+
+    pdf.line_cell(width / 2, 6, f"GSTIN/UIN: {vendor.get('gstin') or ''}")
+    pdf.line_cell(width / 2, 6, 'TAX INVOICE', align='R', bold=True, size=13)
+    pdf.newline(9)
+
+    # Buyer's details (left) + invoice details (right)
+    left_w, right_w = width * 0.55, width * 0.45
+    top = pdf.get_y()
+    pdf.font(10, bold=True)
+    pdf.cell(left_w, 6, "Buyer's Details", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.font(9)
+    pdf.multi_cell(left_w, 4.5, pdf.txt(data.get('work_description')), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.font(10)
+    for label in ('panchayat', 'block', 'district'):
+        pdf.cell(left_w, 5.5, pdf.txt(f"{label.title()}: {data.get(label) or ''}"), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    left_bottom = pdf.get_y()
+
+    pdf.set_xy(pdf.l_margin + left_w, top)
+    rows = [
+        (f"Invoice No: {data.get('bill_no') or ''}", f"Dated: {data.get('bill_date') or ''}"),
+        ('Delivery Note:', data.get('delivery_note') or ''),
+        ("Buyer's Order No:", ''),
+        (data.get('work_code') or '', None),
+        ('Terms of Payment:', data.get('terms_of_payment') or ''),
+    ]
+    for first, second in rows:
+        pdf.set_x(pdf.l_margin + left_w)
+        if second is None:
+            pdf.line_cell(right_w, 6, first, border=1, size=9)
+        else:
+            pdf.line_cell(right_w / 2, 6, first, border=1, size=9)
+            pdf.line_cell(right_w / 2, 6, second, border=1, size=9)
+        pdf.set_y(pdf.get_y() + 6)
+    right_bottom = pdf.get_y()
+
+    bottom = max(left_bottom, right_bottom)
+    pdf.rect(pdf.l_margin, top, left_w, bottom - top)
+    pdf.set_xy(pdf.l_margin, bottom + 4)
+
+    # Items
+    col_w = (width * 0.08, width * 0.5, width * 0.12, width * 0.14, width * 0.16)
+    pdf.set_fill_color(242, 242, 242)
+    for w, head in zip(col_w, ('Sl No.', 'Description of Goods', 'Qty', 'Rate', 'Amount')):
+        pdf.line_cell(w, 7, head, border=1, align='C', bold=True, fill=True)
+    pdf.newline(7)
+    for index, item in enumerate(data.get('material_items', []), start=1):
+        pdf.font(9)
+        lines = pdf.multi_cell(col_w[1], 5, pdf.txt(item['material']), dry_run=True, output='LINES')
+        h = max(len(lines), 1) * 5 + 1
+        if pdf.will_page_break(h):
+            pdf.add_page()
+        y = pdf.get_y()
+        pdf.line_cell(col_w[0], h, index, border=1, align='C', size=9)
+        x = pdf.get_x()
+        pdf.multi_cell(col_w[1], 5, pdf.txt(item['material']), border=0, new_x=XPos.RIGHT, new_y=YPos.TOP)
+        pdf.rect(x, y, col_w[1], h)
+        pdf.set_xy(x + col_w[1], y)
+        pdf.line_cell(col_w[2], h, f"{item['quantity']:.2f}", border=1, align='C', size=9)
+        pdf.line_cell(col_w[3], h, f"{item['unit_price']:.2f}", border=1, align='R', size=9)
+        pdf.line_cell(col_w[4], h, f"{item['amount']:.2f}", border=1, align='R', size=9)
+        pdf.set_xy(pdf.l_margin, y + h)
+    pdf.ln(5)
+
+    # Amount in words + bank details (left), totals (right)
+    top = pdf.get_y()
+    left_w, gap = width * 0.55, width * 0.02
+    right_w = width - left_w - gap
+    pdf.font(9)
+    pdf.multi_cell(left_w, 5, pdf.txt(f"Amount (In words): {data.get('amount_in_words', '')}"), border=1, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.ln(2)
+    bank_rows = [('Bank Name', vendor.get('bank_name')), ('Account No', vendor.get('account_no')),
+                 ('Branch', vendor.get('branch')), ('IFSC Code', vendor.get('ifsc'))]
+    if vendor.get('payid'):
+        bank_rows.append(('PAYID', vendor.get('payid')))
+    for label, value in bank_rows:
+        pdf.line_cell(30, 6, label, border=1, bold=True, size=9)
+        pdf.line_cell(left_w - 30, 6, value or '', border=1, size=9)
+        pdf.newline(6)
+    left_bottom = pdf.get_y()
+
+    pdf.set_y(top)
+    totals = [('Subtotal', data.get('subtotal', 0.0)), ('Centre GST', data.get('cgst', 0.0)),
+              ('State GST', data.get('sgst', 0.0)), ('R/O', data.get('round_off', 0.0))]
+    for label, value in totals:
+        pdf.set_x(pdf.l_margin + left_w + gap)
+        pdf.line_cell(right_w * 0.65, 6, label, border=1, align='R', bold=True, size=9)
+        pdf.line_cell(right_w * 0.35, 6, f"{value:.2f}", border=1, align='R', size=9)
+        pdf.set_y(pdf.get_y() + 6)
+    pdf.set_x(pdf.l_margin + left_w + gap)
+    pdf.line_cell(right_w * 0.65, 7, 'Total Amount', border=1, align='R', bold=True, size=10, fill=True)
+    pdf.line_cell(right_w * 0.35, 7, f"{data.get('final_total', 0):.2f}", border=1, align='R', bold=True, size=10, fill=True)
+    pdf.set_xy(pdf.l_margin, max(left_bottom, pdf.get_y() + 7) + 10)
+
+    pdf.font(10)
+    pdf.cell(width, 6, pdf.txt(f"For {vendor.get('name') or ''}"), align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    signatures = data.get('signatures') or []
+    if signatures:
+        pdf.ln(16)
+        per_row = 4
+        slot = width / per_row
+        for start in range(0, len(signatures), per_row):
+            y = pdf.get_y()
+            for i, sig in enumerate(signatures[start:start + per_row]):
+                x = pdf.l_margin + i * slot + 5
+                pdf.line(x, y, x + slot - 10, y)
+                pdf.set_xy(x, y + 1)
+                pdf.line_cell(slot - 10, 5, sig, align='C', size=9)
+            pdf.set_xy(pdf.l_margin, y + 18)
+
+
+def render_skipped_summary(pdf, rendered, skipped):
+    """First page of a batch: how many invoices follow and every bill left out, with the reason."""
+    pdf.add_page()
+    width = pdf.epw
+    pdf.font(14, bold=True)
+    pdf.cell(width, 8, 'Batch Summary', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.font(10)
+    pdf.cell(width, 6, f'{rendered} invoice(s) in this PDF, {len(skipped)} bill(s) skipped:',
+             new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.ln(2)
+    col_w = (width * 0.45, width * 0.55)
+    pdf.set_fill_color(242, 242, 242)
+    pdf.line_cell(col_w[0], 7, 'Bill', border=1, bold=True, fill=True)
+    pdf.line_cell(col_w[1], 7, 'Reason', border=1, bold=True, fill=True)
+    pdf.newline(7)
+    for label, reason in skipped:
+        if pdf.will_page_break(6):
+            pdf.add_page()
+        pdf.line_cell(col_w[0], 6, label, border=1, size=9)
+        pdf.line_cell(col_w[1], 6, reason, border=1, size=9)
+        pdf.newline(6)
+
+
+def render_invoices_pdf(invoices, skipped=()):
+    """
+    Renders [(data, vendor), ...] into one multi-page PDF and returns its bytes.
+    Skipped bills ([(label, reason)]) get a summary page in front.
+    """
+    pdf = BatchPDF()
+    if skipped:
+        render_skipped_summary(pdf, len(invoices), skipped)
+    for data, vendor in invoices:
+        render_invoice(pdf, data, vendor)
+    return bytes(pdf.output())
+
+
+# Demand print ke labels (demand_print.html jaise)
+DEMAND_LABELS = {
+    'to': 'सेवा में', 'recipients': 'मुखिया / पंचायत सचिव / रोजगार सेवक / कनीय अभियंता',
+    'panchayat': 'ग्राम पंचायत', 'subject_label': 'विषय :-',
+    'subject': 'मनरेगा में मजदूरों का डिमांड के सम्बन्ध में',
+    'columns': ('क्र०', 'जॉब कार्ड स०', 'मजदुर का नाम', 'अभ्युक्ति'),
+    'signatures': ('लाभुक', 'रोजगार सेवक', 'कनीय अभियंता', 'पंचायत सचिव', 'मुखिया'),
+}
+DEMAND_MIN_ROWS = 20   # demand_print.html jaisa, khali rows se 20 tak bharte hain
+
+
+def _demand_table_header(pdf, col_w):
+    pdf.set_fill_color(229, 231, 235)
+    for w, head in zip(col_w, DEMAND_LABELS['columns']):
+        pdf.line_cell(w, 8, head, border=1, align='C', bold=True, size=10, fill=True)
+    pdf.newline(8)
+
+
+def render_demand(pdf, data):
+    """Draws one saved demand (same layout as demand_print.html), continuing on new pages if it is long."""
+    pdf.add_page()
+    width = pdf.epw
+
+    pdf.line_cell(width / 2, 6, DEMAND_LABELS['to'], size=11, bold=True)
+    pdf.line_cell(width / 2, 6, f"{DEMAND_LABELS['panchayat']}: {data['panchayat']}", align='R', size=11, bold=True)
+    pdf.newline(6)
+    pdf.set_x(pdf.l_margin + 8)
+    pdf.line_cell(width - 8, 6, DEMAND_LABELS['recipients'], size=10)
+    pdf.newline(9)
+    pdf.line_cell(22, 6, DEMAND_LABELS['subject_label'], bold=True, size=11)
+    pdf.font(11, bold=True)
+    pdf.cell(width - 22, 6, pdf.txt(DEMAND_LABELS['subject']), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.ln(3)
+
+    pdf.font(10)
+    pdf.multi_cell(width, 5, pdf.txt(data.get('scheme_full_name')), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.font(10, bold=True)
+    pdf.cell(width, 7, pdf.txt(f"Work Code: {data.get('work_code') or ''}"), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.ln(2)
+
+    col_w = (width * 0.08, width * 0.30, width * 0.42, width * 0.20)
+    _demand_table_header(pdf, col_w)
+    labourers = data.get('labourers', [])
+    for index in range(1, max(len(labourers), DEMAND_MIN_ROWS) + 1):
+        labour = labourers[index - 1] if index <= len(labourers) else {}
+        if pdf.will_page_break(8):
+            pdf.add_page()
+            _demand_table_header(pdf, col_w)
+        pdf.line_cell(col_w[0], 8, index, border=1, align='C', size=10)
+        pdf.line_cell(col_w[1], 8, labour.get('card', ''), border=1, size=9, bold=True)
+        pdf.line_cell(col_w[2], 8, labour.get('name', ''), border=1, size=10)
+        pdf.line_cell(col_w[3], 8, '', border=1)
+        pdf.newline(8)
+
+    # Signatures neeche, page me jagah na ho to agle page par
+    if pdf.will_page_break(30):
+        pdf.add_page()
+    pdf.ln(18)
+    slot = width / len(DEMAND_LABELS['signatures'])
+    y = pdf.get_y()
+    for i, label in enumerate(DEMAND_LABELS['signatures']):
+        x = pdf.l_margin + i * slot + 2
+        pdf.set_draw_color(150, 150, 150)
+        pdf.dashed_line(x, y, x + slot - 4, y, 1, 1)
+        pdf.set_xy(x, y + 1)
+        pdf.line_cell(slot - 4, 5, label, align='C', bold=True, size=9)
+    pdf.set_draw_color(0, 0, 0)
+    pdf.set_xy(pdf.l_margin, y + 12)
+
+    pdf.set_text_color(150, 150, 150)
+    code = data.get('work_code') or ''
+    pdf.line_cell(width / 2, 4, f"System ID: {code[-6:] if code else 'GEN'}", size=7)
+    pdf.line_cell(width / 2, 4, f"Generated via NregaBot - {data.get('date', '')}", align='R', size=7)
+    pdf.set_text_color(0, 0, 0)
+
+
+def render_demands_pdf(demands):
+    """Renders demand_print.html-style dicts into one multi-page PDF and returns its bytes."""
+    pdf = BatchPDF()
+    for data in demands:
+        render_demand(pdf, data)
+    return bytes(pdf.output())
+
+
+def iter_pdf_chunks(pdf_bytes, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yields the finished PDF in fixed-size chunks for a streamed Response.
+    fpdf2 lays out the whole document in memory first, so this only chunks the send.
+    """
+    view = memoryview(pdf_bytes)
+    for start in range(0, len(view), chunk_size):
+        yield bytes(view[start:start + chunk_size])
@@ -0,0 +1,947 @@
+import csv
+import gzip
+import hashlib
+import itertools
+import json
+import math
+import os
+import shutil
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from snapshots import Snapshot, SnapshotError, clean_value, write_snapshot
+
+try:
+    import brotli
+except ImportError:  # brotli optional hai, na ho to sirf gzip
+    brotli = None
+
+
+_MISSING = object()
+SCHEME_MEMO_SIZE = 50000
+
+
+def _file_stamp(path):
+    """Returns (mtime_ns, size) for a file, or None if it is gone."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _is_scheme_file(filename):
+    lower = filename.lower()
+    return lower.endswith('.csv') and 'schemes' in lower
+
+
+JOBCARD_KIND = 'jobcard'
+SCHEME_KIND = 'schemes'
+
+
+def snapshot_kind(filename):
+    """Snapshot kind an uploaded CSV gets from its name, or None for other files."""
+    if _is_scheme_file(filename):
+        return SCHEME_KIND
+    lower = filename.lower()
+    if lower.endswith('.csv') and 'jobcard' in lower:
+        return JOBCARD_KIND
+    return None
+
+
+class CompressedSidecars:
+    """
+    Precompressed copies of public CSVs, kept in cache_dir and named after the
+    source file's path, mtime and size so a re-uploaded file never gets a stale
+    sidecar. Built lazily on first request for each encoding.
+    """
+
+    MIN_SIZE = 1024
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def encodings():
+        return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def _prefix(self, path):
+        return hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+
+    def get(self, path, encoding):
+        """Returns the sidecar path for `encoding`, building it if needed, or None."""
+        if encoding not in self.encodings():
+            return None
+        stamp = _file_stamp(path)
+        if stamp is None or stamp[1] < self.MIN_SIZE:
+            return None
+        prefix = self._prefix(path)
+        ext = 'br' if encoding == 'br' else 'gz'
+        sidecar = os.path.join(self.cache_dir, f"{prefix}-{stamp[0]}-{stamp[1]}.{ext}")
+        if os.path.exists(sidecar):
+            return sidecar
+
+        with self._lock:
+            if os.path.exists(sidecar):
+                return sidecar
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Purane mtime wale sidecars hata do
+            for name in os.listdir(self.cache_dir):
+                if name.startswith(prefix + '-') and name.endswith('.' + ext):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        pass
+            tmp_path = f"{sidecar}.{os.getpid()}.tmp"
+            try:
+                with open(path, 'rb') as src:
+                    if encoding == 'br':
+                        compressor = brotli.Compressor(mode=brotli.MODE_TEXT)
+                        with open(tmp_path, 'wb') as dst:
+                            for chunk in iter(lambda: src.read(64 * 1024), b''):
+                                dst.write(compressor.process(chunk))
+                            dst.write(compressor.finish())
+                    else:
+                        with open(tmp_path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as dst:
+                            shutil.copyfileobj(src, dst, 64 * 1024)
+                os.replace(tmp_path, sidecar)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return None
+        return sidecar
+
+
+class LocationCatalog:
+    """
+    Shared District -> Block -> files catalog of public_data. The tree is walked
+    once, then patched per directory: admin_action calls refresh() for the folder
+    it touched, and check() re-scans any directory whose mtime changed behind our
+    back (throttled to once every `check_interval` seconds). The JSON body and its
+    ETag are precomputed so /api/public/locations doesn't re-serialize anything.
+    """
+
+    def __init__(self, root, check_interval=2.0):
+        self.root = root
+        self.check_interval = check_interval
+        self.version = 0
+        self._lock = threading.Lock()
+        self._dirs = None               # parts tuple -> (mtime_ns, csv filenames, subdir keys)
+        self._last_check = 0.0
+        self._body = None
+        self._etag = None
+
+    def _abs(self, key):
+        return os.path.join(self.root, *key)
+
+    def _drop_tree(self, key):
+        entry = self._dirs.pop(key, None)
+        if entry:
+            for sub in entry[2]:
+                self._drop_tree(sub)
+
+    def _scan_dir(self, key):
+        path = self._abs(key)
+        try:
+            # mtime pehle lo, taaki scan ke beech hua change agle check me pakda jaye
+            mtime = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                entries = [(e.name, e.is_dir()) for e in it]
+        except OSError:
+            self._drop_tree(key)
+            return
+        files = sorted(name for name, is_dir in entries if not is_dir and name.lower().endswith('.csv'))
+        subdirs = sorted(key + (name,) for name, is_dir in entries if is_dir)
+
+        old = self._dirs.get(key)
+        if old:
+            for sub in set(old[2]) - set(subdirs):
+                self._drop_tree(sub)
+        self._dirs[key] = (mtime, files, subdirs)
+        for sub in subdirs:
+            if sub not in self._dirs:
+                self._scan_dir(sub)
+
+    def _changed(self):
+        self.version += 1
+        self._body = None
+        self._etag = None
+
+    def _ensure_built(self):
+        if self._dirs is None:
+            self._dirs = {}
+            self._scan_dir(())
+            self._last_check = time.monotonic()
+            self._changed()
+
+    def refresh(self, path):
+        """Re-scans the directory containing changes (or its nearest known ancestor)."""
+        with self._lock:
+            if self._dirs is None:
+                return
+            rel = os.path.relpath(os.path.abspath(path), os.path.abspath(self.root))
+            key = () if rel == os.curdir else tuple(rel.split(os.sep))
+            if key and key[0] == os.pardir:
+                return
+            while key and key not in self._dirs:
+                key = key[:-1]
+            self._scan_dir(key)
+            self._changed()
+
+    def check(self, force=False):
+        """Picks up external changes by comparing directory mtimes."""
+        with self._lock:
+            self._ensure_built()
+            now = time.monotonic()
+            if not force and now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+            stale = []
+            for key, (mtime, _, _) in self._dirs.items():
+                try:
+                    if os.stat(self._abs(key)).st_mtime_ns != mtime:
+                        stale.append(key)
+                except OSError:
+                    stale.append(key)
+            if stale:
+                for key in sorted(stale, key=len):
+                    if key in self._dirs:
+                        self._scan_dir(key)
+                self._changed()
+
+    def files(self):
+        """Absolute paths of every CSV in the catalog."""
+        self.check()
+        with self._lock:
+            return [os.path.join(self._abs(key), name)
+                    for key in sorted(self._dirs) for name in self._dirs[key][1]]
+
+    def structure(self):
+        """District -> Block -> [filenames] for CSVs at least two folders deep."""
+        with self._lock:
+            self._ensure_built()
+            return self._structure()
+
+    def _structure(self):
+        structure = {}
+        for key in sorted(self._dirs):
+            files = [name for name in self._dirs[key][1] if name.endswith('.csv')]
+            if len(key) >= 2 and files:
+                structure.setdefault(key[0], {}).setdefault(key[1], []).extend(files)
+        return structure
+
+    def panchayats(self):
+        """
+        Panchayat (lower-case) -> (district, block), from the '<Panchayat>_...csv'
+        file names the demand form also takes its panchayat from.
+        """
+        self.check()
+        with self._lock:
+            found = {}
+            for district, blocks in self._structure().items():
+                for block, files in blocks.items():
+                    for name in files:
+                        found.setdefault(name.split('_')[0].strip().lower(), (district, block))
+            return found
+
+    def snapshot(self):
+        """Returns (json_body_bytes, etag) for the current tree."""
+        self.check()
+        with self._lock:
+            if self._body is None:
+                self._body = json.dumps(self._structure()).encode('utf-8')
+                self._etag = hashlib.sha1(self._body).hexdigest()
+            return self._body, self._etag
+
+
+class SchemeTable:
+    """Work Code -> Scheme Name of one scheme file, looked up by bisect in its snapshot."""
+
+    def __init__(self, snapshot):
+        self._codes = snapshot.strings('codes') if snapshot is not None else ()
+        self._names = snapshot.strings('names') if snapshot is not None else ()
+
+    def __len__(self):
+        return len(self._codes)
+
+    def get(self, code, default=None):
+        i = bisect_left(self._codes, code)
+        if i < len(self._codes) and self._codes[i] == code:
+            return self._names[i]
+        return default
+
+
+class SchemeCodes:
+    """
+    Read-only mapping over a panchayat's scheme files in walk order (first file
+    with a code wins). Results are memoized, the tables themselves stay shared.
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+        self._memo = {}
+
+    def __len__(self):
+        return sum(len(table) for table in self.tables)
+
+    def get(self, code, default=None):
+        name = self._memo.get(code, _MISSING)
+        if name is _MISSING:
+            name = None
+            for table in self.tables:
+                name = table.get(code)
+                if name is not None:
+                    break
+            if len(self._memo) < SCHEME_MEMO_SIZE:
+                self._memo[code] = name
+        return default if name is None else name
+
+
+class SchemeIndex:
+    """
+    Per-process index of Work Code -> Scheme Name over the *_schemes.csv files
+    in public_data. Lookups are keyed by (panchayat, work_code) and only touch
+    the disk to stat the candidate files, which are re-read (from their
+    columnar snapshot when `snapshots` is given) when their mtime/size changes
+    or after invalidate() is called.
+    """
+
+    def __init__(self, root, catalog=None, snapshots=None):
+        self.root = root
+        self.catalog = catalog
+        self.snapshots = snapshots
+        self._lock = threading.Lock()
+        self._scheme_files = None       # walk-ordered list of scheme file paths
+        self._catalog_version = None
+        self._files = {}                # path -> (stamp, {code: name})
+        self._panchayats = {}           # panchayat_lower -> (stamps, {code: name})
+        self.hits = 0
+        self.misses = 0
+        self.file_loads = 0
+
+    def invalidate(self, path=None):
+        """Drops cached state; with a path only that file (or folder) is dropped."""
+        with self._lock:
+            if path is None:
+                self._files.clear()
+            else:
+                path = os.path.abspath(path)
+                for cached in list(self._files):
+                    if cached == path or cached.startswith(path + os.sep):
+                        del self._files[cached]
+            self._scheme_files = None
+            self._panchayats.clear()
+
+    def _list_scheme_files(self):
+        if self.catalog is not None:
+            # Catalog already tracks folder changes, bas uska version compare karna hai
+            self.catalog.check()
+            if self._scheme_files is None or self.catalog.version != self._catalog_version:
+                self._catalog_version = self.catalog.version
+                self._scheme_files = [p for p in self.catalog.files() if _is_scheme_file(os.path.basename(p))]
+                self._panchayats.clear()
+            return self._scheme_files
+        if self._scheme_files is None:
+            found = []
+            if os.path.exists(self.root):
+                for root, dirs, files in os.walk(self.root):
+                    for file in files:
+                        if _is_scheme_file(file):
+                            found.append(os.path.abspath(os.path.join(root, file)))
+            self._scheme_files = found
+        return self._scheme_files
+
+    def _load_file(self, path, stamp):
+        cached = self._files.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        try:
+            snapshot = self.snapshots.open(path, SCHEME_KIND) if self.snapshots is not None else None
+            if snapshot is None:
+                # CSV Format: Scheme Name, Work Code (first occurrence wins)
+                snapshot = Snapshot.from_columns(SCHEME_KIND, *scheme_columns(path))
+            codes = SchemeTable(snapshot)
+        except Exception:
+            codes = SchemeTable(None)
+        self._files[path] = (stamp, codes)
+        self.file_loads += 1
+        return codes
+
+    def _panchayat_codes(self, panchayat):
+        key = panchayat.lower()
+        candidates = [p for p in self._list_scheme_files() if key in os.path.basename(p).lower()]
+        stamps = tuple(_file_stamp(p) for p in candidates)
+
+        cached = self._panchayats.get(key)
+        if cached and cached[0] == stamps:
+            return cached[1]
+
+        merged = SchemeCodes([self._load_file(path, stamp) for path, stamp in zip(candidates, stamps) if stamp is not None])
+        self._panchayats[key] = (stamps, merged)
+        return merged
+
+    def lookup(self, panchayat, work_code):
+        """Returns the scheme name for work_code in the panchayat's scheme files, or None."""
+        if not work_code:
+            return None
+        with self._lock:
+            name = self._panchayat_codes(panchayat or '').get(work_code.strip())
+            if name is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return name
+
+    def codes_for(self, panchayat):
+        """Work Code -> Scheme Name for the panchayat's scheme files (all files for ''), for bulk joins."""
+        with self._lock:
+            return self._panchayat_codes(panchayat or '')
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'file_loads': self.file_loads,
+                'files_cached': len(self._files),
+                'panchayats_cached': len(self._panchayats),
+            }
+
+
+def split_job_card(job_card):
+    """
+    Splits a job card like JH-22-003-007-006/660 into (village_code, short, suffix),
+    same rules as the contractor list builder: ('006', '660', '006/660').
+    """
+    parts = job_card.split('-')
+    suffix = parts[-1]
+    short = suffix
+    village = 'Unknown'
+    if '/' in suffix:
+        slash_parts = suffix.split('/')
+        village = slash_parts[0]
+        short = slash_parts[1]
+    elif len(parts) >= 2:
+        village = parts[-2]
+    return village, short, suffix
+
+
+# --- CSV ingestion (upload time) ---
+JOBCARD_HEADER = ('Name of Applicant', 'Job Card Number')
+NOT_AN_ENTRY = 0xFFFFFFFF   # entry_rank of rows the demand form skips ('*' in the name)
+SCHEME_HEADER = ('Scheme Name', 'Work Code')
+
+
+def normalize_job_card(card):
+    """'jh-22-003-007-006 /660' -> 'JH-22-003-007-006/660' (no spaces, upper case)."""
+    return ''.join(card.split()).upper()
+
+
+def _check_header(row, words, expected):
+    # Har column ka naam loose match: 'Name of Applicant' / 'Applicant Name' dono chalenge
+    cols = [col.strip().lower() for col in row]
+    if len(cols) < 2 or not all(any(w in col for w in options) for col, options in zip(cols, words)):
+        found = ', '.join(col.strip() for col in row[:3]) or 'nothing'
+        raise SnapshotError(f"header should be '{', '.join(expected)}', found '{found}'")
+
+
+def _csv_rows(path):
+    """Non-blank CSV rows of a public file, numbered the way the browser numbers lines."""
+    with open(path, 'r', encoding='utf-8', errors='ignore', newline='') as f:
+        line_no = 0
+        for row in csv.reader(f):
+            if not row or (len(row) == 1 and not row[0].strip()):
+                continue
+            line_no += 1
+            yield line_no, row
+
+
+def jobcard_columns(path, strict=False):
+    """
+    Parses a *_jobcard.csv into (rows, meta, snapshot columns). Job cards are
+    normalized and split into village code / short number / suffix here, once,
+    and the match / search keys are precomputed. With strict the header must
+    look like JOBCARD_HEADER (SnapshotError otherwise).
+    """
+    ids, village_of, deleted = array('I'), array('H'), bytearray()
+    names, cards, shorts, suffixes, village_codes = [], [], [], [], []
+    village_slots, village_rows = {}, []
+    for line_no, row in _csv_rows(path):
+        if line_no == 1:
+            if strict:
+                _check_header(row, (('name', 'applicant'), ('card',)), JOBCARD_HEADER)
+            continue
+        cols = [clean_value(col.strip().replace('"', '')) for col in row]
+        if len(cols) < 2 or not cols[0] or not cols[1]:
+            continue
+        name, card = cols[0], normalize_job_card(cols[1])
+        village, short, suffix = split_job_card(card)
+
+        slot = village_slots.get(village)
+        if slot is None:
+            slot = village_slots[village] = len(village_codes)
+            village_codes.append(village)
+            village_rows.append(array('I'))
+
+        village_rows[slot].append(len(names))
+        ids.append(line_no - 1)
+        names.append(name)
+        cards.append(card)
+        shorts.append(short)
+        suffixes.append(suffix)
+        village_of.append(slot)
+        deleted.append(1 if name.endswith('*') else 0)
+    if strict and not names:
+        raise SnapshotError('no job card rows found')
+
+    # Har village ki rows ek saath, starts[slot]..starts[slot + 1]
+    grouped, starts = array('I'), array('I', [0])
+    for positions in village_rows:
+        grouped.extend(positions)
+        starts.append(len(grouped))
+
+    # Bulk Select: short / suffix / full card par sorted row orders (deleted rows nahi),
+    # bisect key=column se; key strings dobara store nahi hote
+    live = [pos for pos in range(len(names)) if not deleted[pos]]
+    orders = {f'{name}_order': ('I', sorted(live, key=lambda pos, col=col: (col[pos], pos)))
+              for name, col in (('short', shorts), ('suffix', suffixes), ('card', cards))}
+    # Demand form search sirf bina '*' wale naam leta hai; entry_rank = unka file-order index
+    entry_rank, entries = array('I'), 0
+    for name in names:
+        if '*' in name:
+            entry_rank.append(NOT_AN_ENTRY)
+        else:
+            entry_rank.append(entries)
+            entries += 1
+    columns = {
+        'ids': ('I', ids), 'names': ('str', names), 'cards': ('str', cards),
+        'shorts': ('str', shorts), 'suffixes': ('str', suffixes),
+        'village_of': ('H', village_of), 'village_codes': ('str', village_codes),
+        'deleted': ('B', deleted), 'village_rows': ('I', grouped), 'village_starts': ('I', starts),
+        'name_keys': ('str', [_search_key(name) for name in names]),
+        'entry_rank': ('I', entry_rank),
+        **orders,
+    }
+    # Cards normally ASCII upper-case hote hain, unhe seedha term.upper() se scan karte hain.
+    # Koi non-ASCII card ho tabhi alag lower-case keys rakhni padti hain.
+    if not all(card.isascii() for card in cards):
+        columns['card_keys'] = ('str', [_search_key(card) for card in cards])
+    return len(names), {'deleted': deleted.count(1), 'entries': entries}, columns
+
+
+def scheme_columns(path, strict=False):
+    """Parses a *_schemes.csv into sorted (work code, scheme name) columns; first occurrence of a code wins."""
+    codes, names, seen = [], [], set()
+    for line_no, row in _csv_rows(path):
+        if line_no == 1:
+            if strict:
+                _check_header(row, (('scheme', 'name', 'work'), ('code',)), SCHEME_HEADER)
+            continue
+        if len(row) < 2:
+            continue
+        code = clean_value(row[1].strip())
+        if code in seen:
+            continue
+        seen.add(code)
+        codes.append(code)
+        names.append(clean_value(row[0].strip()))
+    if strict and not codes:
+        raise SnapshotError('no scheme rows found')
+    # Code ke hisaab se sorted, lookup bisect se hota hai
+    order = sorted(range(len(codes)), key=codes.__getitem__)
+    return len(codes), {}, {'codes': ('str', [codes[i] for i in order]), 'names': ('str', [names[i] for i in order])}
+
+
+class PublicSnapshots:
+    """
+    Columnar snapshots (see snapshots.py) of public jobcard / scheme CSVs, kept
+    in cache_dir and named after the CSV's path, kind, mtime and size like the
+    compressed sidecars. admin_action builds them at upload; files copied in by
+    hand get theirs on first read.
+    """
+
+    INGEST = {JOBCARD_KIND: jobcard_columns, SCHEME_KIND: scheme_columns}
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def _prefix(self, path):
+        return hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+
+    def path_for(self, path, kind, stamp):
+        return os.path.join(self.cache_dir, f"{self._prefix(path)}-{kind}-{stamp[0]}-{stamp[1]}.snap")
+
+    def ingest(self, path, kind, strict=False):
+        """(rows, meta, columns) parsed from the CSV; raises SnapshotError on a bad header when strict."""
+        return self.INGEST[kind](path, strict=strict)
+
+    def build(self, path, kind, parsed=None):
+        """Writes the snapshot for the file as it is now (parsed = ingest() result to reuse). Returns its path."""
+        stamp = _file_stamp(path)
+        if stamp is None:
+            return None
+        rows, meta, columns = parsed or self.ingest(path, kind)
+        target = self.path_for(path, kind, stamp)
+        prefix = f"{self._prefix(path)}-{kind}-"
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Purane stamp wale snapshots hata do
+            for name in os.listdir(self.cache_dir):
+                if name.startswith(prefix) and name.endswith('.snap') and name != os.path.basename(target):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        pass
+            write_snapshot(target, kind, rows, columns, meta=dict(meta, source=os.path.abspath(path), stamp=stamp))
+            self.builds += 1
+        return target
+
+    def open(self, path, kind):
+        """Snapshot of the file's current contents (built now if missing), or None if the file is gone."""
+        stamp = _file_stamp(path)
+        if stamp is None:
+            return None
+        target = self.path_for(path, kind, stamp)
+        if os.path.exists(target):
+            try:
+                return Snapshot(target)
+            except SnapshotError:
+                pass  # purane format / adhoori file: dobara bana do
+        target = self.build(path, kind)
+        return Snapshot(target) if target else None
+
+    def warm(self, root):
+        """
+        Builds the missing / stale snapshots of every jobcard and scheme CSV
+        under root. Returns (built, files). Run before the workers start so
+        none of them parses a big CSV on a request.
+        """
+        builds, files = self.builds, 0
+        for dirpath, _, names in os.walk(root):
+            for name in names:
+                kind = snapshot_kind(name)
+                if kind is None:
+                    continue
+                files += 1
+                try:
+                    snapshot = self.open(os.path.join(dirpath, name), kind)
+                except (OSError, SnapshotError):
+                    continue  # ye file pehle request par CSV se hi padhi jayegi
+                if snapshot is not None:
+                    snapshot.close()
+        return self.builds - builds, files
+
+    def invalidate(self, path):
+        """Removes every snapshot of a deleted file."""
+        prefix = self._prefix(path) + '-'
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith(prefix):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+
+class JobcardTable:
+    """
+    Column-wise view of one *_jobcard.csv, read in place from its snapshot.
+    Row ids are the CSV line numbers the browser used to assign, so
+    selections made against either side line up.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.ids = snapshot.numbers('ids')
+        self.names = snapshot.strings('names')
+        self.cards = snapshot.strings('cards')
+        self.shorts = snapshot.strings('shorts')
+        self.suffixes = snapshot.strings('suffixes')
+        self.village_of = snapshot.numbers('village_of')     # index into village_codes
+        self.village_codes = list(snapshot.strings('village_codes'))
+        self.deleted = snapshot.numbers('deleted')
+        self.deleted_count = snapshot.meta.get('deleted', 0)
+        grouped, starts = snapshot.numbers('village_rows'), snapshot.numbers('village_starts')
+        self.by_village = {code: grouped[starts[slot]:starts[slot + 1]]   # village_code -> row positions
+                           for slot, code in enumerate(self.village_codes)}
+        self.name_keys = snapshot.strings('name_keys')
+        self._card_keys = snapshot.strings('card_keys') if 'card_keys' in snapshot.header['columns'] else None
+        self._orders = [(snapshot.numbers(f'{name}_order'), column) for name, column in
+                        (('short', self.shorts), ('suffix', self.suffixes), ('card', self.cards))]
+        self._search_index = None
+
+    @classmethod
+    def from_csv(cls, path):
+        """Table for a CSV that has no snapshot file (same columns, held in memory)."""
+        rows, meta, columns = jobcard_columns(path)
+        return cls(Snapshot.from_columns(JOBCARD_KIND, rows, columns, meta))
+
+    def position_of(self, row_id):
+        """Row position of a row id (ids are increasing line numbers), or None."""
+        pos = bisect_left(self.ids, row_id)
+        if pos < len(self.ids) and self.ids[pos] == row_id:
+            return pos
+        return None
+
+    def __len__(self):
+        return len(self.names)
+
+    def villages(self):
+        return sorted(v for v in self.village_codes if v != 'Unknown')
+
+    def row(self, pos, selected=False):
+        return {
+            'id': self.ids[pos],
+            'name': self.names[pos],
+            'jobCard': self.cards[pos],
+            'jobCardShort': self.shorts[pos],
+            'jobCardSuffix': self.suffixes[pos],
+            'villageCode': self.village_codes[self.village_of[pos]],
+            'isDeleted': bool(self.deleted[pos]),
+            'selected': selected,
+        }
+
+    def filter(self, village='all', search=''):
+        """Row positions matching the village dropdown and the search box."""
+        if village and village != 'all':
+            positions = self.by_village.get(village, array('I'))
+        else:
+            positions = range(len(self.names))
+        term = _search_key((search or '').strip())
+        if not term:
+            return positions
+        hits = sorted(set(self.name_keys.scan(term.encode('utf-8'))).union(self.scan_cards(term)))
+        if village and village != 'all':
+            slot = self.village_codes.index(village) if village in self.village_codes else -1
+            return [p for p in hits if self.village_of[p] == slot]
+        return hits
+
+    def scan_cards(self, term, where='in'):
+        """Rows whose lower-cased job card contains (or ends with, ...) the lower-case `term`."""
+        if self._card_keys is not None:
+            return self._card_keys.scan(term.encode('utf-8'), where)
+        # ASCII upper-case cards: card.lower() me term == card me term.upper()
+        if not term.isascii():
+            return iter(())
+        return self.cards.scan(term.upper().encode('ascii'), where)
+
+    def query(self, village='all', search='', page=1, per_page=50, selected_ids=()):
+        """One page of filtered rows plus the counters the list builder shows."""
+        selected = {self.position_of(i) for i in selected_ids} - {None}
+        selected = {p for p in selected if not self.deleted[p]}
+        positions = self.filter(village, search)
+
+        matching = len(positions)
+        total_pages = math.ceil(matching / per_page) if per_page else 0
+        start = (page - 1) * per_page
+        page_rows = [self.row(p, p in selected) for p in positions[start:start + per_page]]
+
+        return {
+            'total': len(self.names),
+            'deleted': self.deleted_count,
+            'matching': matching,
+            'selected': len(selected),
+            'selected_matching': sum(1 for p in positions if p in selected) if selected else 0,
+            'page': page,
+            'per_page': per_page,
+            'total_pages': total_pages,
+            'villages': self.villages(),
+            'rows': page_rows,
+        }
+
+    def _matching(self, token):
+        found = set()
+        for order, column in self._orders:
+            start = bisect_left(order, token, key=column.__getitem__)
+            end = bisect_right(order, token, lo=start, key=column.__getitem__)
+            found.update(order[start:end])
+        return sorted(found)
+
+    def match(self, inputs, village='all'):
+        """
+        Bulk Select in one pass: each pasted identifier is an exact lookup on
+        jobCardShort, jobCardSuffix (006/660) or the full job card, so 002/6 never
+        picks up 002/16. Deleted rows are never matched. The matched rows come
+        back too, so the list builder has them without paging to them.
+        """
+        slot = None
+        if village and village != 'all':
+            slot = self.village_codes.index(village) if village in self.village_codes else -1
+
+        found, missing, ambiguous = {}, [], {}
+        selected = set()
+        for token in inputs:
+            positions = self._matching(token)
+            if slot is not None:
+                positions = [p for p in positions if self.village_of[p] == slot]
+            if not positions:
+                missing.append(token)
+                continue
+            ids = [self.ids[p] for p in positions]
+            found[token] = ids
+            selected.update(positions)
+            if len(ids) > 1:
+                ambiguous[token] = ids
+        return {
+            'found': found,
+            'missing': missing,
+            'ambiguous': ambiguous,
+            'found_count': len([t for t in inputs if t in found]),
+            'missing_count': len(missing),
+            'selected_ids': [self.ids[p] for p in sorted(selected)],
+            'rows': [self.row(p, True) for p in sorted(selected)],
+        }
+
+    def search_index(self):
+        if self._search_index is None:
+            self._search_index = LabourSearchIndex(self)
+        return self._search_index
+
+
+def _search_key(text):
+    # NFC taaki Hindi matras ka alag-alag encoding bhi same key bane
+    return unicodedata.normalize('NFC', text).lower()
+
+
+class LabourSearchIndex:
+    """
+    Search over one jobcard file for the demand form, with the same scoring
+    tiers as its in-browser search: card endsWith (100) > card includes (50)
+    > name startsWith (30) > name includes (10). Entries are the rows the
+    demand form keeps (no '*' in the name), in file order. Each tier is a
+    byte scan over the table's snapshot keys that stops at `limit`.
+    """
+
+    VILLAGE_LIMIT = 500
+
+    def __init__(self, table):
+        self.table = table
+        self._rank = table.snapshot.numbers('entry_rank')
+        self._count = table.snapshot.meta.get('entries', 0)
+
+    def __len__(self):
+        return self._count
+
+    def _entries(self, positions):
+        # '*' wale rows demand form me nahi hote
+        return (pos for pos in positions if self._rank[pos] != NOT_AN_ENTRY)
+
+    def search(self, term, limit=15):
+        """Top `limit` hits as [{'index', 'name', 'card', 'score'}], best first."""
+        term = _search_key(term.strip())
+        if not term:
+            return []
+        needle = term.encode('utf-8')
+
+        if term.endswith('/'):
+            # Village search: file order, sirf card me match
+            hits = itertools.islice(self._entries(self.table.scan_cards(term)), self.VILLAGE_LIMIT)
+            return [self._hit(pos, 100) for pos in hits]
+
+        names = self.table.name_keys
+        tiers = (
+            (100, self.table.scan_cards(term, 'end')),
+            (50, self.table.scan_cards(term)),
+            (30, names.scan(needle, 'start')),
+            (10, names.scan(needle)),
+        )
+        results, seen = [], set()
+        for score, positions in tiers:
+            for pos in self._entries(positions):
+                if pos not in seen:
+                    seen.add(pos)
+                    results.append(self._hit(pos, score))
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    def _next_entry(self, pos):
+        # '*' rows chhod kar agla entry row (ya len)
+        rank, end = self._rank, len(self._rank)
+        while pos < end and rank[pos] == NOT_AN_ENTRY:
+            pos += 1
+        return pos
+
+    def entries(self, start, limit):
+        """Entries start, start + 1, ... in file order as [{'index', 'name', 'card'}] (batch add, neighbours)."""
+        rank, end = self._rank, len(self._rank)
+
+        def key(pos):
+            # '*' row ko agle entry ka rank, taaki bisect ke liye order bana rahe
+            pos = self._next_entry(pos)
+            return rank[pos] if pos < end else self._count
+
+        pos = bisect_left(range(end), max(start, 0), key=key)
+        results = []
+        while pos < end and len(results) < limit:
+            if rank[pos] != NOT_AN_ENTRY:
+                results.append(self._entry(pos))
+            pos += 1
+        return results
+
+    def _entry(self, pos):
+        return {'index': self._rank[pos], 'name': self.table.names[pos], 'card': self.table.cards[pos]}
+
+    def _hit(self, pos, score):
+        return dict(self._entry(pos), score=score)
+
+
+class JobcardStore:
+    """
+    Keeps JobcardTables per file (bounded LRU), reloaded when the file changes.
+    With `snapshots` a table is loaded from the file's columnar snapshot
+    instead of re-parsing the CSV.
+    """
+
+    def __init__(self, max_files=32, snapshots=None):
+        self.max_files = max_files
+        self.snapshots = snapshots
+        self._lock = threading.Lock()
+        self._tables = OrderedDict()     # path -> (stamp, JobcardTable)
+
+    def _load(self, path):
+        if self.snapshots is not None:
+            try:
+                snapshot = self.snapshots.open(path, JOBCARD_KIND)
+            except (OSError, SnapshotError):
+                snapshot = None  # cache dir na likh sakein to seedha CSV
+            if snapshot is not None:
+                return JobcardTable(snapshot)
+        return JobcardTable.from_csv(path)
+
+    def get(self, path):
+        stamp = _file_stamp(path)
+        if stamp is None:
+            return None
+        with self._lock:
+            cached = self._tables.get(path)
+            if cached and cached[0] == stamp:
+                self._tables.move_to_end(path)
+                return cached[1]
+        table = self._load(path)
+        with self._lock:
+            self._tables[path] = (stamp, table)
+            self._tables.move_to_end(path)
+            while len(self._tables) > self.max_files:
+                self._tables.popitem(last=False)
+        return table
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._tables.clear()
+                return
+            path = os.path.abspath(path)
+            for cached in list(self._tables):
+                if cached == path or cached.startswith(path + os.sep):
+                    del self._tables[cached]
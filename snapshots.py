@@ -0,0 +1,212 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+
+# Columnar snapshot file:
+#   MAGIC | u32 header length | JSON header | column blobs (har ek 8-byte aligned, offsets data section se)
+# Number columns are raw array() bytes. String columns are UTF-8 values each followed
+# by a NUL, plus '<name>.offsets' (u32, count + 1 entries) so a single value can be
+# sliced out without decoding the rest.
+#
+# Readers mmap the file and use the columns in place, so every gunicorn worker
+# shares one copy of the data through the page cache instead of holding its own.
+SNAPSHOT_MAGIC = b'NRGSNAP1'
+SNAPSHOT_VERSION = 2
+NUMBER_TYPES = ('B', 'H', 'I')
+_PREFIX = struct.Struct('<8sI')
+_SEPARATOR = '\x00'
+
+
+class SnapshotError(ValueError):
+    """A CSV can't be ingested (bad header) or a snapshot file is unreadable."""
+
+
+def clean_value(text):
+    # NUL hamara separator hai, CSV me aaye to hata do
+    return text.replace(_SEPARATOR, '')
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def encode_snapshot(kind, rows, columns, meta=None):
+    """
+    Serializes `columns` ({name: (type, values)}, type 'str' or an array
+    typecode) and returns the snapshot as a list of byte strings.
+    """
+    blobs, layout = [], {}
+    for name, (col_type, values) in columns.items():
+        if col_type == 'str':
+            encoded = [value.encode('utf-8') for value in values]
+            offsets = array('I', [0])
+            total = 0
+            for value in encoded:
+                total += len(value) + 1
+                offsets.append(total)
+            blobs.append((name, b'\x00'.join(encoded) + (b'\x00' if encoded else b'')))
+            blobs.append((name + '.offsets', offsets.tobytes()))
+            layout[name] = {'type': 'str', 'count': len(encoded)}
+            layout[name + '.offsets'] = {'type': 'I', 'count': len(offsets)}
+        elif col_type in NUMBER_TYPES:
+            data = values if isinstance(values, array) and values.typecode == col_type else array(col_type, values)
+            blobs.append((name, data.tobytes()))
+            layout[name] = {'type': col_type, 'count': len(data)}
+        else:
+            raise SnapshotError(f'Unknown column type {col_type!r} for {name}')
+
+    # Blob offsets header ke baad wale data section se relative hain
+    position = 0
+    placed = {}
+    for name, data in blobs:
+        placed[name] = [position, len(data)]
+        position = _align(position + len(data))
+    header = {'version': SNAPSHOT_VERSION, 'kind': kind, 'rows': rows, 'byteorder': sys.byteorder,
+              'meta': meta or {}, 'columns': layout, 'blobs': placed}
+    header_bytes = json.dumps(header, sort_keys=True).encode('utf-8')
+
+    parts = [_PREFIX.pack(SNAPSHOT_MAGIC, len(header_bytes)), header_bytes]
+    written = _PREFIX.size + len(header_bytes)
+    for name, data in blobs:
+        padding = _align(written) - written
+        parts.append(b'\x00' * padding)
+        parts.append(data)
+        written += padding + len(data)
+    return parts
+
+
+def write_snapshot(path, kind, rows, columns, meta=None):
+    """Writes a snapshot to `path` atomically (temp file + rename)."""
+    parts = encode_snapshot(kind, rows, columns, meta)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.writelines(parts)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+class StringColumn:
+    """
+    Read-only sequence over a snapshot string column. Values are decoded on
+    access; scan() finds matching rows with a byte search over the raw column.
+    """
+
+    def __init__(self, buf, start, length, offsets):
+        self._buf = buf              # mmap ya bytes, dono me find(sub, start, end) hai
+        self._start = start
+        self._end = start + length
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        start = self._start + self._offsets[i]
+        return self._buf[start:self._start + self._offsets[i + 1] - 1].decode('utf-8')
+
+    def __iter__(self):
+        if len(self):
+            yield from self._buf[self._start:self._end - 1].decode('utf-8').split(_SEPARATOR)
+
+    def scan(self, needle, where='in'):
+        """
+        Ascending row numbers whose value contains `needle` (bytes), or starts /
+        ends with it for where='start' / 'end'. Each row is reported once.
+        """
+        if not needle or b'\x00' in needle or not len(self):
+            return
+        buf, offsets, base, end = self._buf, self._offsets, self._start, self._end
+        shift = 0
+        if where == 'start':
+            if buf[base:base + len(needle)] == needle:
+                yield 0
+            # "\0term": pichhli value ka NUL + agli value ki shuruaat
+            needle = b'\x00' + needle
+            shift = 1
+        elif where == 'end':
+            needle = needle + b'\x00'
+        position = base
+        while True:
+            hit = buf.find(needle, position, end)
+            if hit < 0:
+                return
+            row = bisect_right(offsets, hit + shift - base) - 1
+            if row >= len(self):
+                return
+            yield row
+            # Isi row me doosra match dobara na gine, agli row se dhoondo
+            position = base + offsets[row + 1] - shift
+
+
+class Snapshot:
+    """Read side of a snapshot: an mmap of the file (or in-memory bytes) plus its header."""
+
+    def __init__(self, path=None, data=None):
+        self.path = path
+        try:
+            if data is None:
+                with open(path, 'rb') as f:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._buf = data
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f'Cannot open snapshot {path}: {e}')
+        try:
+            magic, header_len = _PREFIX.unpack_from(self._buf, 0)
+            if magic != SNAPSHOT_MAGIC:
+                raise SnapshotError(f'{path} is not a snapshot file')
+            self.header = json.loads(bytes(self._buf[_PREFIX.size:_PREFIX.size + header_len]))
+            self._data_start = _align(_PREFIX.size + header_len)
+            if self.header.get('version') != SNAPSHOT_VERSION:
+                raise SnapshotError(f'{path} has snapshot version {self.header.get("version")}')
+            self.kind = self.header['kind']
+            self.rows = self.header['rows']
+            self.meta = self.header['meta']
+        except SnapshotError:
+            self.close()
+            raise
+        except (struct.error, ValueError, KeyError) as e:
+            self.close()
+            raise SnapshotError(f'Corrupt snapshot {path}: {e}')
+
+    @classmethod
+    def from_columns(cls, kind, rows, columns, meta=None):
+        """In-memory snapshot, for data that has no snapshot file (same read path)."""
+        return cls(data=b''.join(encode_snapshot(kind, rows, columns, meta)))
+
+    def _span(self, name):
+        start, length = self.header['blobs'][name]
+        return self._data_start + start, length
+
+    def numbers(self, name):
+        """Number column, read in place (a memoryview over the mmap)."""
+        start, length = self._span(name)
+        typecode = self.header['columns'][name]['type']
+        if self.header['byteorder'] != sys.byteorder:
+            values = array(typecode)
+            values.frombytes(self._buf[start:start + length])
+            values.byteswap()
+            return values
+        return memoryview(self._buf)[start:start + length].cast(typecode)
+
+    def strings(self, name):
+        start, length = self._span(name)
+        return StringColumn(self._buf, start, length, self.numbers(name + '.offsets'))
+
+    def close(self):
+        """Unmaps the file unless columns handed out by this snapshot are still in use."""
+        if isinstance(self._buf, mmap.mmap):
+            try:
+                self._buf.close()
+            except BufferError:
+                pass  # views abhi zinda hain; unke jaate hi GC unmap kar dega
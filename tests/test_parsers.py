@@ -0,0 +1,122 @@
+"""
+Jobcard register parsing: JobcardHTMLParser must give what the old
+BeautifulSoup version gave, and uploads must be decoded in their own charset.
+Run from the repo root: python -m unittest discover tests
+"""
+import codecs
+import unittest
+
+from benchmarks.generators import jobcard_html
+from parsers import decode_html, parse_job_card_html
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:  # beautifulsoup4 ab requirement nahi hai; sirf ye comparison use karta hai
+    BeautifulSoup = None
+
+
+def bs4_parse_job_card_html(html_content):
+    """The tree-based parse_job_card_html as it was before JobcardHTMLParser (app.py, bs4)."""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    panchayat_name = "default_panchayat"
+    try:
+        panchayat_b_tag = soup.find('b', string='Panchayat')
+        if panchayat_b_tag:
+            full_text = panchayat_b_tag.parent.get_text(strip=True)
+            if ':' in full_text:
+                panchayat_name = full_text.split(':')[-1].strip()
+    except Exception:
+        pass
+
+    data_table = soup.find('table', {
+        'border': '1',
+        'width': '100%',
+        'bgcolor': 'Floralwhite',
+        'style': 'border-collapse:collapse',
+        'bordercolor': '#111111'
+    })
+    if not data_table:
+        return None, None, "Could not find the data table on the page. The page structure might have changed."
+
+    data_to_csv = []
+    for row in data_table.find_all('tr'):
+        cells = row.find_all('td')
+        if len(cells) >= 9 and "Villages" not in row.get_text():
+            try:
+                applicant_name = cells[3].get_text(strip=True)
+                job_card_no = cells[8].get_text(strip=True)
+                if applicant_name and job_card_no and applicant_name not in ["Name of Applicant", "4"]:
+                    data_to_csv.append([applicant_name, job_card_no])
+            except IndexError:
+                continue
+    if not data_to_csv:
+        return None, None, "No data could be extracted. Please ensure the file contains data in the expected format."
+    return data_to_csv, panchayat_name, None
+
+
+TABLE_OPEN = ('<table border="1" width="100%" bgcolor="Floralwhite" style="border-collapse:collapse" '
+              'bordercolor="#111111">')
+
+# Generator ke bahar wale shape: unclosed cells, Villages rows, doosra table, data table na ho
+EDGE_PAGES = {
+    'unclosed_cells': ('<table><tr><td><b>Panchayat</b>: Karon</td></tr></table>' + TABLE_OPEN +
+                       '<tr><td>1<td>V<td>H<td>SITA DEVI<td>F<td>30<td>ST<td>01/03/2010<td>JH-01-001/1</tr>'
+                       '<tr><td>2<td>V<td>H<td>RAM<td>M<td>40<td>SC<td>01/03/2010<td>JH-01-002/1</table>'),
+    'villages_and_short_rows': ('<table><tr><td><b>Panchayat</b>(as per registration): Sarath</td></tr></table>' +
+                                TABLE_OPEN + '<tr><td colspan="9"><b>Villages : Karon</b></td></tr>'
+                                '<tr>' + '<td>x</td>' * 8 + '</tr>'
+                                '<tr>' + ''.join(f'<td>{c}</td>' for c in ['1', 'V', 'H', 'USHA', 'F', '22', 'OBC',
+                                                                           '02/03/2010', 'JH-01-003/2']) + '</tr>'
+                                '</table>'),
+    'wrong_table': '<table border="1" width="100%"><tr>' + '<td>x</td>' * 9 + '</tr></table>',
+    'no_panchayat': TABLE_OPEN + '<tr>' + ''.join(f'<td>{c}</td>' for c in ['1', 'V', 'H', 'GITA', 'F', '22', 'SC',
+                                                                             '02/03/2010', 'JH-01-004/1']) + '</tr></table>',
+}
+
+
+@unittest.skipIf(BeautifulSoup is None, 'beautifulsoup4 not installed')
+class MatchesTreeParserTest(unittest.TestCase):
+
+    def assert_same(self, page):
+        self.assertEqual(parse_job_card_html(page), bs4_parse_job_card_html(page))
+
+    def test_generated_pages(self):
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                self.assert_same(jobcard_html(450, seed=seed, panchayat=f'Panchayat {seed}').encode('utf-8'))
+
+    def test_edge_pages(self):
+        for name, page in EDGE_PAGES.items():
+            with self.subTest(page=name):
+                self.assert_same(page.encode('utf-8'))
+
+
+class CharsetTest(unittest.TestCase):
+
+    def test_meta_charset(self):
+        page = jobcard_html(20, seed=1, panchayat='Pañchayat Burkundi').replace('charset="utf-8"', 'charset="windows-1252"')
+        rows, panchayat, error = parse_job_card_html(page.encode('cp1252', errors='ignore'))  # Hindi naam cp1252 me nahi
+        self.assertIsNone(error)
+        self.assertEqual(panchayat, 'Pañchayat Burkundi')
+        self.assertFalse(any('\ufffd' in name for name, _ in rows))
+
+    def test_http_equiv_charset(self):
+        page = (b'<html><head><meta http-equiv="Content-Type" content="text/html; charset=iso-8859-1"></head>'
+                b'<body>' + EDGE_PAGES['no_panchayat'].replace('GITA', 'GIT\xc0').encode('latin-1') + b'</body></html>')
+        rows, _, _ = parse_job_card_html(page)
+        self.assertEqual(rows[0][0], 'GIT\xc0')
+
+    def test_boms(self):
+        page = jobcard_html(20, seed=2)
+        expected = parse_job_card_html(page)
+        self.assertEqual(parse_job_card_html(codecs.BOM_UTF8 + page.encode('utf-8')), expected)
+        self.assertEqual(parse_job_card_html(page.encode('utf-16')), expected)
+
+    def test_undeclared_fallback(self):
+        self.assertEqual(decode_html('अ'.encode('utf-8')), 'अ')
+        self.assertEqual(decode_html('caf\xe9'.encode('cp1252')), 'caf\xe9')
+        self.assertEqual(decode_html(b'<meta charset="no-such-charset">ok'), '<meta charset="no-such-charset">ok')
+
+
+if __name__ == '__main__':
+    unittest.main()